@@ -35,6 +35,7 @@ class PNG_DataModel(DataModel):
 
     file_extension = 'png'
     name = 'png'
+    import_file_mapping = True
 
     def absorb(self, data, idx):
         
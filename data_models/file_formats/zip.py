@@ -35,6 +35,7 @@ class ZIP_DataModel(DataModel):
 
     file_extension = 'zip'
     name = 'zip'
+    import_file_mapping = True
 
     def absorb(self, data, idx):
         
@@ -26,14 +26,63 @@ import random
 import string
 import array
 
+from libs.external_modules import numpy_module
+if numpy_module:
+    import numpy
+
+# If True, the primitives are computed with NumPy (if available) from
+# VECTORIZATION_THRESHOLD bytes. Disabled by default, as the vectorized
+# versions draw their random values differently: for a same random.seed(),
+# the generated data would depend on whether NumPy is installed.
+VECTORIZATION_ENABLED = False
+# Size (in bytes) from which the primitives are vectorized. Below it,
+# the pure-python versions are faster.
+VECTORIZATION_THRESHOLD = 1024
+
+def _numpy_rng():
+    # The NumPy generator is seeded from the 'random' module, so that
+    # random.seed() makes the vectorized primitives reproducible too.
+    return numpy.random.RandomState(random.getrandbits(32))
+
+def _vectorizable(size):
+    return VECTORIZATION_ENABLED and numpy_module and size >= VECTORIZATION_THRESHOLD
+
+def _first_occurrences(sorted_a):
+    return numpy.flatnonzero(numpy.concatenate(([True], sorted_a[1:] != sorted_a[:-1])))
+
+def _sample_positions(rng, l, n):
+    # n distinct positions among l (sorted), without shuffling the
+    # whole range when n is small compared to l
+    if n > l:
+        raise ValueError('sample larger than population')
+    if n * 4 > l:
+        return numpy.sort(rng.permutation(l)[:n])
+    pos = numpy.empty(0, dtype=numpy.int64)
+    while len(pos) < n:
+        pos = numpy.sort(numpy.concatenate((pos, rng.randint(0, l, n - len(pos)))))
+        pos = pos[_first_occurrences(pos)]
+    return pos
+
+
 def rand_string(size=None, mini=1, maxi=10, str_set=string.printable):
 
-    out = ""
     if size is None:
         size = random.randint(mini, maxi)
-    while len(out) < size:
+
+    if _vectorizable(size) and all(len(c) == 1 for c in str_set):
+        chars = ''.join(str_set)
+        if sys.version_info[0] > 2:
+            chars = bytes(chars, 'latin_1')
+        chars = numpy.frombuffer(chars, dtype=numpy.uint8)
+        return chars[_numpy_rng().randint(0, len(chars), size)].tobytes()
+
+    out = []
+    out_sz = 0
+    while out_sz < size:
         val = random.choice(str_set)
-        out += val
+        out.append(val)
+        out_sz += len(val)
+    out = ''.join(out)
 
     if sys.version_info[0] > 2:
         out = bytes(out, 'latin_1')
@@ -43,34 +92,85 @@ def rand_string(size=None, mini=1, maxi=10, str_set=string.printable):
     return out
 
 
+_ctrl_chars = [x for x in range(0,32)] + [0x7f]
+
 def corrupt_bytes(s, p=0.01, n=None, ctrl_char=False):
     """Corrupt a given percentage or number of bytes from a string"""
-    s = bytearray(s)
+    return corrupt_bytes_batch(s, 1, p=p, n=n, ctrl_char=ctrl_char)[0]
+
+def corrupt_bytes_batch(s, k, p=0.01, n=None, ctrl_char=False):
+    """Return `k` variants of a string, each one with a given percentage
+    or number of corrupted bytes"""
     l = len(s)
     if n is None:
         n = max(1,int(l*p))
-    for i in random.sample(range(l), n):
-        if ctrl_char:
-            s[i] = random.choice([x for x in range(0,32)] + [0x7f])
-        else:
-            s[i] = (s[i]+random.randint(1,255))%256
 
-    return bytes(s)
+    if _vectorizable(l):
+        rng = _numpy_rng()
+        variants = numpy.tile(numpy.frombuffer(s, dtype=numpy.uint8), (k, 1))
+        for v in variants:
+            pos = _sample_positions(rng, l, n)
+            if ctrl_char:
+                v[pos] = rng.choice(_ctrl_chars, n)
+            else:
+                # uint8 additions wrap around modulo 256
+                v[pos] += rng.randint(1, 256, n).astype(numpy.uint8)
+        return [v.tobytes() for v in variants]
+
+    variants = []
+    for j in range(k):
+        v = bytearray(s)
+        for i in random.sample(range(l), n):
+            if ctrl_char:
+                v[i] = random.choice(_ctrl_chars)
+            else:
+                v[i] = (v[i]+random.randint(1,255))%256
+        variants.append(bytes(v))
+
+    return variants
 
 def corrupt_bits(s, p=0.01, n=None, ascii=False):
     """Flip a given percentage or number of bits from a string"""
-    s = bytearray(s)
+    return corrupt_bits_batch(s, 1, p=p, n=n, ascii=ascii)[0]
+
+def corrupt_bits_batch(s, k, p=0.01, n=None, ascii=False):
+    """Return `k` variants of a string, each one with a given percentage
+    or number of flipped bits"""
     l = len(s)*8
     if n is None:
         n = max(1,int(l*p))
-    for i in random.sample(range(l), n):
-        s[i//8] ^= 1 << (i%8)
-        if ascii:
-            s[i//8] &= 0x7f
-        else:
-            s[i//8] |= 0x80
-
-    return bytes(s)
+
+    if _vectorizable(len(s)):
+        rng = _numpy_rng()
+        variants = numpy.tile(numpy.frombuffer(s, dtype=numpy.uint8), (k, 1))
+        for v in variants:
+            pos = _sample_positions(rng, l, n)
+            if not n:
+                continue
+            # the flipped bits being distinct, the masks of a same byte
+            # can be summed up
+            byte_pos = pos//8
+            starts = _first_occurrences(byte_pos)
+            touched = byte_pos[starts]
+            v[touched] ^= numpy.add.reduceat(numpy.left_shift(1, pos%8), starts).astype(numpy.uint8)
+            if ascii:
+                v[touched] &= 0x7f
+            else:
+                v[touched] |= 0x80
+        return [v.tobytes() for v in variants]
+
+    variants = []
+    for j in range(k):
+        v = bytearray(s)
+        for i in random.sample(range(l), n):
+            v[i//8] ^= 1 << (i%8)
+            if ascii:
+                v[i//8] &= 0x7f
+            else:
+                v[i//8] |= 0x80
+        variants.append(bytes(v))
+
+    return variants
 
 def calc_parity_bit(x):
     bit = 0
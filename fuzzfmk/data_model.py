@@ -33,6 +33,8 @@ import re
 import binascii
 import collections
 import traceback
+import mmap
+import inspect
 
 sys.path.append('.')
 
@@ -42,6 +44,27 @@ from fuzzfmk.global_resources import *
 
 DEBUG = False
 
+_start_param_support = {}
+
+def _takes_start_param(method):
+    '''
+    Return True if the absorption hook `method` accepts the `start`
+    parameter. Hooks overloaded before its introduction are instead given
+    the part of the blob to absorb.
+    '''
+    func = getattr(method, '__func__', method)
+    supported = _start_param_support.get(func, None)
+    if supported is None:
+        if sys.version_info[0] == 2:
+            spec = inspect.getargspec(func)
+            supported = 'start' in spec.args or spec.keywords is not None
+        else:
+            params = inspect.signature(func).parameters
+            supported = 'start' in params or \
+                        any(p.kind == p.VAR_KEYWORD for p in params.values())
+        _start_param_support[func] = supported
+    return supported
+
 class Data(object):
 
     def __init__(self, data=''):
@@ -59,6 +82,7 @@ class Data(object):
         self.__info_idx = {}
 
         self._history = None
+        self._detached_node = None
 
         if isinstance(data, bytes):
             self.update_from_str_or_bytes(data)
@@ -99,6 +123,18 @@ class Data(object):
         self.node = node
         self._dm = node.env.get_data_model()
 
+    def detach_node(self):
+        '''
+        Replace the node of the data with a copy of it (within a new
+        environment), as data makers can go on modifying the node they
+        returned (e.g., the ones relying on a ModelWalker). Nothing is
+        done if the node has already been detached.
+        '''
+        if self.node is not None and self.node is not self._detached_node:
+            self.update_from_node(Node(self.node.name, base_node=self.node,
+                                       ignore_frozen_state=False, new_env=True))
+            self._detached_node = self.node
+
     def get_data_model(self):
         return self._dm
 
@@ -112,6 +148,18 @@ class Data(object):
 
         return self.raw
 
+    def to_buffers(self):
+        '''
+        Return the data as a list of memoryviews on the buffers it is
+        made of, without serializing it in a new bytes object. Used by
+        the targets that are able to emit scattered buffers (refer to
+        :meth:`Node.to_buffers`).
+        '''
+        if self.node:
+            return self.node.to_buffers()
+        else:
+            return [memoryview(self.raw)]
+
     def make_unusable(self):
         self.__unusable = True
 
@@ -384,6 +432,71 @@ class AbsFullCsts(AbsCsts):
     def __repr__(self):
         return 'AbsFullCsts()'
 
+
+class AbsorbMemo(object):
+    '''
+    Packrat memo shared by all the absorptions performed during one
+    call to Node.absorb() (refer to Env.absorb_memo). It records the
+    outcome (status, offset, size) of absorbing a node at a given
+    offset of a blob, so that the non-terminal shapes tried later,
+    and the '=..'/'=.' retries, do not absorb it again.
+
+    Only the nodes whose absorption depends on nothing else than the
+    blob and the node itself are memoized: terminal nodes without an
+    absorb helper, and non-terminal nodes whose sub-graph has neither
+    absorb helpers, nor synchronized nodes, nor generator/function
+    nodes.
+    '''
+
+    def __init__(self):
+        self._outcomes = {}
+        self._memoizable = {}
+        # the keys rely on id(), thus the blobs (postponed nodes are
+        # given slices) and the constraints are kept alive
+        self._refs = {}
+
+    def is_memoizable(self, node):
+        try:
+            return self._memoizable[id(node)]
+        except KeyError:
+            ok = self._memoizable[id(node)] = self._check_memoizable(node)
+            self._refs[id(node)] = node
+            return ok
+
+    @staticmethod
+    def _check_memoizable(node):
+        if node.is_term():
+            return node.cc.absorb_helper is None
+
+        to_check = [node]
+        seen = set()
+        while to_check:
+            n = to_check.pop()
+            if id(n) in seen:
+                continue
+            seen.add(id(n))
+            for i in n.internals.values():
+                if i.absorb_helper is not None or i._sync_with:
+                    return False
+                if isinstance(i, (NodeInternals_GenFunc, NodeInternals_Func)):
+                    return False
+                if isinstance(i, NodeInternals_NonTerm):
+                    to_check.extend(i.subnodes_set)
+                    if i.separator is not None:
+                        to_check.append(i.separator.node)
+        return True
+
+    def get(self, node, blob, start, constraints, conf):
+        return self._outcomes.get(id(node), {}).get((id(blob), start, id(constraints), conf))
+
+    def set(self, node, blob, start, constraints, conf, outcome):
+        self._refs[id(blob)] = blob
+        self._refs[id(constraints)] = constraints
+        self._outcomes.setdefault(id(node), {})[(id(blob), start, id(constraints), conf)] = outcome
+
+    def forget(self, node):
+        self._outcomes.pop(id(node), None)
+
 ### Materials for Node Synchronization ###
 
 class SyncScope:
@@ -523,6 +636,9 @@ class NodeInternals(object):
     Separator = 15
     DISABLED = 100
 
+    # Env() of the graph the owner node belongs to (refer to Node._set_env_ref())
+    _env = None
+
     def __init__(self, defaults=True, arg=None):
         self.private = None
         self.absorb_helper = None
@@ -550,13 +666,55 @@ class NodeInternals(object):
             ### INTERNAL USAGE ###
             NodeInternals.DISABLED: False
             }
+        # Set when the attributes dict is shared with a copy of this
+        # object. It will be duplicated on the first attribute change.
+        self._attrs_cow = False
+
+        # Nodes that keep a cached value relying on the value of this
+        # object (refer to Node._get_value())
+        self._value_observers = None
 
         self._sync_with = None
         self._init_specific(arg)
 
+    def __copy__(self):
+        new_obj = type(self).__new__(type(self))
+        new_obj.__dict__.update(self.__dict__)
+        # The attributes dict is shared by both objects until one of
+        # them changes an attribute (copy-on-write)
+        self._attrs_cow = True
+        new_obj._attrs_cow = True
+        new_obj._value_observers = None
+        # The copy shall not report its changes to the graph of the
+        # original object. The node owning it provides its Env() (refer
+        # to Node._set_env_ref()).
+        new_obj._env = None
+        return new_obj
+
+    def _register_value_observer(self, node):
+        if self._value_observers is None:
+            self._value_observers = set()
+        self._value_observers.add(node)
+
+    def _value_changed(self):
+        # Invalidate the cached values of the upper nodes. The
+        # observers will register again when they will cache their value.
+        if self._value_observers:
+            observers = self._value_observers
+            self._value_observers = None
+            for n in observers:
+                n._invalidate_value_cache()
+
     def _init_specific(self, arg):
         pass
 
+    def _get_env(self):
+        '''
+        Return the Env() of the graph these node internals belong to, or None
+        if it is not known. It is maintained by the node owning them.
+        '''
+        return self._env
+
     def has_subkinds(self):
         return False
 
@@ -567,6 +725,7 @@ class NodeInternals(object):
         if self._sync_with is None:
             self._sync_with = {}
         self._sync_with[scope] = (node, param)
+        Node._properties_changed(self._get_env())
 
     def get_node_sync(self, scope):
         if self._sync_with is None:
@@ -578,7 +737,8 @@ class NodeInternals(object):
         if self.private is not None:
             self.private = copy.copy(self.private)
         self.absorb_constraints = copy.copy(self.absorb_constraints)
-        self.__attrs = copy.copy(self.__attrs)
+        if not self._attrs_cow:
+            self.__attrs = copy.copy(self.__attrs)
 
         if self._sync_with:
             delayed_node_internals.add(self)
@@ -617,7 +777,7 @@ class NodeInternals(object):
         pass
 
 
-    def absorb(self, blob, constraints, conf):
+    def absorb(self, blob, constraints, conf, start=0):
         raise NotImplementedError
 
     def set_absorb_helper(self, helper):
@@ -631,25 +791,35 @@ class NodeInternals(object):
         if name not in self.__attrs:
             raise ValueError
         if self._make_specific(name):
-            self.__attrs[name] = True
+            self.__update_attr(name, True)
 
     def clear_attr(self, name):
         if name not in self.__attrs:
             raise ValueError
         if self._unmake_specific(name):
-            self.__attrs[name] = False
+            self.__update_attr(name, False)
 
     # To be used on very specific case only
     def _set_attr_direct(self, name):
         if name not in self.__attrs:
             raise ValueError
-        self.__attrs[name] = True
+        self.__update_attr(name, True)
 
     # To be used on very specific case only
     def _clear_attr_direct(self, name):
         if name not in self.__attrs:
             raise ValueError
-        self.__attrs[name] = False
+        self.__update_attr(name, False)
+
+    def __update_attr(self, name, val):
+        if self.__attrs[name] != val:
+            if self._attrs_cow:
+                self.__attrs = copy.copy(self.__attrs)
+                self._attrs_cow = False
+            self.__attrs[name] = val
+            Node._properties_changed(self._get_env())
+            if name == NodeInternals.DISABLED or name == NodeInternals.Freezable:
+                self._value_changed()
 
     def is_attr_set(self, name):
         if name not in self.__attrs:
@@ -891,6 +1061,43 @@ class NodeInternalsCriteria(object):
             for cst, required in crit.items():
                 self.set_node_constraint(cst, required)
 
+    def compile(self):
+        '''
+        Return the list of the checks (couple of NodeInternals matching
+        method and related criterion) that are really needed to verify
+        these criteria, in order to avoid evaluating the unset ones for
+        each node during a graph traversal.
+        '''
+        checks = []
+        for method, crit in [(NodeInternals._match_mandatory_attrs, self.__mandatory_attrs),
+                             (NodeInternals._match_negative_attrs, self.__negative_attrs),
+                             (NodeInternals._match_node_kinds, self.__node_kinds),
+                             (NodeInternals._match_negative_node_kinds, self.__negative_node_kinds),
+                             (NodeInternals._match_node_subkinds, self.__node_subkinds),
+                             (NodeInternals._match_negative_node_subkinds, self.__negative_node_subkinds)]:
+            if crit is not None:
+                checks.append((method, list(crit)))
+
+        if self.has_node_constraints():
+            checks.append((NodeInternals._match_node_constraints, dict(self._node_constraints)))
+
+        return checks
+
+    def get_signature(self):
+        '''
+        Return an hashable object that identify the current criteria.
+        '''
+        def _sig(crit):
+            return None if crit is None else tuple(crit)
+
+        csts = None
+        if self._node_constraints is not None:
+            csts = tuple(sorted(self._node_constraints.items(), key=lambda x: x[0]))
+
+        return (_sig(self.__mandatory_attrs), _sig(self.__negative_attrs),
+                _sig(self.__node_kinds), _sig(self.__negative_node_kinds),
+                _sig(self.__node_subkinds), _sig(self.__negative_node_subkinds), csts)
+
     def set_node_constraint(self, cst, required):
         if self._node_constraints is None:
             self._node_constraints = {}
@@ -1212,6 +1419,7 @@ class NodeInternals_GenFunc(NodeInternals):
 
     def reset_generator(self):
         self._generated_node = None
+        Node._structure_changed(self._get_env())
 
     def _get_generated_node(self):
         if self._generated_node is None:
@@ -1243,6 +1451,7 @@ class NodeInternals_GenFunc(NodeInternals):
                 self.set_private(private_val)
 
             self._generated_node = ret
+            Node._structure_changed(self._get_env())
             self._generated_node._reset_depth(parent_depth=self.pdepth)
             self._generated_node.set_env(self.env)
 
@@ -1300,7 +1509,7 @@ class NodeInternals_GenFunc(NodeInternals):
         ret = self.generated_node._get_value(conf=conf, recursive=recursive)
         return (ret, False)
 
-    def absorb(self, blob, constraints, conf):
+    def absorb(self, blob, constraints, conf, start=0):
         # We make the generator freezable to be sure that _get_value()
         # won't reset it after absorption
         self.set_attr(NodeInternals.Freezable)
@@ -1311,7 +1520,8 @@ class NodeInternals_GenFunc(NodeInternals):
         # Will help for possible future node types, as the current
         # node types that can raise exceptions, handle them already.
         try:
-            st, off, sz, name = self.generated_node.absorb(blob, constraints=constraints, conf=conf)
+            st, off, sz, name = self.generated_node.absorb(blob, constraints=constraints, conf=conf,
+                                                           start=start)
         except (ValueError, AssertionError) as e:
             st, off, sz = AbsorbStatus.Reject, 0, None
 
@@ -1409,12 +1619,8 @@ class NodeInternals_GenFunc(NodeInternals):
         if self._generated_node is not None:
             self._generated_node._reset_depth(parent_depth=self.pdepth)
 
-    def get_child_nodes_by_attr(self, internals_criteria, semantics_criteria, owned_conf, conf, path_regexp, 
-                               exclude_self, respect_order, relative_depth, top_node, ignore_fstate):
-        return self.generated_node.get_reachable_nodes(internals_criteria, semantics_criteria, owned_conf, conf,
-                                                       path_regexp=path_regexp, exclude_self=False,
-                                                       respect_order=respect_order, relative_depth=relative_depth,
-                                                       top_node=top_node, ignore_fstate=ignore_fstate)
+    def get_child_nodes(self, ignore_fstate):
+        return [self.generated_node]
 
     def set_child_current_conf(self, node, conf, reverse, ignore_entanglement):
         if self.is_attr_set(NodeInternals.AcceptConfChange):
@@ -1436,9 +1642,21 @@ class NodeInternals_GenFunc(NodeInternals):
 
 
 class NodeInternals_Term(NodeInternals):
+    _frozen_node = None
+
     def _init_specific(self, arg):
         self.frozen_node = None
 
+    def _get_frozen_node(self):
+        return self._frozen_node
+
+    def _set_frozen_node(self, val):
+        if val is not self._frozen_node:
+            self._frozen_node = val
+            self._value_changed()
+
+    frozen_node = property(fget=_get_frozen_node, fset=_set_frozen_node)
+
     @staticmethod
     def _convert_to_internal_repr(val):
         if not isinstance(val, str) and not isinstance(val, bytes):
@@ -1464,8 +1682,8 @@ class NodeInternals_Term(NodeInternals):
 
     def _get_value(self, conf=None, recursive=True):
 
-        if self.frozen_node is not None:
-            return (self.frozen_node, False)
+        if self._frozen_node is not None:
+            return (self._frozen_node, False)
 
         val = self._get_value_specific(conf, recursive)
 
@@ -1478,7 +1696,7 @@ class NodeInternals_Term(NodeInternals):
         raise NotImplementedError
 
 
-    def absorb(self, blob, constraints, conf):
+    def absorb(self, blob, constraints, conf, start=0):
         status = None
         size = None
 
@@ -1487,19 +1705,26 @@ class NodeInternals_Term(NodeInternals):
 
         if self.absorb_helper is not None:
             try:
-                status, off, size = self.absorb_helper(blob, constraints, self)
+                status, off, size = self.absorb_helper(blob[start:], constraints, self)
             except:
                 print("Warning: absorb_helper '{!r}' has crashed! (thus, use default values)".format(self.absorb_helper))
                 status, off, size = AbsorbStatus.Accept, 0, None
+        elif _takes_start_param(self.absorb_auto_helper):
+            status, off, size = self.absorb_auto_helper(blob, constraints=constraints, start=start)
         else:
-            status, off, size = self.absorb_auto_helper(blob, constraints=constraints)
+            status, off, size = self.absorb_auto_helper(blob[start:], constraints=constraints)
 
         if status == AbsorbStatus.Reject:
             st = status
             self.frozen_node = b''
         elif status == AbsorbStatus.Accept:
             try:
-                self.frozen_node, off, size = self.do_absorb(blob, constraints=constraints, off=off, size=size)
+                if _takes_start_param(self.do_absorb):
+                    self.frozen_node, off, size = self.do_absorb(blob, constraints=constraints, off=off,
+                                                                 size=size, start=start)
+                else:
+                    self.frozen_node, off, size = self.do_absorb(blob[start:], constraints=constraints,
+                                                                 off=off, size=size)
             except (ValueError, AssertionError) as e:
                 st = AbsorbStatus.Reject
                 self.frozen_node = b''
@@ -1517,10 +1742,10 @@ class NodeInternals_Term(NodeInternals):
     def confirm_absorb(self):
         self.do_cleanup_absorb()
 
-    def absorb_auto_helper(self, blob, constraints):
+    def absorb_auto_helper(self, blob, constraints, start=0):
         raise NotImplementedError
 
-    def do_absorb(self, blob, constraints, off, size):
+    def do_absorb(self, blob, constraints, off, size, start=0):
         raise NotImplementedError
 
     def do_revert_absorb(self):
@@ -1577,8 +1802,7 @@ class NodeInternals_Term(NodeInternals):
     def reset_depth_specific(self, depth):
         pass
 
-    def get_child_nodes_by_attr(self, internals_criteria, semantics_criteria, owned_conf, conf, path_regexp,
-                               exclude_self, respect_order, relative_depth, top_node, ignore_fstate):
+    def get_child_nodes(self, ignore_fstate):
         return None
 
     def set_child_current_conf(self, node, conf, reverse, ignore_entanglement):
@@ -1591,9 +1815,44 @@ class NodeInternals_Term(NodeInternals):
 class NodeInternals_TypedValue(NodeInternals_Term):
     def _init_specific(self, arg):
         NodeInternals_Term._init_specific(self, arg)
-        self.value_type = None
+        self._value_type = None
+        # When not None, the value type is shared with other
+        # NodeInternals (copy-on-write) and this attribute provides the
+        # parameters to use for making it private (refer to
+        # _make_private_value_type())
+        self._vt_cow = None
         self.__fuzzy_values = None
 
+    def __copy__(self):
+        # The value type is shared by both objects until one of them
+        # needs to access it. The copy will define its own
+        # parameters if make_private() is called.
+        if self._vt_cow is None:
+            self._vt_cow = (False, None)
+        return NodeInternals_Term.__copy__(self)
+
+    def _get_value_type(self):
+        if self._vt_cow is not None:
+            self._make_private_value_type()
+        return self._value_type
+
+    def _set_value_type(self, value_type):
+        self._vt_cow = None
+        self._value_type = value_type
+
+    value_type = property(fget=_get_value_type, fset=_set_value_type)
+
+    def _make_private_value_type(self):
+        forget_current_state, determinist = self._vt_cow
+        self._vt_cow = None
+        self._value_type = copy.copy(self._value_type)
+        self._value_type.make_private(forget_current_state=forget_current_state)
+        if determinist is not None:
+            if determinist:
+                self._value_type.make_determinist()
+            else:
+                self._value_type.make_random()
+
     def _make_specific(self, name):
         if name == NodeInternals.Determinist:
             self.value_type.make_determinist()
@@ -1606,6 +1865,8 @@ class NodeInternals_TypedValue(NodeInternals_Term):
 
     def import_value_type(self, value_type):
         self.value_type = value_type
+        # the subkind of the node may have changed
+        Node._properties_changed(self._get_env())
         if self.is_attr_set(NodeInternals.Determinist):
             self.value_type.make_determinist()
         else:
@@ -1615,7 +1876,8 @@ class NodeInternals_TypedValue(NodeInternals_Term):
         return True
 
     def get_current_subkind(self):
-        return self.value_type.__class__
+        # does not require the value type to be private
+        return self._value_type.__class__
 
     def get_value_type(self):
         return self.value_type
@@ -1627,12 +1889,14 @@ class NodeInternals_TypedValue(NodeInternals_Term):
         return self.__fuzzy_values
 
     def _make_private_term_specific(self, ignore_frozen_state, accept_external_entanglement):
-        self.value_type = copy.copy(self.value_type)
-        self.value_type.make_private(forget_current_state=ignore_frozen_state)
-        if self.is_attr_set(NodeInternals.Determinist):
-            self.value_type.make_determinist()
-        else:
-            self.value_type.make_random()
+        # The copy of the value type is postponed until it is really
+        # needed. Thus, frozen nodes that are never modified keep
+        # sharing it with their template.
+        forget_current_state = ignore_frozen_state
+        if self._vt_cow is not None:
+            # the copied object was itself waiting for its private value type
+            forget_current_state = forget_current_state or self._vt_cow[0]
+        self._vt_cow = (forget_current_state, self.is_attr_set(NodeInternals.Determinist))
         self.__fuzzy_values = copy.copy(self.__fuzzy_values)
 
     def _get_value_specific(self, conf=None, recursive=True):
@@ -1642,11 +1906,18 @@ class NodeInternals_TypedValue(NodeInternals_Term):
     def get_raw_value(self):
         return self.value_type.get_current_raw_val()
         
-    def absorb_auto_helper(self, blob, constraints):
-        return self.value_type.absorb_auto_helper(blob, constraints)
+    def absorb_auto_helper(self, blob, constraints, start=0):
+        if _takes_start_param(self.value_type.absorb_auto_helper):
+            return self.value_type.absorb_auto_helper(blob, constraints, start=start)
+        else:
+            return self.value_type.absorb_auto_helper(blob[start:], constraints)
 
-    def do_absorb(self, blob, constraints, off, size):
-        return self.value_type.do_absorb(blob=blob, constraints=constraints, off=off, size=size)
+    def do_absorb(self, blob, constraints, off, size, start=0):
+        if _takes_start_param(self.value_type.do_absorb):
+            return self.value_type.do_absorb(blob=blob, constraints=constraints, off=off, size=size,
+                                             start=start)
+        else:
+            return self.value_type.do_absorb(blob=blob[start:], constraints=constraints, off=off, size=size)
 
     def do_revert_absorb(self):
         self.value_type.do_revert_absorb()
@@ -1673,6 +1944,10 @@ class NodeInternals_TypedValue(NodeInternals_Term):
         return self.value_type.pretty_print()
 
     def __getattr__(self, name):
+        if name.startswith('__'):
+            # special attributes are looked up (e.g., by pickle) before
+            # the internal attributes exist
+            raise AttributeError(name)
         vt = self.__getattribute__('value_type')
         if hasattr(vt, name):
             # to avoid looping in __getattr__
@@ -1845,14 +2120,14 @@ class NodeInternals_Func(NodeInternals_Term):
         # The call to 'self._node_helpers.make_private()' is performed
         # the latest that is during self.make_args_private()
 
-    def absorb(self, blob, constraints, conf):
+    def absorb(self, blob, constraints, conf, start=0):
         # we make the generator freezable to be sure that _get_value()
         # won't reset it after absorption
         self.set_attr(NodeInternals.Freezable)
 
         sz = len(convert_to_internal_repr(self._get_value()))
 
-        self._set_frozen_value(blob[:sz])
+        self._set_frozen_value(blob[start:start+sz])
 
         return AbsorbStatus.Absorbed, 0, sz
 
@@ -2004,6 +2279,17 @@ class NodeInternals_NonTerm(NodeInternals):
     def _init_specific(self, arg):
         self.reset()
 
+    def _get_frozen_node_list(self):
+        return self._frozen_node_list
+
+    def _set_frozen_node_list(self, node_list):
+        # Any change of the frozen subnodes alters the paths reachable
+        # from the upper nodes
+        self._frozen_node_list = node_list
+        Node._structure_changed(self._get_env())
+
+    frozen_node_list = property(fget=_get_frozen_node_list, fset=_set_frozen_node_list)
+
     def reset(self, nodes_drawn_qty=None, mode=None, exhaust_info=None):
         self.frozen_node_list = None
         self.subnodes_set = set()
@@ -2207,6 +2493,8 @@ class NodeInternals_NonTerm(NodeInternals):
         if self.separator is not None:
             new_separator = copy.copy(self.separator)
             new_separator.make_private(node_dico, ignore_frozen_state=ignore_frozen_state)
+            # the separator node belongs to the new graph
+            new_separator.node.set_env(env)
         else:
             new_separator = None
 
@@ -2245,7 +2533,7 @@ class NodeInternals_NonTerm(NodeInternals):
 
         # iterable shall only have unique nodes
         for e in iterable:
-            e.env = env
+            e._set_env_ref(env)
 
             if e.entangled_nodes is not None and ((not ignore_frozen_state) or accept_external_entanglement):
                 entangled_set.add(e)
@@ -2264,12 +2552,15 @@ class NodeInternals_NonTerm(NodeInternals):
                                                 delayed_node_internals=delayed_node_internals)
 
                 elif e.is_func(c) or e.is_genfunc(c):
-                    e.internals[c].set_env(env)
                     if e.internals[c].node_arg is not None:
                         func_nodes.add(e)
                     e.internals[c].make_private(ignore_frozen_state=ignore_frozen_state,
                                                 accept_external_entanglement=accept_external_entanglement,
                                                 delayed_node_internals=delayed_node_internals)
+                    # done once the internals are private, otherwise the
+                    # generated node of the original graph would be
+                    # attached to the new one
+                    e.internals[c].set_env(env)
 
                 else:
                     e.internals[c].make_private(ignore_frozen_state=ignore_frozen_state,
@@ -2277,9 +2568,27 @@ class NodeInternals_NonTerm(NodeInternals):
                                                 delayed_node_internals=delayed_node_internals)
 
 
+    @staticmethod
+    def __get_node_copy(node, node_dico, copied_nodes):
+        if node not in node_dico:
+            node_dico[node] = copy.copy(node)
+        new_node = node_dico[node]
+
+        # the NodeInternals of a node are copied only once per call
+        # to get_subnodes_csts_copy(), even if it appears several times
+        # within the subnodes constraints
+        if new_node not in copied_nodes:
+            new_node.internals = copy.copy(new_node.internals)
+            for c in new_node.internals:
+                new_node.internals[c] = copy.copy(new_node.internals[c])
+            copied_nodes.add(new_node)
+
+        return new_node
+
     def get_subnodes_csts_copy(self, node_dico={}):
         csts_copy = []
         old2new_node = node_dico
+        copied_nodes = set()
 
         for weight, lnode_list in split_with(lambda x: isinstance(x, int), \
                                                 self.subnodes_csts):
@@ -2294,13 +2603,7 @@ class NodeInternals_NonTerm(NodeInternals):
                 new_sublist = []
                 if isinstance(sublist[0], list):
                     for sslist in sublist:
-                        if sslist[0] not in old2new_node:
-                            old2new_node[sslist[0]] = copy.copy(sslist[0])
-                        new_node = old2new_node[sslist[0]]
-
-                        new_node.internals = copy.copy(new_node.internals)
-                        for c in new_node.internals:
-                            new_node.internals[c] = copy.copy(new_node.internals[c])
+                        new_node = self.__get_node_copy(sslist[0], old2new_node, copied_nodes)
 
                         if len(sslist) == 2:
                             new_sublist.append([new_node, sslist[1]])
@@ -2314,13 +2617,7 @@ class NodeInternals_NonTerm(NodeInternals):
                         if isinstance(sss, int):
                             new_sslist.append(sss) # add the relative weight
                         else:   # it is a list like [<fuzzfmk.data_model.Node object at 0x7fc49fc56ad0>, 2]
-                            if sss[0] not in old2new_node:
-                                old2new_node[sss[0]] = copy.copy(sss[0])
-                            new_node = old2new_node[sss[0]]
-                            
-                            new_node.internals = copy.copy(new_node.internals)
-                            for c in new_node.internals:
-                                new_node.internals[c] = copy.copy(new_node.internals[c])
+                            new_node = self.__get_node_copy(sss[0], old2new_node, copied_nodes)
 
                             if len(sss) == 2:
                                 new_sslist.append([new_node, sss[1]])
@@ -2331,7 +2628,8 @@ class NodeInternals_NonTerm(NodeInternals):
                 else:
                     raise ValueError
 
-                l.append([copy.copy(delim), new_sublist])
+                # delim is a str, thus it does not need to be copied
+                l.append([delim, new_sublist])
 
             csts_copy.append(l)
 
@@ -2809,6 +3107,7 @@ class NodeInternals_NonTerm(NodeInternals):
         if self.separator is not None and self.frozen_node_list and self.frozen_node_list[-1].is_attr_set(NodeInternals.Separator):
             if not self.separator.suffix:
                 self.frozen_node_list.pop(-1)
+                Node._structure_changed(self._get_env())
             self._clone_separator_cleanup()
 
         return (self.frozen_node_list, True)
@@ -2899,6 +3198,7 @@ class NodeInternals_NonTerm(NodeInternals):
             node_list.pop(idx)
             for i, n in enumerate(expand_list):
                 node_list.insert(idx+i, n)
+            Node._structure_changed(node.env)
 
         return len(expand_list)
 
@@ -2908,6 +3208,7 @@ class NodeInternals_NonTerm(NodeInternals):
         node.clear_attr(NodeInternals.DISABLED)
         if idx < len(node_list):
             node_list.pop(idx)
+            Node._structure_changed(node.env)
 
     def set_separator_node(self, sep_node, prefix=True, suffix=True, unique=False):
         check_err = set()
@@ -2918,6 +3219,7 @@ class NodeInternals_NonTerm(NodeInternals):
                   "of this non-terminal node")
             raise ValueError
         self.separator = NodeSeparator(sep_node, prefix=prefix, suffix=suffix, unique=unique)
+        Node._structure_changed(self._get_env())
 
     def get_separator_node(self):
         if self.separator is not None:
@@ -2954,6 +3256,9 @@ class NodeInternals_NonTerm(NodeInternals):
     def replace_subnode(self, old, new):
         self.subnodes_set.remove(old)
         self.subnodes_set.add(new)
+        if new.env is None and self._env is not None:
+            new.set_env(self._env)
+        Node._structure_changed(self._get_env())
                         
         for weight, lnode_list in split_with(lambda x: isinstance(x, int), self.subnodes_csts):
             for delim, sublist in self.__iter_csts(lnode_list[0]):
@@ -3098,7 +3403,7 @@ class NodeInternals_NonTerm(NodeInternals):
 
 
 
-    def absorb(self, blob, constraints, conf):
+    def absorb(self, blob, constraints, conf, start=0):
         '''
         TOFIX: Checking existence condition independently from data
                description order is not supported. Only supported
@@ -3113,21 +3418,30 @@ class NodeInternals_NonTerm(NodeInternals):
         if self.absorb_constraints is not None:
             constraints = self.absorb_constraints
 
-        def _try_separator_absorption_with(blob, consumed_size):
+        # The blob is never sliced: sub-nodes are given the offset
+        # where their absorption starts ('start' + 'consumed_size').
+
+        # Packrat memo shared by the whole Node.absorb() call (refer to
+        # AbsorbMemo)
+        env = self._get_env()
+        abs_memo = env.absorb_memo if env is not None else None
+        if abs_memo is None:
+            abs_memo = AbsorbMemo()
+
+        def _try_separator_absorption_with(consumed_size):
             DEBUG = False
 
             new_sep = self._clone_separator(self.separator.node, unique=True)
             abort = False
 
-            orig_blob = blob
             orig_consumed_size = consumed_size
 
             # We try to absorb the separator
-            st, off, sz, name = new_sep.absorb(blob, constraints, conf=conf)
+            st, off, sz, name = new_sep.absorb(blob, constraints, conf=conf, start=start+consumed_size)
 
             if st == AbsorbStatus.Reject:
                 if DEBUG:
-                    print('REJECTED: SEPARATOR, blob: %r ...' % blob[:4])
+                    print('REJECTED: SEPARATOR, blob: %r ...' % blob[start+consumed_size:start+consumed_size+4])
                 abort = True
             elif st == AbsorbStatus.Absorbed or st == AbsorbStatus.FullyAbsorbed:
                 if off != 0:
@@ -3135,21 +3449,20 @@ class NodeInternals_NonTerm(NodeInternals):
                     new_sep.cancel_absorb()
                 else:
                     if DEBUG:
-                        print('ABSORBED: SEPARATOR, blob: %r ..., consumed: %d' % (blob[:4], sz))
-                    blob = blob[sz:]
+                        print('ABSORBED: SEPARATOR, blob: %r ..., consumed: %d' \
+                              % (blob[start+consumed_size:start+consumed_size+4], sz))
                     consumed_size += sz
             else:
                 raise ValueError
 
             if abort:
-                blob = orig_blob
                 consumed_size = orig_consumed_size
 
-            return abort, blob, consumed_size, new_sep
+            return abort, consumed_size, new_sep
 
 
         # Helper function
-        def _try_absorption_with(base_node, min_node, max_node, blob, consumed_size,
+        def _try_absorption_with(base_node, min_node, max_node, consumed_size,
                                  postponed_node_desc, force_clone=False):
 
             DEBUG = False
@@ -3167,9 +3480,10 @@ class NodeInternals_NonTerm(NodeInternals):
                         max_node = min_node = 0
 
             if max_node == 0:
-                return None, blob, consumed_size, consumed_nb
+                return None, consumed_size, consumed_nb
+
+            memoized = abs_memo.is_memoizable(base_node)
 
-            orig_blob = blob
             orig_consumed_size = consumed_size
             nb_absorbed = 0
             abort = False
@@ -3180,12 +3494,28 @@ class NodeInternals_NonTerm(NodeInternals):
                 node = self._clone_node(base_node, node_no-1, force_clone)
 
                 # We try to absorb the blob
-                st, off, sz, name = node.absorb(blob, constraints, conf=conf)
+                outcome = abs_memo.get(base_node, blob, start+consumed_size, constraints, conf) \
+                          if memoized else None
+                if outcome is not None and (outcome[0] == AbsorbStatus.Reject or
+                                            (outcome[1] != 0 and postponed_node_desc is None)):
+                    # a match at off > 0 is rejected as well when there
+                    # is no postponed node (refer below)
+                    st = AbsorbStatus.Reject
+                else:
+                    st, off, sz, name = node.absorb(blob, constraints, conf=conf, start=start+consumed_size)
+                    if memoized:
+                        if st == AbsorbStatus.Reject or off != 0:
+                            abs_memo.set(base_node, blob, start+consumed_size, constraints, conf,
+                                         (st, off, sz))
+                        else:
+                            # the node may now accept more values
+                            abs_memo.forget(base_node)
 
                 if st == AbsorbStatus.Reject:
                     nb_absorbed = node_no-1
                     if DEBUG:
-                        print('REJECT: %s, blob: %r ...' % (node.name, blob[:4]))
+                        print('REJECT: %s, blob: %r ...' \
+                              % (node.name, blob[start+consumed_size:start+consumed_size+4]))
                     if min_node == 0:
                         # abort = False
                         break
@@ -3197,13 +3527,14 @@ class NodeInternals_NonTerm(NodeInternals):
                 elif st == AbsorbStatus.Absorbed or st == AbsorbStatus.FullyAbsorbed:
                     if DEBUG:
                         print('\nABSORBED: %s, abort: %r, blob: %r ... , consumed: %d' \
-                              % (node.name, abort, blob[off:sz][:100], sz))
+                              % (node.name, abort, blob[start+consumed_size+off:start+consumed_size+sz][:100], sz))
                         
                     nb_absorbed = node_no
                     sz2 = 0
                     if postponed_node_desc is not None:
                         # we only support one postponed node between two nodes
-                        st2, off2, sz2, name2 = postponed_node_desc[0].absorb(blob[:off], constraints, conf=conf)
+                        st2, off2, sz2, name2 = postponed_node_desc[0].absorb(blob[start+consumed_size:start+consumed_size+off],
+                                                                                  constraints, conf=conf)
                         if st2 == AbsorbStatus.Reject:
                             postponed_node_desc = None
                             abort = True
@@ -3235,14 +3566,13 @@ class NodeInternals_NonTerm(NodeInternals):
                                 # abort = False
                                 break
                             
-                    if sz2 == off:                        
-                        blob = blob[off+sz:]
+                    if sz2 == off:
                         consumed_size += sz+sz2 # off+sz
                         consumed_nb = nb_absorbed
                         tmp_list.append(node)
 
                         if self.separator is not None:
-                            abort, blob, consumed_size, new_sep = _try_separator_absorption_with(blob, consumed_size)
+                            abort, consumed_size, new_sep = _try_separator_absorption_with(consumed_size)
                             if abort:
                                 if nb_absorbed >= min_node:
                                     abort = False
@@ -3258,7 +3588,6 @@ class NodeInternals_NonTerm(NodeInternals):
                 node_no += 1
 
             if abort:
-                blob = orig_blob
                 consumed_size = orig_consumed_size
                 for n in tmp_list:
                     # Resetting all Generator nodes
@@ -3275,7 +3604,7 @@ class NodeInternals_NonTerm(NodeInternals):
                     n._set_clone_info((idx, nb_absorbed), base_node)
                 self.frozen_node_list += tmp_list
 
-            return abort, blob, consumed_size, consumed_nb
+            return abort, consumed_size, consumed_nb
 
 
         while not abs_exhausted and status == AbsorbStatus.Reject:
@@ -3298,7 +3627,7 @@ class NodeInternals_NonTerm(NodeInternals):
             self.frozen_node_list = []
 
             if self.separator is not None and self.separator.prefix:
-                abort, blob, consumed_size, new_sep = _try_separator_absorption_with(blob, consumed_size)
+                abort, consumed_size, new_sep = _try_separator_absorption_with(consumed_size)
                 if abort:
                     break
                 else:
@@ -3322,9 +3651,9 @@ class NodeInternals_NonTerm(NodeInternals):
                             postponed_node_desc = node_desc
                             continue
                         else:
-                            abort, blob, consumed_size, consumed_nb = _try_absorption_with(base_node,
+                            abort, consumed_size, consumed_nb = _try_absorption_with(base_node,
                                                                               min_node, max_node,
-                                                                              blob, consumed_size,
+                                                                              consumed_size,
                                                                               postponed_node_desc)
 
                             # In this case max_node is 0
@@ -3373,8 +3702,8 @@ class NodeInternals_NonTerm(NodeInternals):
                                 base_node, min_node, max_node = NodeInternals_NonTerm._parse_node_desc(node_desc)
 
                                 # postponed_node_desc is not supported here as it does not make sense
-                                abort, blob, consumed_size, consumed_nb = _try_absorption_with(base_node, min_node, max_node,
-                                                                                        blob, consumed_size,
+                                abort, consumed_size, consumed_nb = _try_absorption_with(base_node, min_node, max_node,
+                                                                                        consumed_size,
                                                                                         postponed_node_desc=postponed_node_desc)
                                 # if abort is None:
                                 #     continue
@@ -3423,10 +3752,10 @@ class NodeInternals_NonTerm(NodeInternals):
                                 
                                     if max_node != 0:
                                         # postponed_node_desc is not supported here as it does not make sense
-                                        tmp_abort, blob, consumed_size, consumed_nb = _try_absorption_with(base_node,
+                                        tmp_abort, consumed_size, consumed_nb = _try_absorption_with(base_node,
                                                                                         fake_min_node,
                                                                                         max_node,
-                                                                                        blob, consumed_size,
+                                                                                        consumed_size,
                                                                                         postponed_node_desc=postponed_node_desc,
                                                                                         force_clone=force_clone)
 
@@ -3484,8 +3813,8 @@ class NodeInternals_NonTerm(NodeInternals):
                                 continue
 
                             else:
-                                abort, blob, consumed_size, consumed_nb = _try_absorption_with(base_node, min_node, max_node,
-                                                                                               blob, consumed_size,
+                                abort, consumed_size, consumed_nb = _try_absorption_with(base_node, min_node, max_node,
+                                                                                               consumed_size,
                                                                                                postponed_node_desc)
 
                                 if abort is None or abort:
@@ -3507,11 +3836,13 @@ class NodeInternals_NonTerm(NodeInternals):
                     sep = self.frozen_node_list.pop(-1)
                     data = sep._tobytes()
                     consumed_size = consumed_size - len(data)
-                    blob = blob + data
 
             if not abort:
                 status = AbsorbStatus.Absorbed
 
+        # frozen_node_list has been modified in place during absorption
+        Node._structure_changed(self._get_env())
+
         # clean up
         if status != AbsorbStatus.Absorbed and status != AbsorbStatus.FullyAbsorbed:
             self.cancel_absorb()
@@ -3784,39 +4115,13 @@ class NodeInternals_NonTerm(NodeInternals):
         for e in iterable:
             e._reset_depth(depth)
 
-    def get_child_nodes_by_attr(self, internals_criteria, semantics_criteria, owned_conf, conf, path_regexp,
-                               exclude_self, respect_order, relative_depth, top_node, ignore_fstate):
-
+    def get_child_nodes(self, ignore_fstate):
+        # if the node is not frozen, the order will not be preserved
+        # as self.subnodes_set will be used, and it is a set()
         if self.frozen_node_list is not None and not ignore_fstate:
-            iterable = self.frozen_node_list
+            return self.frozen_node_list
         else:
-            iterable = self.subnodes_set
-            # self.get_subnodes_with_csts()
-            # iterable = self.frozen_node_list
-
-        if respect_order:
-            # if the node is not frozen, the order will not be
-            # preserved as self.subnodes_set will be used as a base,
-            # and it is a set()
-            s = []
-        else:
-            s = set()
-
-        for e in iterable:
-            nlist = e.get_reachable_nodes(internals_criteria, semantics_criteria, owned_conf, conf,
-                                          path_regexp=path_regexp,
-                                          exclude_self=False, respect_order=respect_order,
-                                          relative_depth=relative_depth, top_node=top_node,
-                                          ignore_fstate=ignore_fstate)
-
-            if respect_order:
-                for e in nlist:
-                    if e not in s:
-                        s.append(e)
-            else:
-                s = s.union(nlist)
-
-        return s
+            return self.subnodes_set
 
 
     def set_child_current_conf(self, node, conf, reverse, ignore_entanglement):
@@ -3882,6 +4187,7 @@ class NodeSemantics(object):
 
     def add_attributes(self, attrs):
         self.__attrs += attrs
+        Node._semantics_gen = next(Node._gen_sequence)
 
     def _match_optionalbut1_criteria(self, criteria):
         if criteria is None:
@@ -4025,6 +4331,16 @@ class NodeSemanticsCriteria(object):
     def get_negative_criteria(self):
         return self.__negative
 
+    def get_signature(self):
+        '''
+        Return an hashable object that identify the current criteria.
+        '''
+        def _sig(crit):
+            return None if crit is None else tuple(crit)
+
+        return (_sig(self.__optionalbut1), _sig(self.__mandatory),
+                _sig(self.__exclusive), _sig(self.__negative))
+
 
 
 ##########################
@@ -4133,6 +4449,50 @@ class Node(object):
     CORRUPT_QTY_SYNC = 6
     CORRUPT_NODE_QTY = 7
 
+    # Generation numbers used to invalidate the path indexes, the results
+    # of get_reachable_nodes() and the value caches kept by the nodes. The
+    # structure one changes each time the shape of a graph may have changed
+    # (frozen subnodes, generated nodes, node internals, ...), and the
+    # properties one each time a node property that can be used to look
+    # for nodes is changed (attributes, semantics, fuzz weight, ...).
+    #
+    # They are tracked per graph, within the Env() shared by its nodes (the
+    # node internals know it through their owner node), so that modifying a
+    # graph does not invalidate the caches of the other ones. The
+    # class-wide ones are used by the nodes without Env() (e.g., a graph
+    # under construction). All the numbers are taken from the same
+    # sequence, thus a number identifies a graph and a state of it.
+    _gen_sequence = itertools.count(1)
+    _structure_gen = 0
+    _properties_gen = 0
+    # NodeSemantics do not know the nodes they are attached to
+    _semantics_gen = 0
+
+    @staticmethod
+    def _structure_changed(env):
+        if env is None:
+            Node._structure_gen = next(Node._gen_sequence)
+        else:
+            env.structure_gen = next(Node._gen_sequence)
+
+    @staticmethod
+    def _properties_changed(env):
+        if env is None:
+            Node._properties_gen = next(Node._gen_sequence)
+        else:
+            env.properties_gen = next(Node._gen_sequence)
+
+    def _get_structure_gen(self):
+        env = self.env
+        return Node._structure_gen if env is None else env.structure_gen
+
+    def _get_generations(self):
+        env = self.env
+        if env is None:
+            return (Node._structure_gen, Node._properties_gen, Node._semantics_gen)
+        else:
+            return (env.structure_gen, env.properties_gen, Node._semantics_gen)
+
     def __init__(self, name, base_node=None, copy_dico=None, ignore_frozen_state=False,
                  accept_external_entanglement=False, acceptance_set=None,
                  subnodes=None, values=None, value_type=None, vt=None, new_env=False):
@@ -4177,6 +4537,10 @@ class Node(object):
         self.depth = 0
         self.tmp_ref_count = 1
 
+        self._paths_index = None
+        self._reachable_nodes_cache = None
+        self._value_cache = None
+
         if base_node is not None and subnodes is None and values is None and value_type is None:
 
             self._delayed_jobs_called = base_node._delayed_jobs_called
@@ -4292,6 +4656,7 @@ class Node(object):
             self.add_conf(conf)
 
             self.internals[conf] = copy.copy(base_node.internals[conf])
+            self.internals[conf]._env = self.env
             self.internals[conf].make_private(ignore_frozen_state=ignore_frozen_state,
                                               accept_external_entanglement=accept_external_entanglement,
                                               delayed_node_internals=delayed_node_internals)
@@ -4377,6 +4742,10 @@ class Node(object):
                 node.entangled_nodes = intrics
 
         self.current_conf = copy.copy(base_node.current_conf)
+        self._paths_index = None
+        self._reachable_nodes_cache = None
+        self._value_cache = None
+        Node._structure_changed(self.env)
 
         self._reset_depth(parent_depth=self.depth-1)
 
@@ -4398,6 +4767,7 @@ class Node(object):
           None
         '''
         self.fuzz_weight = int(w)
+        Node._properties_changed(self.env)
 
     def get_fuzz_weight(self):
         '''Return the fuzzing weight of the node.
@@ -4417,7 +4787,9 @@ class Node(object):
         Returns:
           None
         '''
-        self.fuzz_weight = 1
+        if self.fuzz_weight != 1:
+            self.fuzz_weight = 1
+            Node._properties_changed(self.env)
         if recursive:
             for conf in self.internals:
                 self.internals[conf].reset_fuzz_weight(recursive=recursive)
@@ -4426,6 +4798,7 @@ class Node(object):
         # @conf could not be None or the empty string
         if conf and conf not in self.internals:
             self.internals[conf] = None
+            Node._structure_changed(self.env)
             return True
         else:
             return False
@@ -4433,6 +4806,7 @@ class Node(object):
     def remove_conf(self, conf):
         if conf != 'MAIN':
             del self.internals[conf]
+            Node._structure_changed(self.env)
 
     def is_conf_existing(self, conf):
         return conf in self.internals
@@ -4451,6 +4825,7 @@ class Node(object):
 
         if not reverse:
             node.current_conf = conf2
+            Node._structure_changed(node.env)
 
         if node.internals[node.current_conf]: # When an Node is created empty, there is None internals
             node.internals[node.current_conf].set_child_current_conf(node, conf, reverse,
@@ -4463,6 +4838,7 @@ class Node(object):
 
         if reverse:
             node.current_conf = conf2
+            Node._structure_changed(node.env)
 
 
     def set_current_conf(self, conf, recursive=True, reverse=False, root_regexp=None, ignore_entanglement=False):
@@ -4478,6 +4854,7 @@ class Node(object):
             else:
                 if e.is_conf_existing(conf):
                     e.current_conf = conf
+                    Node._structure_changed(e.env)
 
         if not ignore_entanglement and self.entangled_nodes is not None:
             for e in self.entangled_nodes:
@@ -4522,7 +4899,8 @@ class Node(object):
         return self.internals[self.current_conf]
 
     def __set_current_internals(self, internal):
-        self.internals[self.current_conf] = internal
+        self._check_structure_change(self.internals[self.current_conf], internal)
+        self._install_internals(self.current_conf, internal)
 
     def __get_internals(self):
         return self.internals
@@ -4538,6 +4916,8 @@ class Node(object):
                     accept_external_entanglement=True)
 
     def set_internals(self, backup):
+        if self.env is not backup.env:
+            Node._structure_changed(self.env)
         self.name = backup.name
         self.env = backup.env
         self.semantics = backup.semantics
@@ -4545,8 +4925,22 @@ class Node(object):
         self.depth = backup.depth
         self.tmp_ref_count = backup.tmp_ref_count
         self.internals = backup.internals
+        self._set_env_ref(self.env)
         self.current_conf = backup.current_conf
         self.entangled_nodes = backup.entangled_nodes
+        Node._structure_changed(self.env)
+
+    def _check_structure_change(self, old_internals, new_internals):
+        # Replacing a terminal node by another one does not alter the
+        # shape of the graph
+        if not isinstance(old_internals, NodeInternals_Term) or \
+           not isinstance(new_internals, NodeInternals_Term):
+            Node._structure_changed(self.env)
+        else:
+            Node._properties_changed(self.env)
+        # but it alters its value
+        if old_internals is not None and old_internals is not new_internals:
+            old_internals._value_changed()
 
     def __check_conf(self, conf):
         if conf is None:
@@ -4613,6 +5007,10 @@ class Node(object):
         for e in self.internals[conf].subnodes_set:
             check_err.add(e.name)
             e._reset_depth(depth)
+            # new subnodes join the graph, so that their changes are
+            # reported to it (refer to _structure_changed())
+            if e.env is None and self.env is not None:
+                e.set_env(self.env)
 
         if len(check_err) != len(self.internals[conf].subnodes_set):
             print('\n*** /!\\ ERROR /!\\\n')
@@ -4646,7 +5044,7 @@ class Node(object):
     def set_subnodes_basic(self, node_list, conf=None, ignore_entanglement=False, separator=None):
         conf = self.__check_conf(conf)
 
-        self.internals[conf] = NodeInternals_NonTerm()
+        self._install_internals(conf, NodeInternals_NonTerm())
         self.internals[conf].import_subnodes_basic(node_list, separator=separator)
         self._finalize_nonterm_node(conf)
    
@@ -4659,7 +5057,7 @@ class Node(object):
     def set_subnodes_with_csts(self, wlnode_list, conf=None, ignore_entanglement=False, separator=None):
         conf = self.__check_conf(conf)
 
-        self.internals[conf] = NodeInternals_NonTerm()
+        self._install_internals(conf, NodeInternals_NonTerm())
         self.internals[conf].import_subnodes_with_csts(wlnode_list, separator=separator)
         self._finalize_nonterm_node(conf)
 
@@ -4671,7 +5069,7 @@ class Node(object):
     def set_subnodes_full_format(self, full_list, conf=None, separator=None):
         conf = self.__check_conf(conf)
 
-        self.internals[conf] = NodeInternals_NonTerm()
+        self._install_internals(conf, NodeInternals_NonTerm())
         self.internals[conf].import_subnodes_full_format(subnodes_csts=full_list, separator=separator)
         self._finalize_nonterm_node(conf)
 
@@ -4679,19 +5077,23 @@ class Node(object):
     def set_values(self, val_list=None, value_type=None, conf=None, ignore_entanglement=False):
         conf = self.__check_conf(conf)
 
+        old_internals = self.internals[conf]
+
         if val_list is not None:
             from fuzzfmk.value_types import String
 
-            self.internals[conf] = NodeInternals_TypedValue()
+            self._install_internals(conf, NodeInternals_TypedValue())
             self.internals[conf].import_value_type(value_type=String(val_list=val_list))
 
         elif value_type is not None:
-            self.internals[conf] = NodeInternals_TypedValue()
+            self._install_internals(conf, NodeInternals_TypedValue())
             self.internals[conf].import_value_type(value_type)
 
         else:
             raise ValueError
 
+        self._check_structure_change(old_internals, self.internals[conf])
+
         if not ignore_entanglement and self.entangled_nodes is not None:
             for e in self.entangled_nodes:
                 if value_type is not None:
@@ -4704,11 +5106,15 @@ class Node(object):
                  conf=None, ignore_entanglement=False, provide_helpers=False):
         conf = self.__check_conf(conf)
 
-        self.internals[conf] = NodeInternals_Func()
+        old_internals = self.internals[conf]
+
+        self._install_internals(conf, NodeInternals_Func())
         self.internals[conf].import_func(func,
                                          fct_node_arg=func_node_arg, fct_arg=func_arg,
                                          provide_helpers=provide_helpers)
 
+        self._check_structure_change(old_internals, self.internals[conf])
+
         if not ignore_entanglement and self.entangled_nodes is not None:
             for e in self.entangled_nodes:
                 e.set_func(func, func_node_arg=func_node_arg,
@@ -4721,10 +5127,11 @@ class Node(object):
                            provide_helpers=False):
         conf = self.__check_conf(conf)
 
-        self.internals[conf] = NodeInternals_GenFunc()
+        self._install_internals(conf, NodeInternals_GenFunc())
         self.internals[conf].import_generator_func(gen_func,
                                                    generator_node_arg=func_node_arg, generator_arg=func_arg,
                                                    provide_helpers=provide_helpers)
+        Node._structure_changed(self.env)
 
         if not ignore_entanglement and self.entangled_nodes is not None:
             for e in self.entangled_nodes:
@@ -4733,21 +5140,63 @@ class Node(object):
 
     def make_empty(self, conf=None):
         conf = self.__check_conf(conf)
-        self.internals[conf] = NodeInternals_Empty()
+        self._install_internals(conf, NodeInternals_Empty())
+        Node._structure_changed(self.env)
         
     def is_empty(self, conf=None):
         conf = self.__check_conf(conf)
         return isinstance(self.internals[conf], NodeInternals_Empty)
 
-    def absorb(self, blob, constraints=AbsCsts(), conf=None):
+    def absorb(self, blob, constraints=AbsCsts(), conf=None, start=0):
+        '''
+        Absorb `blob` from the offset `start`. `blob` can also be an
+        mmap object, in which case only the absorbed values are
+        copied in memory (refer to :meth:`Node.absorb_file`).
+
+        Returns:
+            tuple: (status, offset, size, node name). `offset` is
+            relative to `start`.
+        '''
         conf, next_conf = self._compute_confs(conf=conf, recursive=True)
-        blob = convert_to_internal_repr(blob)
-        status, off, sz = self.internals[conf].absorb(blob, constraints=constraints, conf=next_conf)
-        if len(blob) == sz and status == AbsorbStatus.Absorbed:
+        if not isinstance(blob, mmap.mmap):
+            blob = convert_to_internal_repr(blob)
+        env = self.env
+        memo_owner = env is not None and env.absorb_memo is None
+        if memo_owner:
+            env.absorb_memo = AbsorbMemo()
+        try:
+            status, off, sz = self.internals[conf].absorb(blob, constraints=constraints, conf=next_conf,
+                                                          start=start)
+        finally:
+            if memo_owner:
+                env.absorb_memo = None
+        if len(blob) - start == sz and status == AbsorbStatus.Absorbed:
             status = AbsorbStatus.FullyAbsorbed
             self.internals[conf].confirm_absorb()
         return status, off, sz, self.name
 
+    def absorb_file(self, path, constraints=AbsCsts(), conf=None):
+        '''
+        Absorb the contents of the file `path`. The file is mapped in
+        memory instead of being read, so that large files can be
+        absorbed without copying them.
+        '''
+        with open(path, 'rb') as f:
+            try:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # an empty file cannot be mapped
+                return self.absorb(b'', constraints=constraints, conf=conf)
+            try:
+                return self.absorb(blob, constraints=constraints, conf=conf)
+            finally:
+                try:
+                    blob.close()
+                except BufferError:
+                    # some views on the mapping are still alive, it
+                    # will be closed when they are released
+                    pass
+
     def set_absorb_helper(self, helper, conf=None):
         conf = self.__check_conf(conf)
         self.internals[conf].set_absorb_helper(helper)
@@ -4801,6 +5250,11 @@ class Node(object):
         conf = self.__check_conf(conf)
         self.internals[conf].set_node_sync(node, scope=scope, param=param)
 
+    def _has_existence_condition(self):
+        internal = self.internals[self.current_conf]
+        return internal.get_node_sync(SyncScope.Existence) is not None \
+            or internal.get_node_sync(SyncScope.Inexistence) is not None
+
     def synchronized_with(self, scope, conf=None):
         conf = self.__check_conf(conf)
         val = self.internals[conf].get_node_sync(scope)
@@ -4846,6 +5300,7 @@ class Node(object):
         else:
             assert(isinstance(sem, list))
             self.semantics = NodeSemantics(sem)
+        Node._properties_changed(self.env)
 
     def get_semantics(self):
         return self.semantics
@@ -4854,96 +5309,113 @@ class Node(object):
     def get_reachable_nodes(self, internals_criteria=None, semantics_criteria=None,
                             owned_conf=None, conf=None, path_regexp=None, exclude_self=False,
                             respect_order=False, relative_depth=-1, top_node=None, ignore_fstate=False):
-        
-        def __compliant(node, config, top_node):
-            if node is top_node and exclude_self:
-                return False
+        '''
+        Return the nodes reachable from this one that match the provided criteria.
 
-            if internals_criteria:
-                cond1 = node.internals[config].match(internals_criteria)
-            else:
-                cond1 = True
+        The graph is traversed only once, the criteria are compiled before the
+        traversal, and the result is kept until the graph (structure or node
+        properties) changes. Thus, repeated queries on an unchanged graph
+        does not walk it again.
+
+        Args:
+          internals_criteria (NodeInternalsCriteria): criteria on the node internals
+          semantics_criteria (NodeSemanticsCriteria): criteria on the node semantics
+          owned_conf (str): only keep the nodes that own this configuration
+          conf (str): configuration to use for the traversal (current one if None)
+          path_regexp (str): only keep the nodes that have a path from `top_node`
+            matching this regexp
+          exclude_self (bool): if True, this node is not part of the result
+          respect_order (bool): if True, the nodes are provided in the order of
+            the graph traversal. Otherwise they are sorted by fuzz weight and name.
+          relative_depth (int): depth limit of the search (-1 means no limit)
+          top_node (Node): node from which the paths are computed (the node itself if None)
+          ignore_fstate (bool): if True, the non-terminal nodes are traversed
+            based on all their subnodes instead of their frozen subnodes.
+
+        Returns:
+          list: list of the matching nodes
+        '''
+        if top_node is None:
+            top_node = self
+
+        gen = self._get_generations()
+
+        key = (None if internals_criteria is None else internals_criteria.get_signature(),
+               None if semantics_criteria is None else semantics_criteria.get_signature(),
+               owned_conf, conf, path_regexp, exclude_self, respect_order, relative_depth,
+               top_node, ignore_fstate)
+
+        if self._reachable_nodes_cache is not None and self._reachable_nodes_cache[0] == gen:
+            nodes = self._reachable_nodes_cache[1].get(key, None)
+            if nodes is not None:
+                return list(nodes)
+        else:
+            self._reachable_nodes_cache = None
+
+        ic_checks = None if internals_criteria is None else internals_criteria.compile()
+
+        if path_regexp is not None:
+            regexp = re.compile(path_regexp)
+            htable, node2paths = top_node._get_paths_index(conf=None, recursive=True)
+        else:
+            regexp = None
+            node2paths = None
+
+        def __compliant(node, internal):
+            if ic_checks:
+                for check, crit in ic_checks:
+                    if not check(internal, crit):
+                        return False
 
             if semantics_criteria:
-                if node.semantics is None:
-                    cond2 = False
-                else:
-                    cond2 = node.semantics.match(semantics_criteria)
-            else:
-                cond2 = True
+                if node.semantics is None or not node.semantics.match(semantics_criteria):
+                    return False
 
-            if path_regexp is not None:
-                paths = node.get_all_paths_from(top_node)
-                for p in paths:
-                    if re.search(path_regexp, p):
-                        cond3 = True
+            if regexp is not None:
+                for p in node2paths.get(node, []):
+                    if regexp.search(p):
                         break
                 else:
-                    cond3 = False
-            else:
-                cond3 = True
+                    return False
 
-            return cond1 and cond2 and cond3
-
-
-        def get_reachable_nodes_rec(node, config, rdepth, top_node):
-            s = []
-            # if respect_order:
-            #     s = []
-            # else:
-            #     s = set()
+            return True
 
-            if config == None:
-                config = self.current_conf
-                next_conf = None
-            else:
-                next_conf = config
+        nodes = []
+        checked = set()
+        explored = {}
 
-            if not node.is_conf_existing(config):
+        def __explore(node, rdepth):
+            if conf is None or not node.is_conf_existing(conf):
                 config = node.current_conf
+            else:
+                config = conf
 
             internal = node.internals[config]
 
-            if node.is_conf_existing(owned_conf) or (owned_conf == None):
-                if __compliant(node, config, top_node):
-                    s.append(node)
-                    # if respect_order:
-                    #     s.append(node)
-                    # else:
-                    #     s.add(node)
+            if node not in checked:
+                checked.add(node)
+                if exclude_self and node is self and node is top_node:
+                    pass
+                elif (owned_conf is None or node.is_conf_existing(owned_conf)) and \
+                     __compliant(node, internal):
+                    nodes.append(node)
 
             if rdepth <= -1 or rdepth > 0:
-                s2 = internal.get_child_nodes_by_attr(internals_criteria=internals_criteria,
-                                                      semantics_criteria=semantics_criteria,
-                                                      owned_conf=owned_conf, conf=next_conf,
-                                                      path_regexp=path_regexp,
-                                                      exclude_self=False,
-                                                      respect_order=respect_order,
-                                                      relative_depth = rdepth - 1,
-                                                      top_node=top_node, ignore_fstate=ignore_fstate)
-                if s2:
-                    for e in s2:
-                        if e not in s:
-                            s.append(e)
-                    # if respect_order:
-                    #     for e in s2:
-                    #         if e not in s:
-                    #             s.append(e)
-                    # else:
-                    #     s = s.union(s2)
-
-            return s
+                # A node already explored with at least the same
+                # remaining depth won't provide new results
+                reach = explored.get(node, None)
+                if reach is not None and (reach <= -1 or (rdepth > 0 and reach >= rdepth)):
+                    return
+                explored[node] = rdepth
 
-        if top_node is None:
-            nodes = get_reachable_nodes_rec(node=self, config=conf, rdepth=relative_depth,
-                                            top_node=self)
-        else:
-            nodes = get_reachable_nodes_rec(node=self, config=conf, rdepth=relative_depth,
-                                            top_node=top_node)
+                subnodes = internal.get_child_nodes(ignore_fstate)
+                if subnodes:
+                    for e in subnodes:
+                        __explore(e, rdepth - 1)
 
-        if respect_order:
-            return nodes
-        else:
+        __explore(self, relative_depth)
+
+        if not respect_order:
             l1 = []
             l2 = []
             for e in nodes:
@@ -4953,7 +5425,17 @@ class Node(object):
                     l2.append(e)
             l1 = sorted(l1, key=lambda x: -x.get_fuzz_weight())
 
-            return l1 + sorted(l2, key=lambda x: x.name)
+            nodes = l1 + sorted(l2, key=lambda x: x.name)
+
+        # The graph traversal may have altered it (e.g., generator
+        # nodes created on the fly). In such a case the result is not
+        # kept.
+        if gen == self._get_generations():
+            if self._reachable_nodes_cache is None:
+                self._reachable_nodes_cache = (gen, {})
+            self._reachable_nodes_cache[1][key] = nodes
+
+        return list(nodes)
 
 
     @staticmethod
@@ -4980,7 +5462,7 @@ class Node(object):
         The set of nodes that is used to perform the search include
         the node itself and all the subnodes behind it.
         '''
-        htable = self.get_all_paths(conf=conf)
+        htable, node2paths = self._get_paths_index(conf=conf, recursive=True)
 
         if path is None:
             assert(path_regexp is not None)
@@ -5022,10 +5504,49 @@ class Node(object):
         internal.get_child_all_path(name, htable, conf=next_conf, recursive=recursive)
 
 
-    def get_all_paths(self, conf=None, recursive=True, depth_min=None, depth_max=None):
+    def _get_paths_index(self, conf, recursive):
+        '''
+        Return the paths of every node reachable from this one, together with
+        the reverse mapping (node --> list of paths). Both are kept as long as
+        the graph structure does not change (tracked through the structure
+        generation of the graph), so that successive lookups does not require to
+        walk the whole graph again.
+
+        The returned objects shall not be modified.
+        '''
+        key = (conf, recursive)
+        gen = self._get_structure_gen()
+        if self._paths_index is not None and self._paths_index[0] == gen:
+            index = self._paths_index[1].get(key, None)
+            if index is not None:
+                return index
+        else:
+            self._paths_index = None
+
         htable = collections.OrderedDict()
         self._get_all_paths_rec('', htable, conf, recursive=recursive)
 
+        node2paths = {}
+        for path, node in htable.items():
+            if node in node2paths:
+                node2paths[node].append(path)
+            else:
+                node2paths[node] = [path]
+
+        # Walking the graph may have altered it (e.g., generator nodes
+        # that are created on the fly). In such a case the index is not
+        # kept as it may be already obsolete.
+        if gen == self._get_structure_gen():
+            if self._paths_index is None:
+                self._paths_index = (gen, {})
+            self._paths_index[1][key] = (htable, node2paths)
+
+        return htable, node2paths
+
+    def get_all_paths(self, conf=None, recursive=True, depth_min=None, depth_max=None):
+        htable, node2paths = self._get_paths_index(conf=conf, recursive=recursive)
+        htable = copy.copy(htable)
+
         if depth_min is not None or depth_max is not None:
             depth_min = int(depth_min) if depth_min is not None else 0
             depth_max = int(depth_max) if depth_max is not None else -1
@@ -5041,30 +5562,36 @@ class Node(object):
 
 
     def get_path_from(self, node, conf=None):
-        htable = node.get_all_paths(conf=conf)
-        for n, e in htable.items():
-            if e == self:
-                return n
-        else:
-            return None
+        htable, node2paths = node._get_paths_index(conf=conf, recursive=True)
+        paths = node2paths.get(self, None)
+        return paths[0] if paths else None
         # "*** ERROR: get_path_from() --> Node '{:s}' " \
         #         "not reachable from '{:s}'***".format(self.name, node.name)
 
 
     def get_all_paths_from(self, node, conf=None):
-        htable = node.get_all_paths(conf=conf)
-        l = []
-        for n, e in htable.items():
-            if e == self:
-                l.append(n)
-        return l
+        htable, node2paths = node._get_paths_index(conf=conf, recursive=True)
+        return list(node2paths.get(self, []))
 
     
     def get_hkeys(self, conf=None):
-        return set(self.get_all_paths(conf=conf).keys())
+        htable, node2paths = self._get_paths_index(conf=conf, recursive=True)
+        return set(htable.keys())
 
-    def __set_env_rec(self, env):
+    def _set_env_ref(self, env):
+        # the node internals report their changes to the graph they
+        # belong to (refer to Node._structure_changed())
         self.env = env
+        for i in self.internals.values():
+            if i is not None:
+                i._env = env
+
+    def _install_internals(self, conf, internals):
+        internals._env = self.env
+        self.internals[conf] = internals
+
+    def __set_env_rec(self, env):
+        self._set_env_ref(env)
         for c in self.internals:
             self.internals[c].set_child_env(env)
 
@@ -5115,8 +5642,15 @@ class Node(object):
                       "been associted to the Node.)".format(self.name))
             raise ValueError
 
+        use_cache = conf is None and recursive and not self._djobs_pending()
+        if use_cache and self._is_value_cache_valid(internal):
+            return self._value_cache[2]
+
         ret, was_not_frozen = internal._get_value(conf=next_conf, recursive=recursive)
 
+        if use_cache:
+            self._cache_value(internal, ret)
+
         if was_not_frozen:
             self._post_freeze(internal)
             # We need to test self.env because an Node can be freezed
@@ -5130,6 +5664,77 @@ class Node(object):
         return ret
 
 
+    def _djobs_pending(self):
+        # The delayed jobs (existence conditions, generators triggered
+        # last) are resolved during the freeze of the graph, thus no
+        # value can be kept while some of them are pending.
+        env = self.env
+        return env is not None and (env.djobs_exists(Node.DJOBS_PRIO_nterm_existence)
+                                    or env.djobs_exists(Node.DJOBS_PRIO_genfunc))
+
+    def _is_value_cache_valid(self, internal):
+        return self._value_cache is not None and self._value_cache[0] == self._get_structure_gen() \
+            and self._value_cache[1] is internal
+
+    def _is_value_stable(self):
+        internal = self.internals[self.current_conf]
+        if internal.is_attr_set(NodeInternals.DISABLED):
+            return False
+        elif isinstance(internal, NodeInternals_Term):
+            return internal.frozen_node is not None
+        else:
+            return self._is_value_cache_valid(internal)
+
+    def _cache_value(self, internal, value):
+        # The value of a non-terminal node (or a generator node) is
+        # kept until one of the nodes it depends on is modified (the
+        # ones of terminal nodes are already kept within their frozen
+        # state). Only the nodes which values are stable can be used.
+        self._value_cache = None
+        if not internal.is_attr_set(NodeInternals.Freezable):
+            return
+        if isinstance(internal, NodeInternals_GenFunc):
+            # the generated node of such a generator is resolved
+            # through a delayed job
+            if internal.is_attr_set(NodeInternals.TriggerLast) or internal._generated_node is None:
+                return
+        elif isinstance(internal, NodeInternals_NonTerm):
+            # the existence of such subnodes depends on nodes outside
+            # of this subtree
+            for n in internal.subnodes_set:
+                if n._has_existence_condition():
+                    return
+        subnodes = internal.get_child_nodes(ignore_fstate=False)
+        if subnodes is None:
+            return
+        for n in subnodes:
+            if n is None or not n._is_value_stable():
+                return
+        for n in subnodes:
+            n.internals[n.current_conf]._register_value_observer(self)
+        # [structure generation, internals, value, serialized value]
+        self._value_cache = [self._get_structure_gen(), internal, value, None]
+
+    def _invalidate_value_cache(self):
+        self._value_cache = None
+        for conf in self.internals:
+            self.internals[conf]._value_changed()
+
+    def _get_cached_bytes(self):
+        # Only called if the value cache of the node is valid, which
+        # implies that the ones of its subnodes are valid too.
+        cache = self._value_cache
+        if cache[3] is None:
+            l = []
+            for n in cache[1].get_child_nodes(ignore_fstate=False):
+                internal = n.internals[n.current_conf]
+                if isinstance(internal, NodeInternals_Term):
+                    l.append(internal.frozen_node)
+                else:
+                    l.append(n._get_cached_bytes())
+            cache[3] = b''.join(l)
+        return cache[3]
+
     def _post_freeze(self, node_internals):
         if self._post_freeze_handler is not None:
             self._post_freeze_handler(node_internals)
@@ -5159,13 +5764,31 @@ class Node(object):
     def to_bytes(self, conf=None, recursive=True):
         val = self.freeze(conf=conf, recursive=recursive)
         if not isinstance(val, bytes):
-            val = list(flatten(val))
-            val = b''.join(val)
+            if self._value_cache is not None and self._value_cache[2] is val:
+                # only the modified parts of the graph are serialized again
+                val = self._get_cached_bytes()
+            else:
+                val = list(flatten(val))
+                val = b''.join(val)
 
         return val
 
     get_flatten_value = to_bytes
 
+    def to_buffers(self, conf=None, recursive=True):
+        '''
+        Freeze the node and return the frozen values of its terminal
+        nodes as a list of memoryviews, in the order they would appear
+        in :meth:`to_bytes`. No copy of the leaf values is performed,
+        thus the result can be handed over as is to scatter/gather
+        primitives (``socket.sendmsg()``, ``os.writev()``).
+        '''
+        val = self.freeze(conf=conf, recursive=recursive)
+        if isinstance(val, bytes):
+            return [memoryview(val)]
+        else:
+            return [memoryview(x) for x in flatten(val) if x]
+
     def to_str(self, conf=None, recursive=True):
         val = self.to_bytes(conf=conf, recursive=recursive)
         return unconvert_from_internal_repr(val)
@@ -5494,6 +6117,15 @@ class Node(object):
     def __hash__(self):
         return id(self)
 
+    def __copy__(self):
+        # Shallow copy used during the cloning process (refer to
+        # Node.set_contents()). Faster than the generic copy.copy()
+        # behavior, which relies on __reduce_ex__().
+        new_node = type(self).__new__(type(self))
+        new_node.__dict__.update(self.__dict__)
+        new_node._value_cache = None
+        return new_node
+
     def __str__(self):
         # NEVER return something with self._tobytes() as side
         # effects are not welcomed
@@ -5527,6 +6159,10 @@ class Node(object):
 
 
     def __getattr__(self, name):
+        if name.startswith('__'):
+            # special attributes are looked up (e.g., by pickle) before
+            # self.internals exists
+            raise AttributeError(name)
         internals = self.__getattribute__('internals')[self.current_conf]
         if hasattr(internals, name):
             return getattr(internals, name)
@@ -5588,7 +6224,15 @@ class Env4NT(object):
 
 class Env(object):
 
+    # generation numbers of the graph (refer to Node._structure_changed())
+    structure_gen = -1
+    properties_gen = -1
+    # AbsorbMemo of the ongoing Node.absorb() call, if any
+    absorb_memo = None
+
     def __init__(self):
+        self.structure_gen = next(Node._gen_sequence)
+        self.properties_gen = next(Node._gen_sequence)
         self.exhausted_nodes = []
         self.nodes_to_corrupt = {}
         self.env4NT = Env4NT()
@@ -5602,6 +6246,8 @@ class Env(object):
         # self.cpt = 0
 
     def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
         if hasattr(self.env4NT, name):
             return self.env4NT.__getattribute__(name)
         else:
@@ -5802,6 +6448,10 @@ class Env(object):
         new_env._djob_keys = copy.copy(self._djob_keys)
         new_env._djob_groups = copy.copy(self._djob_groups)
         new_env.id_list = copy.copy(self.id_list)
+        new_env.absorb_memo = None
+        # the copy is another graph
+        new_env.structure_gen = next(Node._gen_sequence)
+        new_env.properties_gen = next(Node._gen_sequence)
         # new_env.cpt = 0
         return new_env
 
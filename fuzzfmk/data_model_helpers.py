@@ -26,10 +26,21 @@ import fuzzfmk.value_types as fvt
 from fuzzfmk.value_types import VT
 
 from libs.external_modules import *
+from libs.fs_utils import ensure_dir
 
 import traceback
 import datetime
 import types
+import hashlib
+import pickle
+import io
+import time
+import multiprocessing
+import mmap
+import sysconfig
+
+import fuzzfmk.data_model
+import fuzzfmk.value_types
 
 ################################
 # ModelWalker Helper Functions #
@@ -959,6 +970,48 @@ class ModelHelper(object):
 
 #### Data Model Abstraction
 
+def _absorb_file(absorber, idx, fpath, mapped=False):
+    start = time.time()
+    try:
+        with open(fpath, 'rb') as f:
+            if not mapped or os.fstat(f.fileno()).st_size == 0:
+                # an empty file cannot be mapped
+                d_abs = absorber(f.read(), idx)
+            else:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    d_abs = absorber(blob, idx)
+                finally:
+                    try:
+                        blob.close()
+                    except BufferError:
+                        # some views on the mapping are still alive, it
+                        # will be closed when they are released
+                        pass
+    except Exception:
+        return 'failed', time.time() - start, traceback.format_exc()
+    status = 'ignored' if d_abs is None else 'absorbed'
+    return status, time.time() - start, d_abs
+
+_import_absorber = None
+_import_mapped = False
+
+def _import_worker_init(absorber, mapped):
+    global _import_absorber, _import_mapped
+    _import_absorber = absorber
+    _import_mapped = mapped
+
+def _import_worker_absorb(args):
+    idx, name, fpath = args
+    status, duration, d_abs = _absorb_file(_import_absorber, idx, fpath, _import_mapped)
+    if status == 'absorbed':
+        try:
+            d_abs = DataModel._dumps(d_abs)
+        except Exception:
+            return 'unpicklable', duration, None
+    return status, duration, d_abs
+
+
 class DataModel(object):
     ''' The abstraction of a data model.
     '''
@@ -966,10 +1019,35 @@ class DataModel(object):
     file_extension = 'bin'
     name = None
 
+    # If True, the built data model is saved in a snapshot which is used
+    # to load it the next times, as long as its source files and the
+    # imported data have not changed. It requires the data model to be
+    # picklable (which is more likely if the dill module is available).
+    snapshot_enabled = False
+    # Folder where the snapshots are saved (default one if None)
+    snapshot_folder = None
+    # Number of processes used by import_file_contents() to absorb
+    # the imported files (None means one per CPU)
+    import_workers = 1
+    # If True, the absorbed files are cached (in the snapshot folder)
+    # and an unchanged file is not absorbed again while the data
+    # model sources have not changed. It requires the absorbed data
+    # to be picklable.
+    import_cache_enabled = False
+    # If True, import_file_contents() gives the absorber a read-only
+    # memory mapping of each file (an mmap object) instead of its
+    # contents, so that absorbing it through Node.absorb() only copies
+    # the absorbed values. The mapping is closed afterwards.
+    import_file_mapping = False
+
     def __init__(self):
         self.__dm_hashtable = {}
         self.__built = False
         self.__confs = set()
+        self.__imported_paths = set()
+        self.__from_snapshot = False
+        self.__unpicklable = False
+        self.import_stats = {}
 
 
     def merge_with(self, data_model):
@@ -1001,9 +1079,196 @@ class DataModel(object):
         self.pre_build()
         if not self.__built:
             self.__dm_db = dm_db
-            self.build_data_model()
+            self.__from_snapshot = self._load_snapshot()
+            if not self.__from_snapshot:
+                self.build_data_model()
+                self._save_snapshot()
             self.__built = True
 
+    def is_loaded_from_snapshot(self):
+        return self.__from_snapshot
+
+    def _get_snapshot_path(self):
+        folder = dm_snapshots_folder if self.snapshot_folder is None else self.snapshot_folder
+        return os.path.join(folder, self.name + '.snapshot')
+
+    def _get_snapshot_key(self):
+        h = hashlib.sha1()
+        h.update(repr((fuddly_version, sys.version_info[:2], dill_module)).encode('latin_1'))
+        # the snapshot depends on the data model source and on all the
+        # modules it relies on, thus on their modification time
+        for path in sorted(self._get_module_files()):
+            st = os.stat(path)
+            h.update(repr((path, st.st_mtime, st.st_size)).encode('utf-8'))
+        return h.hexdigest()
+
+    _import_re = re.compile(r'^[ \t]*(?:from[ \t]+(\.*[\w.]*)[ \t]+import\b'
+                            r'|import[ \t]+([\w.]+(?:[ \t]*,[ \t]*[\w.]+)*))', re.M)
+    _stdlib_path = sysconfig.get_paths()['stdlib']
+    _site_paths = (sysconfig.get_paths()['purelib'], sysconfig.get_paths()['platlib'])
+
+    @classmethod
+    def _get_module_file(cls, module):
+        # The modules of the standard library are ignored, as the
+        # python version is already part of the snapshot key. Besides,
+        # which ones are loaded varies during a session.
+        path = getattr(module, '__file__', None)
+        if path is None:
+            return None
+        path = os.path.abspath(path)
+        if path.startswith(cls._stdlib_path) and not path.startswith(cls._site_paths):
+            return None
+        return path if os.path.isfile(path) else None
+
+    def _get_module_files(self):
+        '''
+        Return the files of the modules the data model module relies on,
+        that is, recursively, the modules it imports and the ones defining
+        the objects it references.
+        '''
+        files = set()
+        visited = set()
+        to_visit = [sys.modules[self.__class__.__module__], fuzzfmk.data_model,
+                    fuzzfmk.value_types, sys.modules[__name__]]
+        while to_visit:
+            module = to_visit.pop()
+            if module in visited:
+                continue
+            visited.add(module)
+            path = self._get_module_file(module)
+            if path is None:
+                continue
+            files.add(path)
+
+            deps = []
+            for obj in list(vars(module).values()):
+                if isinstance(obj, types.ModuleType):
+                    deps.append(obj)
+                else:
+                    try:
+                        deps.append(sys.modules.get(obj.__module__))
+                    except Exception:
+                        # no __module__ attribute, or not a string
+                        pass
+            # the modules some values are imported from are only known
+            # from the import statements
+            if path.endswith('.py'):
+                with open(path, 'rb') as f:
+                    src = f.read().decode('latin_1')
+                for mo in self._import_re.finditer(src):
+                    if mo.group(1) is not None:
+                        names = [mo.group(1)]
+                    else:
+                        names = [n.strip() for n in mo.group(2).split(',')]
+                    for name in names:
+                        level = len(name) - len(name.lstrip('.'))
+                        if level:
+                            pkg = (module.__package__ or '').split('.')
+                            name = '.'.join(pkg[:len(pkg)-level+1] + ([name[level:]] if name[level:] else []))
+                        deps.append(sys.modules.get(name))
+            to_visit += [dep for dep in deps if dep is not None and dep not in visited]
+
+        return files
+
+    @staticmethod
+    def _get_imported_files_info(path):
+        if not os.path.isdir(path):
+            return None
+        info = []
+        for fname in sorted(os.listdir(path)):
+            st = os.stat(os.path.join(path, fname))
+            info.append((fname, st.st_mtime, st.st_size))
+        return info
+
+    @staticmethod
+    def _get_pickler(f):
+        pickler = (dill if dill_module else pickle).Pickler(f, protocol=2)
+        # the data models referenced by nodes (through their Env)
+        # are not saved but bound at loading time
+        pickler.persistent_id = lambda obj: obj.name if isinstance(obj, DataModel) else None
+        return pickler
+
+    def _get_unpickler(self, f):
+        dm_db = getattr(self, '_DataModel__dm_db', None)
+        def persistent_load(pid):
+            return self if pid == self.name else dm_db[pid]
+
+        unpickler = (dill if dill_module else pickle).Unpickler(f)
+        unpickler.persistent_load = persistent_load
+        return unpickler
+
+    def _load_snapshot(self):
+        if not self.snapshot_enabled or self.__class__ is DataModel:
+            return False
+
+        path = self._get_snapshot_path()
+        if not os.path.isfile(path):
+            return False
+
+        try:
+            with open(path, 'rb') as f:
+                unpickler = self._get_unpickler(f)
+                key, imported_info = unpickler.load()
+                if key != self._get_snapshot_key():
+                    return False
+                for p, info in imported_info.items():
+                    if self._get_imported_files_info(p) != info:
+                        return False
+                state = unpickler.load()
+        except Exception as e:
+            print("\n*** WARNING: the snapshot of the data model '{:s}' cannot be " \
+                  "loaded ({!r}) ***".format(self.name, e))
+            return False
+
+        if state is None:
+            # this data model has already proved to be unpicklable
+            self.__unpicklable = True
+            return False
+
+        self.__dict__.update(state)
+        return True
+
+    def _save_snapshot(self):
+        if not self.snapshot_enabled or self.__class__ is DataModel or self.__unpicklable:
+            return
+
+        imported_info = {}
+        for p in self.__imported_paths | set([self.get_import_directory_path(create=False)]):
+            imported_info[p] = self._get_imported_files_info(p)
+
+        excluded_attrs = ['_DataModel__dm_db', '_DataModel__built', '_DataModel__from_snapshot',
+                          '_DataModel__unpicklable']
+        state = dict([(k, v) for k, v in self.__dict__.items() if k not in excluded_attrs])
+
+        path = self._get_snapshot_path()
+        try:
+            self._write_snapshot(path, imported_info, state)
+        except Exception as e:
+            # Some data models cannot be pickled (e.g., nodes relying on
+            # lambdas or closures if dill is not available, or graphs too
+            # deep for the recursion limit). The snapshot is then replaced
+            # by a marker, so that the next loads do not try again while
+            # the data model has not changed.
+            print("\n*** WARNING: the snapshot of the data model '{:s}' cannot be " \
+                  "saved ({!r}) ***".format(self.name, e))
+            try:
+                self._write_snapshot(path, imported_info, None)
+            except Exception:
+                pass
+
+    def _write_snapshot(self, path, imported_info, state):
+        tmp_path = path + '.tmp'
+        try:
+            ensure_dir(path)
+            with open(tmp_path, 'wb') as f:
+                pickler = self._get_pickler(f)
+                pickler.dump((self._get_snapshot_key(), imported_info))
+                pickler.dump(state)
+            os.rename(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
     def cleanup(self):
         pass
 
@@ -1113,8 +1378,21 @@ class DataModel(object):
 
 
     def import_file_contents(self, extension=None, absorber=None,
-                             subdir=None, path=None, filename=None):
-
+                             subdir=None, path=None, filename=None, workers=None):
+        '''
+        Absorb the files of the import directory of the data model (or
+        of `path`) with `absorber` (by default :meth:`DataModel.absorb`)
+        and return a dictionary of the absorbed data indexed by file name.
+
+        The files are absorbed by `workers` processes (by default
+        :attr:`DataModel.import_workers`, and one per CPU if it is None),
+        which requires the absorbed data to be picklable. Otherwise,
+        the files are absorbed within the current process. The outcome
+        and the duration of the absorption of each file is recorded
+        within the attribute ``import_stats``. If
+        :attr:`DataModel.import_file_mapping` is True, the absorber is
+        given a memory mapping of each file instead of its contents.
+        '''
         if absorber is None:
             absorber = self.absorb
 
@@ -1122,6 +1400,9 @@ class DataModel(object):
             extension = self.file_extension
         if path is None:
             path = self.get_import_directory_path(subdir=subdir)
+        # the files of this directory are taken into account to
+        # decide if the data model snapshot is still valid
+        self.__imported_paths.add(path)
 
         r_file = re.compile(".*\." + extension + "$")
         def is_good_file_by_ext(fname):
@@ -1139,20 +1420,133 @@ class DataModel(object):
             files = list(filter(is_good_file_by_ext, files))
         else:
             files = list(filter(is_good_file_by_fname, files))
+        files.sort()
         msgs = {}
-        idx = 0
+        self.import_stats = {}
+
+        if workers is None:
+            workers = self.import_workers
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+
+        cache_folder = self._get_import_cache_folder()
+        if cache_folder is not None:
+            absorber_id = getattr(absorber, '__name__', repr(absorber.__class__))
+            key_prefix = repr((self._get_snapshot_key(), absorber_id)).encode('latin_1')
+
+        to_absorb = []
+        for idx, name in enumerate(files):
+            fpath = os.path.join(path, name)
+            cache_path = None
+            if cache_folder is not None:
+                h = hashlib.sha1(key_prefix)
+                h.update(str(idx).encode('latin_1'))
+                with open(fpath, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024*1024), b''):
+                        h.update(chunk)
+                cache_path = os.path.join(cache_folder, h.hexdigest())
+                if self._import_from_cache(name, cache_path, msgs):
+                    continue
+            to_absorb.append((idx, name, fpath, cache_path))
+
+        if workers > 1 and len(to_absorb) > 1:
+            try:
+                pool = multiprocessing.Pool(min(workers, len(to_absorb)),
+                                            initializer=_import_worker_init,
+                                            initargs=(absorber, self.import_file_mapping))
+            except (OSError, ValueError):
+                pool = None
+        else:
+            pool = None
 
-        for name in files:
-            with open(os.path.join(path, name), 'rb') as f:
-                buff = f.read()
-                d_abs = absorber(buff, idx)
-                if d_abs is not None:
+        if pool is not None:
+            try:
+                results = pool.map(_import_worker_absorb, [x[:3] for x in to_absorb])
+            finally:
+                pool.close()
+                pool.join()
+            remaining = []
+            for (idx, name, fpath, cache_path), (status, duration, ret) in zip(to_absorb, results):
+                if status == 'unpicklable':
+                    # absorbed data that cannot be transferred is
+                    # absorbed again within this process
+                    remaining.append((idx, name, fpath, cache_path))
+                    continue
+                if status == 'absorbed':
+                    d_abs = self._loads(ret)
                     msgs[name] = d_abs
-            idx +=1
+                    if cache_folder is not None and not self._store_in_cache(cache_path, ret):
+                        cache_folder = None
+                self._record_import(name, status, duration, ret)
+            to_absorb = remaining
+
+        for idx, name, fpath, cache_path in to_absorb:
+            status, duration, d_abs = _absorb_file(absorber, idx, fpath, self.import_file_mapping)
+            if status == 'absorbed':
+                msgs[name] = d_abs
+                if cache_folder is not None:
+                    try:
+                        buff = self._dumps(d_abs)
+                    except Exception as e:
+                        # the next absorbed data are unlikely to be
+                        # picklable either, thus caching is given up
+                        print("\n*** WARNING: the absorption of the file '{:s}' cannot be " \
+                              "cached ({!r}) ***".format(name, e))
+                        cache_folder = None
+                    else:
+                        if not self._store_in_cache(cache_path, buff):
+                            cache_folder = None
+            self._record_import(name, status, duration, d_abs)
 
         return msgs
 
-    def get_import_directory_path(self, subdir=None):
+    def _get_import_cache_folder(self):
+        if not self.import_cache_enabled or self.__class__ is DataModel or self.__unpicklable:
+            return None
+        return self._get_snapshot_path()[:-len('.snapshot')] + '_imports'
+
+    def _record_import(self, name, status, duration, info):
+        self.import_stats[name] = (status, duration)
+        if status == 'failed':
+            print("\n*** WARNING: the absorption of the file '{:s}' has failed!\n{:s}".format(name, info))
+
+    def _import_from_cache(self, name, cache_path, msgs):
+        if not os.path.isfile(cache_path):
+            return False
+        start = time.time()
+        try:
+            with open(cache_path, 'rb') as f:
+                d_abs = self._loads(f.read())
+        except Exception:
+            return False
+        msgs[name] = d_abs
+        self._record_import(name, 'cached', time.time() - start, None)
+        return True
+
+    def _store_in_cache(self, cache_path, buff):
+        tmp_path = cache_path + '.tmp'
+        try:
+            ensure_dir(cache_path)
+            with open(tmp_path, 'wb') as f:
+                f.write(buff)
+            os.rename(tmp_path, cache_path)
+        except (IOError, OSError) as e:
+            print("\n*** WARNING: the import cache cannot be written ({!s}) ***".format(e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    @staticmethod
+    def _dumps(obj):
+        f = io.BytesIO()
+        DataModel._get_pickler(f).dump(obj)
+        return f.getvalue()
+
+    def _loads(self, buff):
+        return self._get_unpickler(io.BytesIO(buff)).load()
+
+    def get_import_directory_path(self, subdir=None, create=True):
         if subdir is None:
             subdir = self.name
         if subdir is None:
@@ -1160,7 +1554,7 @@ class DataModel(object):
         else:
             path = os.path.join(app_folder, 'imported_data', subdir)
 
-        if not os.path.exists(path):
+        if create and not os.path.exists(path):
             os.makedirs(path)
 
         return path
@@ -1,20 +1,144 @@
 import os
 import sys
 import datetime
+import threading
+import atexit
+
+from six.moves import queue
 
 from libs.external_modules import *
 from fuzzfmk.data_model import Data
 import fuzzfmk.global_resources as gr
 
+
+class BufferedWriter(threading.Thread):
+    '''
+    Thread in charge of writing the records provided by the
+    :class:`Database` into the FmkDB. The records are written by
+    batch, each batch being committed within one transaction.
+    '''
+
+    _FLUSH = 1
+    _STOP = 2
+
+    def __init__(self, fmkdb_path, batch_size, flush_interval):
+        threading.Thread.__init__(self, name='FmkDB writer')
+        self.daemon = True
+        self._fmkdb_path = fmkdb_path
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._errors = []
+        self._errors_lock = threading.Lock()
+
+    def push(self, table, stmt, params):
+        self._queue.put((table, stmt, params))
+
+    def flush(self):
+        '''
+        Block until all the records provided before this call are
+        committed into the FmkDB.
+        '''
+        if not self.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put((BufferedWriter._FLUSH, done))
+        done.wait()
+
+    def pop_errors(self):
+        '''
+        Return the error messages raised while writing the records
+        since the last call.
+        '''
+        with self._errors_lock:
+            errors = self._errors
+            self._errors = []
+        return errors
+
+    def _report_error(self, msg):
+        with self._errors_lock:
+            self._errors.append(msg)
+
+    def stop(self):
+        if self.is_alive():
+            self._queue.put((BufferedWriter._STOP, None))
+            self.join()
+
+    def run(self):
+        con = sqlite3.connect(self._fmkdb_path, detect_types=sqlite3.PARSE_DECLTYPES)
+        con.execute('PRAGMA journal_mode=WAL')
+        con.execute('PRAGMA synchronous=NORMAL')
+        cur = con.cursor()
+
+        stop = False
+        while not stop:
+            batch = []
+            events = []
+            try:
+                batch.append(self._queue.get(timeout=self._flush_interval))
+                while len(batch) < self._batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            for record in batch:
+                table, stmt = record[:2]
+                if table == BufferedWriter._FLUSH:
+                    events.append(stmt)
+                    continue
+                elif table == BufferedWriter._STOP:
+                    stop = True
+                    continue
+                try:
+                    cur.execute(stmt, record[2])
+                except sqlite3.Error as e:
+                    self._report_error("ERROR[SQL:{:s}] while inserting a value into table {:s}!"
+                                       .format(e.args[0], table))
+            if batch:
+                try:
+                    con.commit()
+                except sqlite3.Error as e:
+                    self._report_error("ERROR[SQL:{:s}] while committing records into FmkDB!"
+                                       .format(e.args[0]))
+                    con.rollback()
+
+            for e in events:
+                e.set()
+
+        con.close()
+
+
 class Database(object):
 
     DDL_fname = 'fmk_db.sql'
+    # schema upgrades, the script at index i brings the FmkDB to version i+1
+    DDL_upgrade_fnames = ['fmk_db_v1.sql']
+
+    DEFAULT_CHUNK_SIZE = 500
+
+    # tables written by the BufferedWriter
+    BUFFERED_TABLES = ['DATAMODEL', 'PROJECT', 'DMAKERS', 'DATA', 'STEPS', 'FEEDBACK',
+                       'COMMENTS', 'FMKINFO', 'PROJECT_RECORDS']
 
     DEFAULT_DM_NAME = '__DEFAULT_DATAMODEL'
     DEFAULT_GTYPE_NAME = '__DEFAULT_GTYPE'
     DEFAULT_GEN_NAME = '__DEFAULT_GNAME'
 
-    def __init__(self, fmkdb_path=None):
+    def __init__(self, fmkdb_path=None, buffered_writes=False, batch_size=200, flush_interval=1.0):
+        '''
+        Args:
+          fmkdb_path (str): path to the FmkDB. If not provided, the default one is used.
+          buffered_writes (bool): If True, the records are not written directly within
+            the FmkDB but queued and written by batch by a dedicated thread
+            (refer to :class:`BufferedWriter`). In this mode, the row IDs of the records are
+            allocated by this object, thus the FmkDB should not be written concurrently by
+            another process. Besides, the errors raised while writing the records are
+            reported by the next call to :meth:`commit` or :meth:`flush`.
+          batch_size (int): [If `buffered_writes` is True] Maximum number of records written
+            within one transaction.
+          flush_interval (float): [If `buffered_writes` is True] Maximum amount of time (in seconds)
+            a record can stay in the queue before being written.
+        '''
         self.name = 'fmkDB.db'
         if fmkdb_path is None:
             self.fmk_db = os.path.join(gr.app_folder, self.name)
@@ -24,6 +148,13 @@ class Database(object):
         self._cur = None
         self.enabled = False
 
+        self._buffered_writes = buffered_writes
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._writer = None
+        self._last_rowids = None
+        self._atexit_registered = False
+
     def start(self):
         if not sqlite3_module:
             print("/!\\ WARNING /!\\: Fuddly's FmkDB unavailable because python-sqlite3 is not installed!")
@@ -40,9 +171,40 @@ class Database(object):
                 self._cur = self._con.cursor()
                 self._cur.executescript(fmk_db_sql)
 
+        self._upgrade_schema()
+
+        if self._buffered_writes:
+            self._cur.execute('PRAGMA journal_mode=WAL')
+            self._last_rowids = {}
+            for table in self.BUFFERED_TABLES:
+                self._cur.execute('SELECT max(ROWID) FROM {:s}'.format(table))
+                last_id = self._cur.fetchone()[0]
+                self._cur.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,))
+                seq = self._cur.fetchone()
+                self._last_rowids[table] = max(last_id or 0, seq[0] if seq else 0)
+            self._writer = BufferedWriter(self.fmk_db, self._batch_size, self._flush_interval)
+            self._writer.start()
+            # the writer thread is a daemon, thus we take care of not
+            # losing the pending records if the Database is not stopped
+            if not self._atexit_registered:
+                self._atexit_registered = True
+                atexit.register(self.stop)
+
         self.enabled = True
 
+    def _upgrade_schema(self):
+        self._cur.execute('PRAGMA user_version')
+        version = self._cur.fetchone()[0]
+        for fname in self.DDL_upgrade_fnames[version:]:
+            upgrade_sql = open(gr.fmk_folder + fname).read()
+            self._cur.executescript(upgrade_sql)
+
     def stop(self):
+        if self._writer is not None:
+            self._writer.stop()
+            self._check_writer_errors()
+            self._writer = None
+
         if self._con:
             self._con.close()
 
@@ -50,7 +212,27 @@ class Database(object):
         self._cur = None
         self.enabled = False
 
+    def flush(self):
+        '''
+        Write all the pending records into the FmkDB (only meaningful
+        if buffered writes are enabled).
+        '''
+        if self._writer is not None:
+            self._writer.flush()
+            return self._check_writer_errors()
+        return 0
+
+    def _check_writer_errors(self):
+        errors = self._writer.pop_errors()
+        for msg in errors:
+            print("\n*** " + msg)
+        return -1 if errors else 0
+
     def commit(self):
+        if self._writer is not None:
+            # records are committed by batch, we only report the
+            # errors that occurred so far
+            return self._check_writer_errors()
         try:
             self._con.commit()
         except sqlite3.Error as e:
@@ -60,6 +242,9 @@ class Database(object):
             return 0
 
     def rollback(self):
+        if self._writer is not None:
+            # records are committed by batch
+            return 0
         try:
             self._con.rollback()
         except sqlite3.Error as e:
@@ -67,14 +252,108 @@ class Database(object):
         else:
             return 0
 
-    def execute_sql_statement(self, sql_stmt):
+    def execute_sql_statement(self, sql_stmt, params=None):
+        self.flush()
         with self._con:
-            self._cur.execute(sql_stmt)
+            self._cur.execute(sql_stmt, () if params is None else params)
             rows = self._cur.fetchall()
 
             return rows
 
+    def iter_records(self, sql_stmt, params=None, chunk_size=None):
+        '''
+        Iterate over the records returned by `sql_stmt` without loading the
+        whole result set in memory (at most `chunk_size` records are fetched
+        at once).
+
+        Args:
+          sql_stmt (str): SQL query. Its parameters shall be provided
+            through `params` and not be formatted within the query.
+          params (tuple): parameters of the query.
+          chunk_size (int): number of records fetched at once.
+        '''
+        self.flush()
+        chunk_size = self.DEFAULT_CHUNK_SIZE if chunk_size is None else chunk_size
+        # a dedicated cursor is used so that the iteration is not
+        # disturbed by other requests
+        cur = self._con.cursor()
+        try:
+            cur.execute(sql_stmt, () if params is None else params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for r in rows:
+                    yield r
+        finally:
+            cur.close()
+
+    def _iter_table(self, table, columns, conditions, order_by, chunk_size):
+        # only the conditions whose value is provided end up in the
+        # query, so that the relevant indexes can be used by SQLite
+        clauses = []
+        params = []
+        for cond, val in conditions:
+            if val is not None:
+                clauses.append(cond)
+                params.append(val)
+        sql_stmt = "SELECT {:s} FROM {:s}".format(', '.join(columns), table)
+        if clauses:
+            sql_stmt += " WHERE " + " AND ".join(clauses)
+        sql_stmt += " ORDER BY " + order_by
+        return self.iter_records(sql_stmt, tuple(params), chunk_size=chunk_size)
+
+    def iter_data(self, start_id=1, end_id=-1, chunk_size=None):
+        '''
+        Iterate over the DATA records whose ID is in [start_id, end_id]
+        (no upper bound if `end_id` < 1). Each record is a tuple
+        (ID, GROUP_ID, TYPE, DM_NAME, CONTENT, SIZE, SENT_DATE, ACK_DATE).
+        '''
+        return self._iter_table('DATA',
+                                ['ID', 'GROUP_ID', 'TYPE', 'DM_NAME', 'CONTENT', 'SIZE',
+                                 'SENT_DATE', 'ACK_DATE'],
+                                [('ID >= ?', start_id),
+                                 ('ID <= ?', None if end_id < 1 else end_id)],
+                                'ID', chunk_size)
+
+    def iter_feedback(self, data_id=None, max_status=None, chunk_size=None):
+        '''
+        Iterate over the FEEDBACK records, optionally restricted to the ones
+        related to `data_id` and/or whose status is strictly lower than `max_status`.
+        Each record is a tuple (DATA_ID, SOURCE, CONTENT, STATUS).
+        '''
+        return self._iter_table('FEEDBACK',
+                                ['DATA_ID', 'SOURCE', 'CONTENT', 'STATUS'],
+                                [('DATA_ID = ?', data_id),
+                                 ('STATUS < ?', max_status)],
+                                'DATA_ID', chunk_size)
+
+    def iter_steps(self, data_id=None, data_id_src=None, chunk_size=None):
+        '''
+        Iterate over the STEPS records, optionally restricted to the ones
+        related to `data_id` and/or to the source data `data_id_src`.
+        Each record is a tuple
+        (DATA_ID, STEP_ID, DMAKER_TYPE, DMAKER_NAME, DATA_ID_SRC, USER_INPUT, INFO).
+        '''
+        return self._iter_table('STEPS',
+                                ['DATA_ID', 'STEP_ID', 'DMAKER_TYPE', 'DMAKER_NAME',
+                                 'DATA_ID_SRC', 'USER_INPUT', 'INFO'],
+                                [('DATA_ID = ?', data_id),
+                                 ('DATA_ID_SRC = ?', data_id_src)],
+                                'DATA_ID, STEP_ID', chunk_size)
+
+    def _push(self, table, columns, params):
+        # The row ID is allocated here, so that it can be provided
+        # before the record is actually written
+        rowid = self._last_rowids[table] + 1
+        self._last_rowids[table] = rowid
+        stmt = "INSERT INTO {:s}(ROWID,{:s}) VALUES(?{:s})".format(table, columns, ',?' * len(params))
+        self._writer.push(table, stmt, (rowid,) + params)
+        return rowid
+
     def insert_data_model(self, dm_name):
+        if self._writer is not None:
+            return self._push('DATAMODEL', 'NAME', (dm_name,))
         try:
             self._cur.execute(
                     "INSERT INTO DATAMODEL(NAME) VALUES(?)",
@@ -87,6 +366,8 @@ class Database(object):
             return self._cur.lastrowid
 
     def insert_project(self, prj_name):
+        if self._writer is not None:
+            return self._push('PROJECT', 'NAME', (prj_name,))
         try:
             self._cur.execute(
                     "INSERT INTO PROJECT(NAME) VALUES(?)",
@@ -101,6 +382,9 @@ class Database(object):
 
     def insert_dmaker(self, dm_name, dtype, name, is_gen, stateful, clone_type=None):
         clone_name = None if clone_type is None else name
+        if self._writer is not None:
+            return self._push('DMAKERS', 'DM_NAME,TYPE,NAME,CLONE_TYPE,CLONE_NAME,GENERATOR,STATEFUL',
+                              (dm_name, dtype, name, clone_type, clone_name, is_gen, stateful))
         try:
             self._cur.execute(
                     "INSERT INTO DMAKERS(DM_NAME,TYPE,NAME,CLONE_TYPE,CLONE_NAME,GENERATOR,STATEFUL)"
@@ -115,6 +399,9 @@ class Database(object):
 
     def insert_data(self, dtype, dm_name, raw_data, sz, sent_date, ack_date, group_id=None):
         blob = sqlite3.Binary(raw_data)
+        if self._writer is not None:
+            return self._push('DATA', 'GROUP_ID,TYPE,DM_NAME,CONTENT,SIZE,SENT_DATE,ACK_DATE',
+                              (group_id, dtype, dm_name, blob, sz, sent_date, ack_date))
         try:
             self._cur.execute(
                     "INSERT INTO DATA(GROUP_ID,TYPE,DM_NAME,CONTENT,SIZE,SENT_DATE,ACK_DATE)"
@@ -132,6 +419,9 @@ class Database(object):
                      user_input, info):
         if info:
             info = sqlite3.Binary(info)
+        if self._writer is not None:
+            return self._push('STEPS', 'DATA_ID,STEP_ID,DMAKER_TYPE,DMAKER_NAME,DATA_ID_SRC,USER_INPUT,INFO',
+                              (data_id, step_id, dmaker_type, dmaker_name, data_id_src, user_input, info))
         try:
             self._cur.execute(
                     "INSERT INTO STEPS(DATA_ID,STEP_ID,DMAKER_TYPE,DMAKER_NAME,DATA_ID_SRC,USER_INPUT,INFO)"
@@ -147,6 +437,9 @@ class Database(object):
     def insert_feedback(self, data_id, source, content, status_code=None):
         if content:
             content = sqlite3.Binary(content)
+        if self._writer is not None:
+            return self._push('FEEDBACK', 'DATA_ID,SOURCE,CONTENT,STATUS',
+                              (data_id, source, content, status_code))
         try:
             self._cur.execute(
                     "INSERT INTO FEEDBACK(DATA_ID,SOURCE,CONTENT,STATUS)"
@@ -161,6 +454,9 @@ class Database(object):
             return self._cur.lastrowid
 
     def insert_comment(self, data_id, content, date):
+        if self._writer is not None:
+            return self._push('COMMENTS', 'DATA_ID,CONTENT,DATE',
+                              (data_id, content, date))
         try:
             self._cur.execute(
                     "INSERT INTO COMMENTS(DATA_ID,CONTENT,DATE)"
@@ -175,6 +471,9 @@ class Database(object):
             return self._cur.lastrowid
 
     def insert_fmk_info(self, data_id, content, date, error=False):
+        if self._writer is not None:
+            return self._push('FMKINFO', 'DATA_ID,CONTENT,DATE,ERROR',
+                              (data_id, content, date, error))
         try:
             self._cur.execute(
                     "INSERT INTO FMKINFO(DATA_ID,CONTENT,DATE,ERROR)"
@@ -194,6 +493,9 @@ class Database(object):
             return self._cur.lastrowid
 
     def insert_project_record(self, prj_name, data_id, target):
+        if self._writer is not None:
+            return self._push('PROJECT_RECORDS', 'PRJ_NAME,DATA_ID,TARGET',
+                              (prj_name, data_id, target))
         try:
             self._cur.execute(
                 "INSERT INTO PROJECT_RECORDS(PRJ_NAME,DATA_ID,TARGET)"
@@ -208,6 +510,7 @@ class Database(object):
             return self._cur.lastrowid
 
     def fetch_data(self, start_id=1, end_id=-1):
+        self.flush()
         ign_end_id = '--' if end_id < 1 else ''
         try:
             self._cur.execute(
@@ -215,14 +518,15 @@ class Database(object):
                 SELECT DATA.ID, DATA.CONTENT, DATA.TYPE, DMAKERS.NAME, DATA.DM_NAME
                 FROM DATA INNER JOIN DMAKERS
                   ON DATA.TYPE = DMAKERS.TYPE AND DMAKERS.CLONE_TYPE IS NULL
-                WHERE DATA.ID >= {sid:d} {ign_eid:s} AND DATA.ID <= {eid:d}
+                WHERE DATA.ID >= :sid {ign_eid:s} AND DATA.ID <= :eid
                 UNION ALL
                 SELECT DATA.ID, DATA.CONTENT, DMAKERS.CLONE_TYPE AS TYPE, DMAKERS.CLONE_NAME AS NAME,
                        DATA.DM_NAME
                 FROM DATA INNER JOIN DMAKERS
                   ON DATA.TYPE = DMAKERS.TYPE AND DMAKERS.CLONE_TYPE IS NOT NULL
-                WHERE DATA.ID >= {sid:d} {ign_eid:s} AND DATA.ID <= {eid:d}
-                '''.format(sid = start_id, eid = end_id, ign_eid = ign_end_id)
+                WHERE DATA.ID >= :sid {ign_eid:s} AND DATA.ID <= :eid
+                '''.format(ign_eid = ign_end_id),
+                {'sid': start_id, 'eid': end_id}
             )
         except sqlite3.Error as e:
             print("\n*** ERROR[SQL]: {:s}".format(e.args[0]))
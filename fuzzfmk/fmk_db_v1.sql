@@ -0,0 +1,151 @@
+PRAGMA foreign_keys = off;
+BEGIN TRANSACTION;
+
+-- Indexes used by the analysis queries (fuddly's tools/fmkdb.py).
+-- Note that FEEDBACK.DATA_ID and STEPS.DATA_ID are already covered by
+-- their table primary key.
+
+CREATE INDEX IF NOT EXISTS DATA_TYPE_IDX ON DATA (TYPE);
+CREATE INDEX IF NOT EXISTS STEPS_DATA_ID_SRC_IDX ON STEPS (DATA_ID_SRC);
+CREATE INDEX IF NOT EXISTS FEEDBACK_STATUS_IDX ON FEEDBACK (STATUS, DATA_ID);
+CREATE INDEX IF NOT EXISTS PROJECT_RECORDS_TARGET_IDX ON PROJECT_RECORDS (TARGET);
+CREATE INDEX IF NOT EXISTS PROJECT_RECORDS_DATA_ID_IDX ON PROJECT_RECORDS (DATA_ID);
+
+-- Type used for statistics: the type of the original data maker if
+-- the data maker that generated the data is a clone.
+
+CREATE VIEW DATA_STATS_TYPE AS
+    SELECT DATA.ID AS ID,
+           COALESCE((SELECT DMAKERS.CLONE_TYPE FROM DMAKERS
+                     WHERE DMAKERS.TYPE = DATA.TYPE AND DMAKERS.CLONE_TYPE IS NOT NULL
+                     LIMIT 1),
+                    DATA.TYPE) AS TYPE
+    FROM DATA;
+
+-- Statistics were previously computed by views scanning the whole
+-- DATA table. They are now materialised and maintained by triggers.
+
+DROP VIEW IF EXISTS STATS;
+DROP VIEW IF EXISTS STATS_BY_TARGET;
+
+CREATE TABLE STATS (
+    TYPE  TEXT PRIMARY KEY,
+    TOTAL INTEGER
+);
+
+CREATE TABLE STATS_BY_TARGET (
+    TARGET TEXT,
+    TYPE   TEXT,
+    TOTAL  INTEGER,
+    PRIMARY KEY (
+        TARGET,
+        TYPE
+    )
+);
+
+INSERT INTO STATS (TYPE, TOTAL)
+    SELECT TYPE, count(*) FROM DATA_STATS_TYPE
+    GROUP BY TYPE;
+
+INSERT INTO STATS_BY_TARGET (TARGET, TYPE, TOTAL)
+    SELECT PROJECT_RECORDS.TARGET, DATA_STATS_TYPE.TYPE, count(*)
+    FROM PROJECT_RECORDS INNER JOIN DATA_STATS_TYPE
+      ON PROJECT_RECORDS.DATA_ID = DATA_STATS_TYPE.ID
+    GROUP BY PROJECT_RECORDS.TARGET, DATA_STATS_TYPE.TYPE;
+
+CREATE TRIGGER STATS_UPDATE AFTER INSERT ON DATA
+BEGIN
+    INSERT OR IGNORE INTO STATS (TYPE, TOTAL)
+        SELECT TYPE, 0 FROM DATA_STATS_TYPE WHERE ID = NEW.ID;
+    UPDATE STATS SET TOTAL = TOTAL + 1
+        WHERE TYPE = (SELECT TYPE FROM DATA_STATS_TYPE WHERE ID = NEW.ID);
+END;
+
+CREATE TRIGGER STATS_BY_TARGET_UPDATE AFTER INSERT ON PROJECT_RECORDS
+BEGIN
+    INSERT OR IGNORE INTO STATS_BY_TARGET (TARGET, TYPE, TOTAL)
+        SELECT NEW.TARGET, TYPE, 0 FROM DATA_STATS_TYPE WHERE ID = NEW.DATA_ID;
+    UPDATE STATS_BY_TARGET SET TOTAL = TOTAL + 1
+        WHERE TARGET = NEW.TARGET
+          AND TYPE = (SELECT TYPE FROM DATA_STATS_TYPE WHERE ID = NEW.DATA_ID);
+END;
+
+-- The statistics shall follow the deletions and the updates of the
+-- records too.
+
+CREATE TRIGGER STATS_DELETE AFTER DELETE ON DATA
+BEGIN
+    UPDATE STATS SET TOTAL = TOTAL - 1
+        WHERE TYPE = COALESCE((SELECT CLONE_TYPE FROM DMAKERS
+                               WHERE DMAKERS.TYPE = OLD.TYPE AND CLONE_TYPE IS NOT NULL
+                               LIMIT 1),
+                              OLD.TYPE);
+    UPDATE STATS_BY_TARGET
+        SET TOTAL = TOTAL - (SELECT count(*) FROM PROJECT_RECORDS
+                             WHERE DATA_ID = OLD.ID AND TARGET = STATS_BY_TARGET.TARGET)
+        WHERE TYPE = COALESCE((SELECT CLONE_TYPE FROM DMAKERS
+                               WHERE DMAKERS.TYPE = OLD.TYPE AND CLONE_TYPE IS NOT NULL
+                               LIMIT 1),
+                              OLD.TYPE);
+    DELETE FROM STATS WHERE TOTAL <= 0;
+    DELETE FROM STATS_BY_TARGET WHERE TOTAL <= 0;
+END;
+
+CREATE TRIGGER STATS_TYPE_UPDATE AFTER UPDATE OF TYPE ON DATA
+WHEN OLD.TYPE IS NOT NEW.TYPE
+BEGIN
+    UPDATE STATS SET TOTAL = TOTAL - 1
+        WHERE TYPE = COALESCE((SELECT CLONE_TYPE FROM DMAKERS
+                               WHERE DMAKERS.TYPE = OLD.TYPE AND CLONE_TYPE IS NOT NULL
+                               LIMIT 1),
+                              OLD.TYPE);
+    UPDATE STATS_BY_TARGET
+        SET TOTAL = TOTAL - (SELECT count(*) FROM PROJECT_RECORDS
+                             WHERE DATA_ID = OLD.ID AND TARGET = STATS_BY_TARGET.TARGET)
+        WHERE TYPE = COALESCE((SELECT CLONE_TYPE FROM DMAKERS
+                               WHERE DMAKERS.TYPE = OLD.TYPE AND CLONE_TYPE IS NOT NULL
+                               LIMIT 1),
+                              OLD.TYPE);
+    DELETE FROM STATS WHERE TOTAL <= 0;
+    DELETE FROM STATS_BY_TARGET WHERE TOTAL <= 0;
+
+    INSERT OR IGNORE INTO STATS (TYPE, TOTAL)
+        SELECT TYPE, 0 FROM DATA_STATS_TYPE WHERE ID = NEW.ID;
+    UPDATE STATS SET TOTAL = TOTAL + 1
+        WHERE TYPE = (SELECT TYPE FROM DATA_STATS_TYPE WHERE ID = NEW.ID);
+    INSERT OR IGNORE INTO STATS_BY_TARGET (TARGET, TYPE, TOTAL)
+        SELECT DISTINCT PROJECT_RECORDS.TARGET, DATA_STATS_TYPE.TYPE, 0
+        FROM PROJECT_RECORDS INNER JOIN DATA_STATS_TYPE
+          ON PROJECT_RECORDS.DATA_ID = DATA_STATS_TYPE.ID
+        WHERE PROJECT_RECORDS.DATA_ID = NEW.ID;
+    UPDATE STATS_BY_TARGET
+        SET TOTAL = TOTAL + (SELECT count(*) FROM PROJECT_RECORDS
+                             WHERE DATA_ID = NEW.ID AND TARGET = STATS_BY_TARGET.TARGET)
+        WHERE TYPE = (SELECT TYPE FROM DATA_STATS_TYPE WHERE ID = NEW.ID);
+END;
+
+CREATE TRIGGER STATS_BY_TARGET_DELETE AFTER DELETE ON PROJECT_RECORDS
+BEGIN
+    UPDATE STATS_BY_TARGET SET TOTAL = TOTAL - 1
+        WHERE TARGET = OLD.TARGET
+          AND TYPE = (SELECT TYPE FROM DATA_STATS_TYPE WHERE ID = OLD.DATA_ID);
+    DELETE FROM STATS_BY_TARGET WHERE TARGET = OLD.TARGET AND TOTAL <= 0;
+END;
+
+CREATE TRIGGER STATS_BY_TARGET_RECORD_UPDATE AFTER UPDATE OF TARGET, DATA_ID ON PROJECT_RECORDS
+BEGIN
+    UPDATE STATS_BY_TARGET SET TOTAL = TOTAL - 1
+        WHERE TARGET = OLD.TARGET
+          AND TYPE = (SELECT TYPE FROM DATA_STATS_TYPE WHERE ID = OLD.DATA_ID);
+    DELETE FROM STATS_BY_TARGET WHERE TARGET = OLD.TARGET AND TOTAL <= 0;
+    INSERT OR IGNORE INTO STATS_BY_TARGET (TARGET, TYPE, TOTAL)
+        SELECT NEW.TARGET, TYPE, 0 FROM DATA_STATS_TYPE WHERE ID = NEW.DATA_ID;
+    UPDATE STATS_BY_TARGET SET TOTAL = TOTAL + 1
+        WHERE TARGET = NEW.TARGET
+          AND TYPE = (SELECT TYPE FROM DATA_STATS_TYPE WHERE ID = NEW.DATA_ID);
+END;
+
+PRAGMA user_version = 1;
+
+COMMIT TRANSACTION;
+PRAGMA foreign_keys = on;
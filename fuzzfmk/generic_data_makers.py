@@ -144,12 +144,36 @@ class sd_fuzz_typed_nodes(StatefulDisruptor):
         self.run_num = None
 
     def disrupt_data(self, dm, target, data):
+        if not self._walk(data, clone_node=self.clone_node):
+            data.make_unusable()
+            self.handover()
+        return data
+
+    def disrupt_data_batch(self, dm, target, data, nb):
+        '''
+        Go through the next @nb steps of the walk. As the walk goes on
+        modifying the same graph, each step but the last one is
+        exported within its own environment. If the walk ends within
+        the batch, the handover is performed by the next call.
+        '''
+        batch = []
+        for i in range(nb):
+            d = data if i == 0 else Data()
+            if not self._walk(d, clone_node=self.clone_node or i < nb - 1):
+                if batch:
+                    break
+                d.make_unusable()
+                self.handover()
+                return [d]
+            batch.append(d)
+
+        return batch
+
+    def _walk(self, data, clone_node):
         try:
             rnode, consumed_node, orig_node_val, idx = next(self.walker)
         except StopIteration:
-            data.make_unusable()
-            self.handover()
-            return data
+            return False
 
         new_max_runs = self.consumer.max_nb_runs_for(consumed_node)
         if self.max_runs != new_max_runs or self.current_node != consumed_node:
@@ -169,13 +193,13 @@ class sd_fuzz_typed_nodes(StatefulDisruptor):
                       (binascii.b2a_hex(consumed_node.get_flatten_value()),
                       consumed_node.get_flatten_value()))
 
-        if self.clone_node:
+        if clone_node:
             exported_node = Node(rnode.name, base_node=rnode, new_env=True)
             data.update_from_node(exported_node)
         else:
             data.update_from_node(rnode)
 
-        return data
+        return True
 
 
 
@@ -747,25 +771,32 @@ class d_corrupt_node_bits(Disruptor):
         return True
 
 
+    def _select_nodes(self, prev_data):
+        prev_data.node.get_value()
+
+        c = NodeInternalsCriteria(mandatory_attrs=[NodeInternals.Mutable],
+                                  node_kinds=[NodeInternals_TypedValue])
+        l = prev_data.node.get_reachable_nodes(path_regexp=self.path,
+                                               internals_criteria=c)
+        if not l:
+            prev_data.add_info('INVALID INPUT')
+            return None
+
+        if self.nb > 0:
+            try:
+                l = random.sample(l, self.nb)
+            except ValueError:
+                prev_data.add_info('Only one Node (Terminal) has been found!')
+                l = random.sample(l, 1)
+
+        return l
+
     def disrupt_data(self, dm, target, prev_data):
         if prev_data.node:
-            prev_data.node.get_value()
-
-            c = NodeInternalsCriteria(mandatory_attrs=[NodeInternals.Mutable],
-                                      node_kinds=[NodeInternals_TypedValue])
-            l = prev_data.node.get_reachable_nodes(path_regexp=self.path,
-                                                   internals_criteria=c)
-            if not l:
-                prev_data.add_info('INVALID INPUT')
+            l = self._select_nodes(prev_data)
+            if l is None:
                 return prev_data
 
-            if self.nb > 0:
-                try:
-                    l = random.sample(l, self.nb)
-                except ValueError:
-                    prev_data.add_info('Only one Node (Terminal) has been found!')
-                    l = random.sample(l, 1)
-
             for i in l:
                 val = i.get_flatten_value()
                 prev_data.add_info('current fuzzed node: %s' % i.get_path_from(prev_data.node))
@@ -773,7 +804,7 @@ class d_corrupt_node_bits(Disruptor):
 
                 if self.new_val is None:
                     if val != b'':
-                        val = corrupt_bits(val, n=1, ascii=self.ascii)
+                        val = corrupt_bits_batch(val, 1, n=1, ascii=self.ascii)[0]
                         prev_data.add_info('corrupted data: %s' % repr(val))
                     else:
                         prev_data.add_info('Nothing to corrupt!')
@@ -787,13 +818,60 @@ class d_corrupt_node_bits(Disruptor):
             ret = prev_data
 
         else:
-            new_val = corrupt_bits(prev_data.to_bytes(), ascii=self.ascii)
+            new_val = corrupt_bits_batch(prev_data.to_bytes(), 1, ascii=self.ascii)[0]
             prev_data.update_from_str_or_bytes(new_val)
             prev_data.add_info('Corruption performed on a byte string as no Node is available')
             ret = prev_data
 
         return ret
 
+    def disrupt_data_batch(self, dm, target, prev_data, nb):
+        '''
+        The variants share the same selection of nodes, and the
+        corrupted values of each node are computed in one shot.
+        '''
+        if self.new_val is not None:
+            # all the variants would be the same
+            return Disruptor.disrupt_data_batch(self, dm, target, prev_data, nb)
+
+        batch = []
+
+        if prev_data.node:
+            l = self._select_nodes(prev_data)
+            if l is None:
+                return [prev_data]
+
+            orig_vals = [i.get_flatten_value() for i in l]
+            corrupted_vals = [corrupt_bits_batch(val, nb, n=1, ascii=self.ascii) if val != b'' else None
+                              for val in orig_vals]
+
+            for idx in range(nb):
+                for i, variants in zip(l, corrupted_vals):
+                    if variants is not None:
+                        i.set_values(val_list=[variants[idx]])
+                        i.get_value()
+
+                # the last variant is the one of prev_data
+                data = prev_data if idx == nb - 1 else copy.copy(prev_data)
+                for i, val, variants in zip(l, orig_vals, corrupted_vals):
+                    data.add_info('current fuzzed node: %s' % i.get_path_from(prev_data.node))
+                    data.add_info('orig data: %s' % repr(val))
+                    if variants is not None:
+                        data.add_info('corrupted data: %s' % repr(variants[idx]))
+                    else:
+                        data.add_info('Nothing to corrupt!')
+                batch.append(data)
+
+        else:
+            variants = corrupt_bits_batch(prev_data.to_bytes(), nb, ascii=self.ascii)
+            for idx, new_val in enumerate(variants):
+                data = prev_data if idx == nb - 1 else copy.copy(prev_data)
+                data.update_from_str_or_bytes(new_val)
+                data.add_info('Corruption performed on a byte string as no Node is available')
+                batch.append(data)
+
+        return batch
+
 
 @disruptor(tactics, dtype="Cp", weight=4,
            args={'idx': ('byte index to be corrupted (from 1 to data length)', 1, int),
@@ -816,7 +894,7 @@ class d_corrupt_bits_by_position(Disruptor):
         prev_data.add_info('corrupted bit index: %d' % self.idx)
 
         new_value = self.new_val if self.new_val is not None \
-                    else corrupt_bits(val[self.idx-1:self.idx], n=1, ascii=self.ascii)
+                    else corrupt_bits_batch(val[self.idx-1:self.idx], 1, n=1, ascii=self.ascii)[0]
         msg = val[:self.idx-1]+new_value+val[self.idx:]
 
         prev_data.update_from_str_or_bytes(msg)
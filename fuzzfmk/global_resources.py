@@ -36,6 +36,7 @@ app_folder = os.path.dirname(fuzzfmk_folder)
 app_folder = '.' if app_folder == '' else app_folder
 
 workspace_folder = app_folder + os.sep + 'workspace' + os.sep
+dm_snapshots_folder = workspace_folder + 'dm_snapshots' + os.sep
 external_libs_folder = app_folder + os.sep + 'external_libs' + os.sep
 external_tools_folder = app_folder + os.sep + 'external_tools' + os.sep
 exported_data_folder = app_folder + os.sep + 'exported_data' + os.sep
@@ -205,6 +205,9 @@ class Logger(object):
 
         self.log_stats()
 
+        if self.fmkDB is not None:
+            self.fmkDB.flush()
+
         self._reset_current_state()
         self.last_data_id = None
 
@@ -28,6 +28,7 @@ import random
 import threading
 
 from fuzzfmk.global_resources import *
+from fuzzfmk.pacing import Pacer
 from fuzzfmk.tactics_helpers import _handle_user_inputs, _user_input_conformity, _restore_dmaker_internals
 
 class Operation(object):
@@ -39,6 +40,7 @@ class Operation(object):
     def __init__(self):
         self.action_register = []
         self.status = 0
+        self.pacing = None
         self.flags = {
             Operation.Stop: False,
             Operation.Exportable: False,
@@ -59,6 +61,15 @@ class Operation(object):
     def set_status(self, status):
         self.status = status
 
+    def set_pacing(self, rate, unit=Pacer.DATA, bucket_size=None, adaptive=False, max_latency=None):
+        '''
+        Change the pacing of the framework before the emission of the
+        data related to this operation (refer to :meth:`Fuzzer.set_pacing`).
+        Providing the same settings again does not reset the pacing.
+        '''
+        self.pacing = {'rate': rate, 'unit': unit, 'bucket_size': bucket_size,
+                       'adaptive': adaptive, 'max_latency': max_latency}
+
     def add_instruction(self, actions, orig_data=None):
         if actions is None:
             l = None
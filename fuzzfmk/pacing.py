@@ -0,0 +1,160 @@
+################################################################################
+#
+#  Copyright 2014-2015 Eric Lacombe <eric.lacombe@security-labs.org>
+#
+################################################################################
+#
+#  This file is part of fuddly.
+#
+#  fuddly is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  fuddly is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with fuddly. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+from __future__ import print_function
+
+import time
+
+
+class Pacer(object):
+    '''
+    Token bucket used by the framework to hold a target at a given rate,
+    expressed either in data per second or in bytes per second. Up to
+    `bucket_size` units can be sent in a row when the target has been
+    idle for a while.
+
+    If `adaptive` is True, the rate is automatically lowered when the
+    target shows signs of distress (the target is not ready in time,
+    a probe reports a negative status, or the target acknowledges the
+    data later than `max_latency`), and then progressively restored
+    up to the configured rate (AIMD scheme).
+
+    Args:
+      rate (float): number of units per second. None disables the pacing.
+      unit (str): ``Pacer.DATA`` or ``Pacer.BYTES``.
+      bucket_size (float): capacity of the bucket (by default, one
+        second worth of units, and at least one data or one byte).
+      adaptive (bool): enable the adaptive control of the rate.
+      max_latency (float): [If `adaptive` is True] maximum acceptable
+        delay (in seconds) between the emission of data and its
+        acknowledgement by the target.
+      backoff (float): [If `adaptive` is True] factor applied to the
+        current rate when the target is in distress.
+      min_rate (float): [If `adaptive` is True] lower bound of the rate
+        (by default, 1% of `rate`).
+      recovery_steps (int): [If `adaptive` is True] number of healthy
+        emissions needed to restore the configured rate from a rate
+        close to zero.
+    '''
+
+    DATA = 'data'
+    BYTES = 'bytes'
+
+    def __init__(self, rate=None, unit=DATA, bucket_size=None, adaptive=False,
+                 max_latency=None, backoff=0.5, min_rate=None, recovery_steps=20,
+                 clock=time.time):
+        assert(unit in (Pacer.DATA, Pacer.BYTES))
+        assert(rate is None or rate > 0)
+        assert(0 < backoff < 1)
+        self.rate = rate
+        self.unit = unit
+        self.adaptive = adaptive
+        self.max_latency = max_latency
+        self.backoff = backoff
+        self.recovery_steps = recovery_steps
+        self._clock = clock
+
+        if rate is None:
+            self.bucket_size = None
+            self.min_rate = None
+        else:
+            self.bucket_size = max(rate, 1.0) if bucket_size is None else bucket_size
+            self.min_rate = rate / 100.0 if min_rate is None else min_rate
+
+        self.current_rate = rate
+        self.distress_count = 0
+        self._tokens = self.bucket_size
+        self._last_refill = None
+
+    @property
+    def enabled(self):
+        return self.rate is not None
+
+    @property
+    def settings(self):
+        return (self.rate, self.unit, self.bucket_size, self.adaptive, self.max_latency,
+                self.backoff, self.min_rate, self.recovery_steps)
+
+    def __str__(self):
+        if not self.enabled:
+            return 'disabled'
+        desc = '{:.2f} {:s}/s'.format(self.rate, self.unit)
+        if self.adaptive:
+            desc += ' (adaptive, current rate: {:.2f} {:s}/s)'.format(self.current_rate, self.unit)
+        return desc
+
+    def amount_of(self, data_list):
+        '''
+        Return the number of units that the emission of `data_list`
+        represents.
+        '''
+        if self.unit == Pacer.DATA:
+            return len(data_list)
+        else:
+            return sum(len(d.to_bytes()) for d in data_list)
+
+    def _refill(self):
+        now = self._clock()
+        if self._last_refill is not None:
+            self._tokens = min(self.bucket_size,
+                               self._tokens + (now - self._last_refill) * self.current_rate)
+        self._last_refill = now
+
+    def reserve(self, amount):
+        '''
+        Take `amount` units from the bucket and return the time (in
+        seconds) the caller has to wait before emitting them. A request
+        larger than the bucket is allowed, the bucket being then in debt.
+        '''
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        self._tokens -= amount
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.current_rate
+
+    def report(self, latency=None, distress=False):
+        '''
+        Provide the outcome of an emission to the adaptive control.
+
+        Args:
+          latency (float): delay between the emission and the
+            acknowledgement of the target, if known.
+          distress (bool): True if the target does not behave correctly.
+        '''
+        if not self.enabled or not self.adaptive:
+            return
+
+        if not distress and self.max_latency is not None and latency is not None:
+            distress = latency > self.max_latency
+
+        self._refill()
+        if distress:
+            self.distress_count += 1
+            self.current_rate = max(self.min_rate, self.current_rate * self.backoff)
+            # what has been accumulated at the previous rate is dropped
+            self._tokens = min(self._tokens, 0)
+        else:
+            self.current_rate = min(self.rate,
+                                    self.current_rate + float(self.rate) / self.recovery_steps)
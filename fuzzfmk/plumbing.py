@@ -29,16 +29,21 @@ import collections
 
 import copy
 import re
+import ast
 import pickle
 import readline
 import cmd
 import datetime
 import time
 import signal
+import threading
+
+from six.moves import queue
 
 from libs.external_modules import *
 
 from fuzzfmk.database import Database
+from fuzzfmk.pacing import Pacer
 from fuzzfmk.tactics_helpers import *
 from fuzzfmk.data_model import *
 from fuzzfmk.data_model_helpers import DataModel
@@ -49,6 +54,7 @@ from fuzzfmk.operator_helpers import *
 from fuzzfmk.project import *
 
 import fuzzfmk.generic_data_makers
+import fuzzfmk.basic_primitives
 
 import data_models
 import projects
@@ -66,11 +72,115 @@ def is_python_file(fname):
         return False
 
 
+def get_module_attributes(path, var_name, attr_names, default_classes=()):
+    '''
+    Retrieve, without executing the python module located at @path,
+    the value of the attributes @attr_names of the object bound to the
+    module global @var_name.
+
+    The object has to be an instance of a class either defined within
+    the module, or listed in @default_classes (whose attributes are
+    considered unset). Only literal values can be retrieved.
+
+    Returns:
+        dict: attribute name -> value (None if the attribute is not set),
+          or None if the attributes cannot be statically determined.
+    '''
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (IOError, OSError, SyntaxError, ValueError, TypeError):
+        return None
+
+    unresolved = object()
+
+    def literal(node):
+        try:
+            return ast.literal_eval(node)
+        except ValueError:
+            return unresolved
+
+    classes = {}
+    for stmt in tree.body:
+        if isinstance(stmt, ast.ClassDef):
+            classes[stmt.name] = stmt
+
+    def class_attributes(cls_name, seen):
+        if cls_name in default_classes:
+            return {}
+        cls = classes.get(cls_name, None)
+        if cls is None or cls_name in seen:
+            return None
+        seen.add(cls_name)
+        attrs = {}
+        for base in reversed(cls.bases):
+            if not isinstance(base, ast.Name):
+                return None
+            base_attrs = class_attributes(base.id, seen)
+            if base_attrs is None:
+                return None
+            attrs.update(base_attrs)
+        for stmt in cls.body:
+            if isinstance(stmt, ast.Assign):
+                for target in stmt.targets:
+                    if isinstance(target, ast.Name) and target.id in attr_names:
+                        attrs[target.id] = literal(stmt.value)
+        return attrs
+
+    attrs = None
+    for stmt in tree.body:
+        if not isinstance(stmt, ast.Assign):
+            continue
+        for target in stmt.targets:
+            if isinstance(target, ast.Name) and target.id == var_name:
+                value = stmt.value
+                if isinstance(value, ast.Call) and isinstance(value.func, ast.Name):
+                    attrs = class_attributes(value.func.id, set())
+                else:
+                    attrs = None
+                if attrs is None:
+                    return None
+            elif isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) \
+                    and target.value.id == var_name and target.attr in attr_names:
+                if attrs is None:
+                    return None
+                attrs[target.attr] = literal(stmt.value)
+
+    if attrs is None:
+        return None
+
+    ret = {}
+    for name in attr_names:
+        val = attrs.get(name, None)
+        if val is unresolved:
+            return None
+        ret[name] = val
+
+    return ret
+
+
+class DataModelDB(dict):
+    '''
+    Data models indexed by name. The data models that are only registered
+    within the fuzzer (not yet imported) are imported on first access.
+    '''
+    def __init__(self, loader):
+        dict.__init__(self)
+        self._loader = loader
+
+    def __missing__(self, name):
+        dm = self._loader(name)
+        if dm is None:
+            raise KeyError(name)
+        return dm
+
+
 class ExportableFMKOps(object):
 
     def __init__(self, fmk):
         self.set_fuzz_delay = fmk.set_fuzz_delay
         self.set_fuzz_burst = fmk.set_fuzz_burst
+        self.set_pacing = fmk.set_pacing
         self.set_timeout = fmk.set_timeout
         self.cleanup_all_dmakers = fmk.cleanup_all_dmakers
         self.cleanup_dmaker = fmk.cleanup_dmaker
@@ -182,10 +292,14 @@ class Fuzzer(object):
         self.import_text_reg = re.compile('(.*?)(#####)', re.S)
         self.check_clone_re = re.compile('(.*)#(\w{1,20})')
 
-        self.prj_list = []
+        self._prj_list = []
         self._prj_dict = {}
+        # Projects and data models discovered but not necessarily
+        # imported yet: name -> (prefix, module name)
+        self._prj_registry = collections.OrderedDict()
 
-        self.dm_list = []
+        self._dm_list = []
+        self._dm_registry = collections.OrderedDict()
         self.__st_dict = {}
         self.__target_dict = {}
         self.__current_tg = 0
@@ -199,10 +313,10 @@ class Fuzzer(object):
         self.__dyngenerators_created = {}
         self.__dynamic_generator_ids = {}
 
-        self._name2dm = {}
+        self._name2dm = DataModelDB(self._import_registered_dm)
         self._name2prj = {}
 
-        self.fmkDB = Database()
+        self.fmkDB = Database(buffered_writes=True)
         self.fmkDB.start()
         self._fmkDB_insert_dm_and_dmakers('generic', self._generic_tactics)
         self.fmkDB.commit()
@@ -210,6 +324,15 @@ class Fuzzer(object):
         self.group_id = 0
         self._saved_group_id = None  # used by self._recover_target()
 
+        self._pipeline_depth = 0
+        # Serialize the data generation with the logging steps of the
+        # emission stage, when they are run by different threads (refer
+        # to send_loop())
+        self._generation_lock = threading.RLock()
+        self._batch_size = 1
+        self._pacer = Pacer()
+        self._last_emission_date = None
+
         self.enable_wkspace()
         self.get_data_models()
         self.get_projects()
@@ -233,6 +356,7 @@ class Fuzzer(object):
         # where SIGINT is accepted from user
         self.set_fuzz_delay(0.5)
         self.set_fuzz_burst(1)
+        self.set_pacing(None)
 
         base_timeout = self.tg._time_beetwen_data_emission
         if base_timeout is not None:
@@ -389,6 +513,10 @@ class Fuzzer(object):
         else:
             self._saved_group_id = self.group_id
 
+        # Make sure the records related to the data that may have
+        # affected the target are written into the FmkDB
+        self.fmkDB.flush()
+
         target_recovered = False
         try:
             target_recovered = self.tg.recover_target()
@@ -419,6 +547,7 @@ class Fuzzer(object):
                     self.lg.log_probe_feedback(source="Probe '{:s}'".format(pname), content=priv, status_code=err)
 
         if not ok:
+            self._pacer.report(distress=True)
             return self._recover_target()
         else:
             return True
@@ -464,20 +593,65 @@ class Fuzzer(object):
                     continue
                 name = res.group(1)
                 if name + '.py' in file_list:
-                    dm_params = self.__import_dm(prefix, name)
-                    if dm_params is not None:
-                        self.__add_data_model(dm_params['dm'], dm_params['tactics'],
-                                              dm_params['dm_rld_args'],
-                                              reload_dm=False)
-                        self.__dyngenerators_created[dm_params['dm']] = False
-                        # populate FMK DB
-                        self._fmkDB_insert_dm_and_dmakers(dm_params['dm'].name, dm_params['tactics'])
+                    self._register_dm(prefix, name, os.path.join(app_folder, dname, name + '.py'))
 
         self.fmkDB.insert_data_model(Database.DEFAULT_DM_NAME)
         self.fmkDB.insert_dmaker(Database.DEFAULT_DM_NAME, Database.DEFAULT_GTYPE_NAME,
                                  Database.DEFAULT_GEN_NAME, True, True)
         self.fmkDB.commit()
 
+    def _register_dm(self, prefix, name, path):
+        # The data model module is only parsed. It will be imported
+        # (with its strategy) when the data model is requested.
+        attrs = get_module_attributes(path, 'data_model', ['name'],
+                                      default_classes=['DataModel'])
+        if attrs is None:
+            # the name cannot be known without importing the module
+            dm_params = self.__import_dm(prefix, name)
+            if dm_params is None:
+                return
+            dm_name = dm_params['dm'].name
+        else:
+            dm_name = name if attrs['name'] is None else attrs['name']
+
+        if dm_name in self._dm_registry:
+            print(colorize("*** ERROR: A data model with the name '%s' already exist! ***" % dm_name,
+                           rgb=Color.ERROR))
+            return
+
+        self._dm_registry[dm_name] = (prefix, name)
+        if attrs is None:
+            self.__add_imported_dm(dm_params)
+
+        print(colorize("*** Found Data Model: '%s' ***" % dm_name, rgb=Color.FMKSUBINFO))
+
+    def _import_registered_dm(self, dm_name):
+        for dm in self.__iter_data_models():
+            if dm.name == dm_name:
+                return dm
+
+        if dm_name not in self._dm_registry:
+            return None
+
+        prefix, name = self._dm_registry[dm_name]
+        dm_params = self.__import_dm(prefix, name)
+        if dm_params is None:
+            del self._dm_registry[dm_name]
+            return None
+
+        self.__add_imported_dm(dm_params)
+
+        return dm_params['dm']
+
+    def __add_imported_dm(self, dm_params):
+        self.__add_data_model(dm_params['dm'], dm_params['tactics'],
+                              dm_params['dm_rld_args'],
+                              reload_dm=False)
+        self.__dyngenerators_created[dm_params['dm']] = False
+        # populate FMK DB
+        self._fmkDB_insert_dm_and_dmakers(dm_params['dm'].name, dm_params['tactics'])
+        self.fmkDB.commit()
+
 
     def __import_dm(self, prefix, name, reload_dm=False):
 
@@ -526,8 +700,6 @@ class Fuzzer(object):
 
             if reload_dm:
                 print(colorize("*** Data Model '%s' updated ***" % dm_params['dm'].name, rgb=Color.DATA_MODEL_LOADED))
-            else:
-                print(colorize("*** Found Data Model: '%s' ***" % dm_params['dm'].name, rgb=Color.FMKSUBINFO))
 
             return dm_params
 
@@ -535,18 +707,18 @@ class Fuzzer(object):
     def __add_data_model(self, data_model, strategy, dm_rld_args,
                          reload_dm=False):
 
-        if data_model.name not in map(lambda x: x.name, self.dm_list):
-            self.dm_list.append(data_model)
+        if data_model.name not in map(lambda x: x.name, self._dm_list):
+            self._dm_list.append(data_model)
             old_dm = None
         elif reload_dm:
-            for dm in self.dm_list:
+            for dm in self._dm_list:
                 if dm.name == data_model.name:
                     break
             else:
                 raise ValueError
             old_dm = dm
-            self.dm_list.remove(dm)
-            self.dm_list.append(data_model)
+            self._dm_list.remove(dm)
+            self._dm_list.append(data_model)
         else:
             raise ValueError("A data model with the name '%s' already exist!" % data_model.name)
 
@@ -601,18 +773,63 @@ class Fuzzer(object):
                 if res is None:
                     continue
                 name = res.group(1)
-                prj_params = self._import_project(prefix, name)
-                if prj_params is not None:
-                    self._add_project(prj_params['project'],
-                                      prj_params['target'], prj_params['logger'],
-                                      prj_params['prj_rld_args'],
-                                      reload_prj=False)
-                    self.fmkDB.insert_project(prj_params['project'].name)
+                self._register_project(prefix, name, os.path.join(app_folder, dname, f))
 
         self.fmkDB.commit()
 
         print(colorize(FontStyle.BOLD + "="*80, rgb=Color.FMKINFOGROUP))
 
+    def _register_project(self, prefix, name, path):
+        # The project module is only parsed. It will be imported when
+        # the project is requested.
+        attrs = get_module_attributes(path, 'project', ['name'],
+                                      default_classes=['Project'])
+        if attrs is None:
+            # the name cannot be known without importing the module
+            prj_params = self._import_project(prefix, name)
+            if prj_params is None:
+                return
+            prj_name = prj_params['project'].name
+        else:
+            prj_name = name if attrs['name'] is None else attrs['name']
+
+        if prj_name in self._prj_registry:
+            print(colorize("*** ERROR: A project with the name '%s' already exist! ***" % prj_name,
+                           rgb=Color.ERROR))
+            return
+
+        self._prj_registry[prj_name] = (prefix, name)
+        if attrs is None:
+            self.__add_imported_project(prj_params)
+
+        print(colorize("*** Found Project: '%s' ***" % prj_name, rgb=Color.FMKSUBINFO))
+
+    def _import_registered_project(self, prj_name):
+        for prj in self._projects():
+            if prj.name == prj_name:
+                return prj
+
+        if prj_name not in self._prj_registry:
+            return None
+
+        prefix, name = self._prj_registry[prj_name]
+        prj_params = self._import_project(prefix, name)
+        if prj_params is None:
+            del self._prj_registry[prj_name]
+            return None
+
+        self.__add_imported_project(prj_params)
+
+        return prj_params['project']
+
+    def __add_imported_project(self, prj_params):
+        self._add_project(prj_params['project'],
+                          prj_params['target'], prj_params['logger'],
+                          prj_params['prj_rld_args'],
+                          reload_prj=False)
+        self.fmkDB.insert_project(prj_params['project'].name)
+        self.fmkDB.commit()
+
 
     def _import_project(self, prefix, name, reload_prj=False):
 
@@ -687,8 +904,6 @@ class Fuzzer(object):
 
             if reload_prj:
                 print(colorize("*** Project '%s' updated ***" % prj_params['project'].name, rgb=Color.FMKSUBINFO))
-            else:
-                print(colorize("*** Found Project: '%s' ***" % prj_params['project'].name, rgb=Color.FMKSUBINFO))
 
             return prj_params
 
@@ -696,18 +911,18 @@ class Fuzzer(object):
     def _add_project(self, project, target, logger, prj_rld_args,
                      reload_prj=False):
 
-        if project.name not in map(lambda x: x.name, self.prj_list):
-            self.prj_list.append(project)
+        if project.name not in map(lambda x: x.name, self._prj_list):
+            self._prj_list.append(project)
             old_prj = None
         elif reload_prj:
-            for prj in self.prj_list:
+            for prj in self._prj_list:
                 if prj.name == project.name:
                     break
             else:
                 raise ValueError
             old_prj = prj
-            self.prj_list.remove(prj)
-            self.prj_list.append(project)
+            self._prj_list.remove(prj)
+            self._prj_list.append(project)
         else:
             raise ValueError("A project with the name '%s' already exist!" % project.name)
 
@@ -775,7 +990,11 @@ class Fuzzer(object):
                     self.__dynamic_generator_ids[self.dm].append(dmaker_type)
                     self.fmkDB.insert_dmaker(self.dm.name, dmaker_type, gen_cls_name, True, True)
 
-            print(colorize("*** Data Model '%s' loaded ***" % self.dm.name, rgb=Color.DATA_MODEL_LOADED))
+            if self.dm.is_loaded_from_snapshot():
+                print(colorize("*** Data Model '%s' loaded (from snapshot) ***" % self.dm.name,
+                               rgb=Color.DATA_MODEL_LOADED))
+            else:
+                print(colorize("*** Data Model '%s' loaded ***" % self.dm.name, rgb=Color.DATA_MODEL_LOADED))
 
         except:
             self._handle_user_code_exception()
@@ -949,10 +1168,30 @@ class Fuzzer(object):
         print(colorize(FontStyle.BOLD + '\n-=[ FMK Internals ]=-\n', rgb=Color.INFO))
         print(colorize('                     Fuzz delay: ', rgb=Color.SUBINFO) + str(self._delay))
         print(colorize('   Number of data sent in burst: ', rgb=Color.SUBINFO) + str(self._burst))
+        print(colorize('                         Pacing: ', rgb=Color.SUBINFO) + str(self._pacer))
         print(colorize('    Target health-check timeout: ', rgb=Color.SUBINFO) + str(self._timeout))
+        print(colorize('                 Pipeline depth: ', rgb=Color.SUBINFO) + str(self._pipeline_depth))
+        print(colorize('                     Batch size: ', rgb=Color.SUBINFO) + str(self._batch_size))
+        print(colorize('      Target feedback max. size: ', rgb=Color.SUBINFO) + str(self.tg.get_feedback_max_size()))
         print(colorize('              Workspace enabled: ', rgb=Color.SUBINFO) + repr(self._wkspace_enabled))
+        print(colorize('          Vectorization enabled: ', rgb=Color.SUBINFO)
+              + repr(fuzzfmk.basic_primitives.VECTORIZATION_ENABLED))
+
+
 
+    @property
+    def prj_list(self):
+        # Imply the import of every registered project
+        for prj_name in list(self._prj_registry.keys()):
+            self._import_registered_project(prj_name)
+        return self._prj_list
 
+    @property
+    def dm_list(self):
+        # Imply the import of every registered data model
+        for dm_name in list(self._dm_registry.keys()):
+            self._import_registered_dm(dm_name)
+        return self._dm_list
 
     @EnforceOrder(accepted_states=['20_load_prj','25_load_dm','S1','S2'])
     def projects(self):
@@ -960,15 +1199,22 @@ class Fuzzer(object):
             yield prj
 
     def _projects(self):
-        for prj in self.prj_list:
+        for prj in self._prj_list:
             yield prj
 
+    def _project_names(self):
+        names = list(self._prj_registry.keys())
+        for prj in self._projects():
+            if prj.name not in self._prj_registry:
+                names.append(prj.name)
+        return names
+
     @EnforceOrder(accepted_states=['20_load_prj','25_load_dm','S1','S2'])
     def show_projects(self):
         print(colorize(FontStyle.BOLD + '\n-=[ Projects ]=-\n', rgb=Color.INFO))
         idx = 0
-        for prj in self._projects():
-            print(colorize('[%d] ' % idx + prj.name, rgb=Color.SUBINFO))
+        for prj_name in self._project_names():
+            print(colorize('[%d] ' % idx + prj_name, rgb=Color.SUBINFO))
             idx += 1
 
 
@@ -978,15 +1224,23 @@ class Fuzzer(object):
             yield dm
 
     def __iter_data_models(self):
-        for dm in self.dm_list:
+        for dm in self._dm_list:
             yield dm
 
+    def _data_model_names(self):
+        # registered data models (imported or not) and composed ones
+        names = list(self._dm_registry.keys())
+        for dm in self.__iter_data_models():
+            if dm.name not in self._dm_registry:
+                names.append(dm.name)
+        return names
+
     @EnforceOrder(accepted_states=['20_load_prj','25_load_dm','S1','S2'])
     def show_data_models(self):
         print(colorize(FontStyle.BOLD + '\n-=[ Data Models ]=-\n', rgb=Color.INFO))
         idx = 0
-        for dm in self.__iter_data_models():
-            print(colorize('[%d] ' % idx + dm.name, rgb=Color.SUBINFO))
+        for dm_name in self._data_model_names():
+            print(colorize('[%d] ' % idx + dm_name, rgb=Color.SUBINFO))
             idx += 1
 
     @EnforceOrder(accepted_states=['S2'])
@@ -1039,13 +1293,7 @@ class Fuzzer(object):
 
     @EnforceOrder(accepted_states=['20_load_prj','25_load_dm','S1','S2'])
     def get_data_model_by_name(self, name):
-        for model in self.__iter_data_models():
-            if model.name == name:
-                ret = model
-                break
-        else:
-            ret = None
-        return ret
+        return self._import_registered_dm(name)
 
     @EnforceOrder(accepted_states=['25_load_dm','S1','S2'], transition=['25_load_dm','S1'])
     def load_data_model(self, dm=None, name=None):
@@ -1057,7 +1305,7 @@ class Fuzzer(object):
                 return False
 
         elif dm is not None:
-            if dm not in self.dm_list:
+            if dm not in self._dm_list:
                 return False
 
         if self.__is_started():
@@ -1085,7 +1333,7 @@ class Fuzzer(object):
             
         elif dm_list is not None:
             for dm in dm_list:
-                if dm not in self.dm_list:
+                if dm not in self._dm_list:
                     return False
 
         if self.__is_started():
@@ -1120,7 +1368,7 @@ class Fuzzer(object):
 
         new_dm.name = name[:-1]
 
-        if reload_dm or new_dm.name not in map(lambda x: x.name, self.dm_list):
+        if reload_dm or new_dm.name not in map(lambda x: x.name, self._dm_list):
             self.fmkDB.insert_data_model(new_dm.name)
             self.__add_data_model(new_dm, new_tactics,
                                   (None, dm_list),
@@ -1144,13 +1392,7 @@ class Fuzzer(object):
 
     @EnforceOrder(accepted_states=['20_load_prj','25_load_dm','S1','S2'])
     def get_project_by_name(self, name):
-        for prj in self._projects():
-            if prj.name == name:
-                ret = prj
-                break
-        else:
-            ret = None
-        return ret
+        return self._import_registered_project(name)
 
 
     @EnforceOrder(accepted_states=['20_load_prj','25_load_dm','S1','S2'], final_state='S2')
@@ -1195,7 +1437,7 @@ class Fuzzer(object):
                 return False
 
         elif prj is not None:
-            if prj not in self.prj_list:
+            if prj not in self._prj_list:
                 return False
 
         self.prj = prj
@@ -1243,6 +1485,28 @@ class Fuzzer(object):
     def disable_wkspace(self):
         self._wkspace_enabled = False
 
+    @EnforceOrder(accepted_states=['S1','S2'])
+    def enable_vectorization(self):
+        '''
+        Compute the corruption primitives (refer to
+        :mod:`fuzzfmk.basic_primitives`) with NumPy for large data. For a same
+        random seed, the generated data differ from the ones obtained when
+        vectorization is disabled.
+        '''
+        if not numpy_module:
+            self.lg.log_fmk_info('NumPy is not installed, vectorization is not available!')
+            return False
+        fuzzfmk.basic_primitives.VECTORIZATION_ENABLED = True
+        self.lg.log_fmk_info('Vectorization enabled (from {:d} bytes)'
+                             .format(fuzzfmk.basic_primitives.VECTORIZATION_THRESHOLD))
+        return True
+
+    @EnforceOrder(accepted_states=['S1','S2'])
+    def disable_vectorization(self):
+        fuzzfmk.basic_primitives.VECTORIZATION_ENABLED = False
+        self.lg.log_fmk_info('Vectorization disabled')
+        return True
+
     @EnforceOrder(accepted_states=['S1','S2'])
     def set_fuzz_delay(self, delay):
         if delay >= 0 or delay == -1:
@@ -1264,6 +1528,35 @@ class Fuzzer(object):
             self.lg.log_fmk_info('Wrong burst value!')
             return False
 
+    @EnforceOrder(accepted_states=['S1','S2'])
+    def set_pacing(self, rate, unit=Pacer.DATA, bucket_size=None, adaptive=False, max_latency=None):
+        '''
+        Hold the target at a given rate (refer to :class:`fuzzfmk.pacing.Pacer`).
+        The pacing is applied before each emission, in addition to the fuzz
+        delay applied after each burst. If the settings are unchanged, the
+        current pacing is kept as is (including the state of its bucket and
+        its adaptive rate).
+
+        Args:
+          rate (float): number of data (or bytes) per second. None disables the pacing.
+          unit (str): ``Pacer.DATA`` or ``Pacer.BYTES``.
+          bucket_size (float): maximum number of units that can be sent in a row.
+          adaptive (bool): lower the rate when the target shows signs of distress.
+          max_latency (float): [If `adaptive` is True] maximum acceptable delay between
+            the emission of data and its acknowledgement by the target.
+        '''
+        try:
+            pacer = Pacer(rate=rate, unit=unit, bucket_size=bucket_size, adaptive=adaptive,
+                          max_latency=max_latency)
+        except AssertionError:
+            self.lg.log_fmk_info('Wrong pacing parameters!')
+            return False
+        if pacer.settings == self._pacer.settings:
+            return True
+        self._pacer = pacer
+        self.lg.log_fmk_info('Pacing = {!s}'.format(self._pacer))
+        return True
+
     @EnforceOrder(accepted_states=['S1','S2'])
     def set_timeout(self, timeout):
         if timeout >= 0:
@@ -1275,6 +1568,57 @@ class Fuzzer(object):
             return False
 
 
+    @EnforceOrder(accepted_states=['S1','S2'])
+    def set_pipeline_depth(self, depth):
+        if depth >= 0:
+            self._pipeline_depth = int(depth)
+            self.lg.log_fmk_info('Pipeline depth = %d' % self._pipeline_depth)
+            return True
+        else:
+            self.lg.log_fmk_info('Wrong pipeline depth value!')
+            return False
+
+
+    @EnforceOrder(accepted_states=['S1','S2'])
+    def set_batch_size(self, nb):
+        if nb >= 1:
+            self._batch_size = int(nb)
+            self.lg.log_fmk_info('Batch size = %d' % self._batch_size)
+            return True
+        else:
+            self.lg.log_fmk_info('Wrong batch size!')
+            return False
+
+
+    @EnforceOrder(accepted_states=['S1','S2'])
+    def set_feedback_max_size(self, max_size):
+        if max_size is None or max_size > 0:
+            self.tg.set_feedback_max_size(None if max_size is None else int(max_size))
+            self.lg.log_fmk_info('Target feedback max. size = {!s}'.format(self.tg.get_feedback_max_size()))
+            return True
+        else:
+            self.lg.log_fmk_info('Wrong feedback max. size!')
+            return False
+
+
+    # Used to hold the target at the rate defined by the pacer
+    def __pace(self, data_list):
+        '''
+        return False if the user cancelled the emission while waiting
+        '''
+        wait_time = self._pacer.reserve(self._pacer.amount_of(data_list))
+        if wait_time > 0:
+            try:
+                signal.signal(signal.SIGINT, sig_int_handler)
+                time.sleep(wait_time)
+            except KeyboardInterrupt:
+                self.set_error("The operation has been cancelled by the user (while in pacing step)!",
+                               code=Error.OperationCancelled)
+                return False
+            finally:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+        return True
+
     # Used to introduce some delay after sending data
     def __delay_fuzzing(self):
         '''
@@ -1346,14 +1690,18 @@ class Fuzzer(object):
                 else:
                     self.__current.append((None, dt))
 
-        if self._burst_countdown == self._burst:
-            # log residual just before sending new data to avoid
-            # polluting feedback logs of the next emission
-            cont = self.log_target_residual_feedback()
-            if not cont:
-                return False
+        with self._generation_lock:
+            if self._burst_countdown == self._burst:
+                # log residual just before sending new data to avoid
+                # polluting feedback logs of the next emission
+                cont = self.log_target_residual_feedback()
+                if not cont:
+                    return False
 
-        self.new_transfer_preamble()
+            self.new_transfer_preamble()
+
+        # the emission and the waiting for the target are the steps the
+        # data generation can be overlapped with
         self.send_data(data_list)
 
         ret = self.check_target_readiness()
@@ -1370,13 +1718,14 @@ class Fuzzer(object):
         for dt in data_list:
             dt.make_exportable()
 
-        if multiple_data:
-            self.log_data(data_list, original_data=original_data, get_target_ack=cont0,
-                          verbose=verbose)
-        else:
-            orig = None if not orig_data_provided else original_data[0]
-            self.log_data(data_list[0], original_data=orig, get_target_ack=cont0,
-                          verbose=verbose)
+        with self._generation_lock:
+            if multiple_data:
+                self.log_data(data_list, original_data=original_data, get_target_ack=cont0,
+                              verbose=verbose)
+            else:
+                orig = None if not orig_data_provided else original_data[0]
+                self.log_data(data_list[0], original_data=orig, get_target_ack=cont0,
+                              verbose=verbose)
 
         if cont0:
             cont1 = self.__delay_fuzzing()
@@ -1385,24 +1734,141 @@ class Fuzzer(object):
 
         cont3 = True
         cont4 = True
-        # That means this is the end of a burst
-        if self._burst_countdown == self._burst:
-            cont3 = self.log_target_feedback()
-            # We handle probe feedback if any
-            cont4 = self.monitor_probes()
-            self.tg.cleanup()
+        with self._generation_lock:
+            # That means this is the end of a burst
+            if self._burst_countdown == self._burst:
+                cont3 = self.log_target_feedback()
+                # We handle probe feedback if any
+                cont4 = self.monitor_probes()
+                self.tg.cleanup()
 
-        cont2 = self.__mon.do_after_sending_and_logging_data()
+            cont2 = self.__mon.do_after_sending_and_logging_data()
 
         return cont0 and cont1 and cont2 and cont3 and cont4
 
     @EnforceOrder(accepted_states=['S2'])
+    def send_loop(self, nb, action_list, valid_gen=False, save_seed=False, verbose=False,
+                  stop_on_failure=True):
+        '''
+        Generate (from `action_list`), send and log `nb` data in sequence.
+
+        If the pipeline depth is greater than 0 (refer to :meth:`set_pipeline_depth`),
+        data are generated by a dedicated thread while the previous ones are sent,
+        and their feedback collected and logged. The generation stage can be ahead of
+        the emission stage by at most `pipeline depth` data. Emission, logging and thus
+        data IDs keep the generation order. The generation of a data is serialized with
+        the logging steps of the emission stage (which share the data makers, the
+        logger and the FmkDB with it), thus it only runs concurrently with the emission
+        itself, the waiting for the target and the fuzzing delay. Target and probe
+        code running during these steps shall not use the data model nor the data makers.
+
+        If the batch size is greater than 1 (refer to :meth:`set_batch_size`),
+        the data are generated by batches (refer to :meth:`get_data_batch`) and
+        each batch is sent in one shot (multiple data emission).
+
+        If `stop_on_failure` is False, the loop goes on even if the emission of a
+        data reports a failure (e.g., the target is not ready in time or a probe
+        reports an error), as long as data can be generated.
+
+        Returns:
+          bool: False if the loop has been interrupted before its end, True otherwise.
+        '''
+        if self._pipeline_depth < 1:
+            nb_sent = 0
+            while nb_sent < nb:
+                data = self._get_data_for_loop(action_list, nb - nb_sent, valid_gen=valid_gen,
+                                               save_seed=save_seed)
+                if data is None:
+                    return False
+                cont = self.send_data_and_log(data, verbose=verbose)
+                nb_sent += len(data) if isinstance(data, list) else 1
+                if not cont and stop_on_failure:
+                    return False
+            return True
+
+        gen_queue = queue.Queue(maxsize=self._pipeline_depth)
+        stop_event = threading.Event()
+
+        def generation_stage():
+            try:
+                nb_generated = 0
+                while nb_generated < nb:
+                    data = self._get_data_for_loop(action_list, nb - nb_generated,
+                                                   valid_gen=valid_gen, save_seed=save_seed)
+                    if data is None:
+                        break
+                    data_list = data if isinstance(data, list) else [data]
+                    nb_generated += len(data_list)
+                    for dt in data_list:
+                        # data makers can go on modifying the node they returned (e.g., the
+                        # ones relying on a ModelWalker), thus the emission stage has to
+                        # work on its own copy (the data of a batch are already detached,
+                        # except the last one)
+                        dt.detach_node()
+                    while not stop_event.is_set():
+                        try:
+                            gen_queue.put(data, timeout=0.1)
+                        except queue.Full:
+                            continue
+                        else:
+                            break
+                    if stop_event.is_set():
+                        break
+            except:
+                self._handle_fmk_exception(cause='Data generation has crashed')
+            finally:
+                gen_queue.put(None)
+
+        gen_thread = threading.Thread(target=generation_stage, name='data generation')
+        gen_thread.daemon = True
+        gen_thread.start()
+
+        cont = True
+        nb_sent = 0
+        while True:
+            data = gen_queue.get()
+            if data is None:
+                break
+            cont = self.send_data_and_log(data, verbose=verbose) or not stop_on_failure
+            nb_sent += len(data) if isinstance(data, list) else 1
+            if not cont:
+                break
+
+        # unblock the generation stage if it is waiting for room in the queue
+        stop_event.set()
+        while gen_thread.is_alive():
+            try:
+                gen_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        gen_thread.join()
+
+        return cont and nb_sent == nb
+
+    def _get_data_for_loop(self, action_list, remaining, valid_gen=False, save_seed=False):
+        '''
+        Return the next data to be sent by the loop commands, that is a Data,
+        or a list of Data if the batch size is greater than 1, or None in
+        case of error.
+        '''
+        if self._batch_size > 1 and remaining > 1:
+            batch = self.get_data_batch(action_list, min(self._batch_size, remaining),
+                                        valid_gen=valid_gen, save_seed=save_seed)
+            if batch is not None and len(batch) == 1:
+                return batch[0]
+            return batch
+        else:
+            return self.get_data(action_list, valid_gen=valid_gen, save_seed=save_seed)
+
     def send_data(self, data_list):
         '''
         @data_list: either a list of Data() or a Data()
         '''
         if self.__send_enabled:
 
+            if self._pacer.enabled and not self.__pace(data_list):
+                return
+
             # Monitor hook function before sending
             self.__mon.do_before_sending_data()
 
@@ -1410,10 +1876,16 @@ class Fuzzer(object):
                 # Allow the Target object to act before the FMK send data
                 self.tg.do_before_sending_data(data_list)
 
+                self._last_emission_date = datetime.datetime.now()
                 if len(data_list) == 1:
                     self.tg.send_data(data_list[0])
                 elif len(data_list) > 1:
-                    self.tg.send_multiple_data(data_list)
+                    try:
+                        self.tg.send_multiple_data(data_list)
+                    except NotImplementedError:
+                        # the target cannot send them in one shot
+                        for data in data_list:
+                            self.tg.send_data(data)
                 else:
                     raise ValueError
             except TargetStuck as e:
@@ -1654,8 +2126,21 @@ class Fuzzer(object):
             finally:
                 signal.signal(signal.SIGINT, signal.SIG_IGN)
 
+            if self._pacer.adaptive:
+                self._pacer.report(latency=self._get_ack_latency(), distress=(ret == -1))
+
             return ret
 
+    def _get_ack_latency(self):
+        try:
+            ack_date = self.tg.get_last_target_ack_date()
+        except:
+            self._handle_user_code_exception()
+            return None
+        if ack_date is None or self._last_emission_date is None or ack_date < self._last_emission_date:
+            return None
+        return (ack_date - self._last_emission_date).total_seconds()
+
     @EnforceOrder(accepted_states=['S2'])
     def show_data(self, data, verbose=True):
         if not data.node:
@@ -1930,6 +2415,9 @@ class Fuzzer(object):
             if operation.is_flag_set(Operation.CleanupDMakers):
                 self.cleanup_all_dmakers(reset_existing_seed=False)
 
+            if operation.pacing is not None:
+                self.set_pacing(**operation.pacing)
+
             if operation.is_flag_set(Operation.Stop):
                 self.log_target_feedback()
                 break
@@ -2079,6 +2567,26 @@ class Fuzzer(object):
 
         where action_N can be either: dmaker_type_N or (dmaker_type_N, dmaker_name_N)
         '''
+        with self._generation_lock:
+            batch = self._get_data(action_list, 1, data_orig=data_orig, valid_gen=valid_gen,
+                                   save_seed=save_seed)
+        return None if batch is None else batch[0]
+
+    @EnforceOrder(accepted_states=['S2'])
+    def get_data_batch(self, action_list, nb, data_orig=None, valid_gen=False, save_seed=False):
+        '''
+        Same as :meth:`get_data` but return a list of at most `nb` data, or None
+        in case of error. The action list is processed only once, and the last
+        disruptor is asked for `nb` variants of the data produced by the
+        previous data makers (refer to :meth:`Disruptor.disrupt_data_batch` and
+        :meth:`StatefulDisruptor.disrupt_data_batch`). A stateful disruptor
+        returns fewer variants when it reaches its end.
+        '''
+        with self._generation_lock:
+            return self._get_data(action_list, nb, data_orig=data_orig, valid_gen=valid_gen,
+                                  save_seed=save_seed)
+
+    def _get_data(self, action_list, nb, data_orig=None, valid_gen=False, save_seed=False):
 
         l = []
         action_list = action_list[:]
@@ -2113,6 +2621,7 @@ class Fuzzer(object):
         shortcut_history = []
         unrecoverable_error = False
         activate_all = False
+        batch = None
 
         for full_action, idx in zip(action_list, range(len(action_list))):
 
@@ -2303,17 +2812,31 @@ class Fuzzer(object):
                                 data.materialize()
                                 dmaker_obj.produced_seed = Data(data.get_contents(copy=True))
                     elif isinstance(dmaker_obj, Disruptor):
-                        data = dmaker_obj.disrupt_data(self.dm, self.tg, data)
+                        if last and nb > 1:
+                            batch = dmaker_obj.disrupt_data_batch(self.dm, self.tg, data, nb)
+                        else:
+                            data = dmaker_obj.disrupt_data(self.dm, self.tg, data)
                     elif isinstance(dmaker_obj, StatefulDisruptor):
                         ret = dmaker_obj._set_seed(data)
                         if isinstance(ret, Data):
                             data = ret
                             dmaker_obj.set_attr(DataMakerAttr.NeedSeed)
+                        elif last and nb > 1:
+                            batch = dmaker_obj.disrupt_data_batch(self.dm, self.tg, data, nb)
                         else:
                             data = dmaker_obj.disrupt_data(self.dm, self.tg, data)
                     else:
                         raise ValueError
 
+                    if batch is not None:
+                        if not batch or None in batch:
+                            data = batch = None
+                        else:
+                            # unusable variants are dropped as long as
+                            # the batch is not empty
+                            batch = [d for d in batch if not d.is_unusable()] or batch[:1]
+                            data = batch[0]
+
                     if data is None:
                         unrecoverable_error = True
                         self.set_error("A Data maker shall never return None! (guilty: '%s')" % dmaker_ref,
@@ -2375,22 +2898,32 @@ class Fuzzer(object):
                     unrecoverable_error = True
                     self._handle_user_code_exception("The cleanup() method of Data Maker '%s' has crashed!" % dmaker_ref)
         
+            if batch is None:
+                dt_list = [data]
+            else:
+                dt_list = batch
+
             # if this is the Disruptor that has took over
             if dmaker_obj.is_attr_set(DataMakerAttr.Controller):
-                for info in shortcut_history:
-                    data.add_info(info)
+                for dt in dt_list:
+                    for info in shortcut_history:
+                        dt.add_info(info)
                 shortcut_history = []
 
-            data.bind_info(dmaker_name, dmaker_type)
+            for dt in dt_list:
+                dt.bind_info(dmaker_name, dmaker_type)
             l.append((dmaker_type, dmaker_name, user_input))
             first = False
 
         if unrecoverable_error:
             return None
 
-        data.set_history(l)
-        data.set_initial_dmaker(initial_generator_info)
-        return data
+        if batch is None:
+            batch = [data]
+        for dt in batch:
+            dt.set_history(l)
+            dt.set_initial_dmaker(initial_generator_info)
+        return batch
 
     @EnforceOrder(accepted_states=['S1','S2'])
     def cleanup_all_dmakers(self, reset_existing_seed=True):
@@ -2835,15 +3368,11 @@ class FuzzShell(cmd.Cmd):
 
         arg = line.strip()
 
-        ok = False
-        for dm in self.fz.iter_data_models():
-            if dm.name == arg:
-                ok = True
-                break
+        dm = self.fz.get_data_model_by_name(arg)
 
         self.__error_msg = "Data Model '%s' is not available" % arg
 
-        if not ok:
+        if dm is None:
             return False
 
         if not self.fz.load_data_model(dm=dm):
@@ -2862,7 +3391,7 @@ class FuzzShell(cmd.Cmd):
         args = line.split()
 
         ok = True
-        dm_name_list = [x.name for x in self.fz.dm_list]
+        dm_name_list = self.fz._data_model_names()
         for dm_name in args:
             if dm_name not in dm_name_list:
                 ok = False
@@ -2887,15 +3416,11 @@ class FuzzShell(cmd.Cmd):
 
         arg = line.strip()
 
-        ok = False
-        for prj in self.fz.projects():
-            if prj.name == arg:
-                ok = True
-                break
+        prj = self.fz.get_project_by_name(arg)
 
         self.__error_msg = "Project '%s' is not available" % arg
 
-        if not ok:
+        if prj is None:
             return False
 
         if not self.fz.load_project(prj=prj):
@@ -2937,14 +3462,10 @@ class FuzzShell(cmd.Cmd):
                 self.__error_msg = "Parameter 2 shall be an integer!"
                 return False
 
-        ok = False
-        for prj in self.fz.projects():
-            if prj.name == prj_name:
-                ok = True
-                break
+        prj = self.fz.get_project_by_name(prj_name)
 
         self.__error_msg = "Project '%s' is not available" % prj_name
-        if not ok:
+        if prj is None:
             return False
 
         self.__error_msg = "Unable to launch the project '%s'" % prj_name
@@ -3139,6 +3660,23 @@ class FuzzShell(cmd.Cmd):
         self.fz.disable_wkspace()
         return False
 
+    def do_enable_vectorization(self, line):
+        '''
+        Compute the corruption primitives with NumPy for large data (the
+        generated data then differ from the ones obtained without it)
+        |_ syntax: enable_vectorization
+        '''
+        self.fz.enable_vectorization()
+        return False
+
+    def do_disable_vectorization(self, line):
+        '''
+        Compute the corruption primitives in pure Python (Default)
+        |_ syntax: disable_vectorization
+        '''
+        self.fz.disable_vectorization()
+        return False
+
     def do_send_valid(self, line):
         '''
         Build a data in multiple step from a valid source
@@ -3486,17 +4024,8 @@ class FuzzShell(cmd.Cmd):
             self.__error_msg = "Syntax Error!"
             return False
 
-        for i in range(nb):
-            data = self.fz.get_data(t, valid_gen=valid_gen, save_seed=use_existing_seed)
-
-            if data is None:
-                return False
-
-            cont = self.fz.send_data_and_log(data)
+        self.fz.send_loop(nb, t, valid_gen=valid_gen, save_seed=use_existing_seed)
 
-            if not cont:
-                break
- 
         self.__error = False
         return False
 
@@ -3552,12 +4081,9 @@ class FuzzShell(cmd.Cmd):
 
         action = [((t[0], args[2]), t[1])]
 
-        for i in range(nb):
-            data = self.fz.get_data(action)
-            if data is None:
-                return False
-
-            self.fz.send_data_and_log(data)
+        # contrary to send_loop, this command does not stop when the
+        # emission of a data reports a failure
+        self.fz.send_loop(nb, action, stop_on_failure=False)
 
         self.__error = False
         return False
@@ -3710,6 +4236,86 @@ class FuzzShell(cmd.Cmd):
         return False
 
 
+    def do_set_pipeline(self, line):
+        '''
+        Set the pipeline depth used by the loop commands (Default = 0).
+        |  syntax: set_pipeline <arg>
+        |  |_ possible values for <arg>:
+        |      0  : data are generated, sent and logged in sequence
+        |      N  : data are generated by a dedicated thread while the previous
+        |           ones are sent and logged. Generation can be ahead by N data.
+        '''
+        self.__error = True
+
+        args = line.split()
+        args_len = len(args)
+
+        if args_len != 1:
+            return False
+        try:
+            val = int(args[0])
+            self.fz.set_pipeline_depth(val)
+        except:
+            return False
+
+        self.__error = False
+        return False
+
+
+    def do_set_batch(self, line):
+        '''
+        Set the number of data generated and sent in one shot by the loop
+        commands (Default = 1).
+        |  syntax: set_batch <arg>
+        |  |_ possible values for <arg>:
+        |      1  : each data is generated and sent on its own
+        |      N  : the last disruptor of the action list produces N variants
+        |           at once, which are sent through a multiple data emission
+        '''
+        self.__error = True
+
+        args = line.split()
+        args_len = len(args)
+
+        if args_len != 1:
+            return False
+        try:
+            val = int(args[0])
+            self.fz.set_batch_size(val)
+        except:
+            return False
+
+        self.__error = False
+        return False
+
+
+    def do_set_fbk_max_size(self, line):
+        '''
+        Bound the feedback kept in memory for each feedback source of the
+        target and each data emission (Default = 1048576).
+        |  syntax: set_fbk_max_size <arg>
+        |  |_ possible values for <arg>:
+        |      0  : no limit
+        |     x>0 : maximum size in bytes (the beginning and the end of
+        |           the feedback are kept)
+        '''
+        self.__error = True
+
+        args = line.split()
+        args_len = len(args)
+
+        if args_len != 1:
+            return False
+        try:
+            val = int(args[0])
+            self.fz.set_feedback_max_size(val if val > 0 else None)
+        except:
+            return False
+
+        self.__error = False
+        return False
+
+
     def do_set_burst(self, line):
         '''
         Set the burst value. Used by the FMK to decide when delay
@@ -3736,6 +4342,52 @@ class FuzzShell(cmd.Cmd):
         return False
 
 
+    def do_set_pacing(self, line):
+        '''
+        Hold the target at a given rate, possibly lowered automatically
+        when the target shows signs of distress (Default = off).
+        |  syntax: set_pacing <rate> [data|bytes] [adaptive [max_latency]]
+        |          set_pacing off
+        |  |_ <rate>        : number of data (or bytes) sent per second
+        |  |_ adaptive      : lower the rate when the target is not ready in time,
+        |  |                  when a probe reports an error, or when the target
+        |  |                  acknowledges data later than <max_latency> seconds
+        '''
+        self.__error = True
+
+        args = line.split()
+        args_len = len(args)
+
+        if args_len < 1 or args_len > 4:
+            return False
+        if args_len == 1 and args[0] == 'off':
+            self.fz.set_pacing(None)
+            self.__error = False
+            return False
+
+        try:
+            rate = float(args[0])
+            unit = Pacer.DATA
+            adaptive = False
+            max_latency = None
+            for arg in args[1:]:
+                if arg in (Pacer.DATA, Pacer.BYTES):
+                    unit = arg
+                elif arg == 'adaptive':
+                    adaptive = True
+                elif adaptive and max_latency is None:
+                    max_latency = float(arg)
+                else:
+                    return False
+            if not self.fz.set_pacing(rate, unit=unit, adaptive=adaptive, max_latency=max_latency):
+                return False
+        except:
+            return False
+
+        self.__error = False
+        return False
+
+
     def do_show_db(self, line):
         '''Show the Data Bank'''
         self.fz.show_data_bank()
@@ -24,6 +24,7 @@
 from __future__ import print_function
 
 import sys
+import copy
 import random
 import threading
 
@@ -375,6 +376,10 @@ class UI(object):
         return True, None
 
     def __getattr__(self, name):
+        # special attributes are looked up by pickle/copy before
+        # self.inputs exists
+        if name.startswith('__'):
+            raise AttributeError(name)
         if name in self.inputs:
             return self.inputs[name]
         else:
@@ -653,6 +658,19 @@ class Disruptor(object):
     def disrupt_data(self, dm, target, prev_data):
         raise NotImplementedError
 
+    def disrupt_data_batch(self, dm, target, prev_data, nb):
+        '''
+        Return a list of at most @nb Data, each one being a disruption of
+        @prev_data. By default disrupt_data() is called on copies of
+        @prev_data, but this method can be overloaded when the variants
+        can be produced at once.
+        '''
+        batch = []
+        for i in range(nb):
+            d = prev_data if i == nb - 1 else copy.copy(prev_data)
+            batch.append(self.disrupt_data(dm, target, d))
+        return batch
+
     def setup(self, dm, user_input):
         '''
         --> Specific code
@@ -719,6 +737,7 @@ class StatefulDisruptor(object):
             DataMakerAttr.SetupRequired: True,
             DataMakerAttr.NeedSeed: True
             }
+        self.__handover_pending = False
 
     def set_seed(self, prev_data):
         raise NotImplementedError
@@ -730,6 +749,43 @@ class StatefulDisruptor(object):
         '''
         raise NotImplementedError
 
+    def disrupt_data_batch(self, dm, target, data, nb):
+        '''
+        Return a list of at most @nb Data, that is the next steps of the
+        disruptor. By default disrupt_data() is called @nb times, and the
+        batch is cut short if the disruptor hands over. In this case the
+        handover is notified to the FMK with the next batch. This method
+        can be overloaded when the variants can be produced at once.
+
+        @data: same as for disrupt_data().
+        '''
+        if self.__handover_pending:
+            self.__handover_pending = False
+            for attr in (DataMakerAttr.HandOver, DataMakerAttr.SetupRequired,
+                         DataMakerAttr.NeedSeed):
+                self.set_attr(attr)
+            data.make_unusable()
+            return [data]
+
+        batch = []
+        for i in range(nb):
+            if batch:
+                # disruptors can go on modifying the node they previously
+                # returned (e.g., the ones relying on a ModelWalker)
+                batch[-1].detach_node()
+            d = self.disrupt_data(dm, target, data if i == 0 else fdm.Data())
+            if self.is_attr_set(DataMakerAttr.HandOver):
+                if not batch:
+                    return [d]
+                for attr in (DataMakerAttr.HandOver, DataMakerAttr.SetupRequired,
+                             DataMakerAttr.NeedSeed):
+                    self.clear_attr(attr)
+                self.__handover_pending = True
+                break
+            batch.append(d)
+
+        return batch
+
     def handover(self):
         sys.stdout.write("\n__ disruptor handover '%s' __" % self.__class__.__name__)
         self.set_attr(DataMakerAttr.HandOver)
@@ -788,6 +844,7 @@ class StatefulDisruptor(object):
         self.set_attr(DataMakerAttr.SetupRequired)
         self.set_attr(DataMakerAttr.NeedSeed)
         self.set_attr(DataMakerAttr.Active)
+        self.__handover_pending = False
         self.cleanup()
 
     def _set_seed(self, prev_data):
@@ -24,6 +24,7 @@
 from __future__ import print_function
 
 import os
+import sys
 import random
 import subprocess
 import fcntl
@@ -36,6 +37,8 @@ import copy
 import struct
 import time
 import collections
+import re
+import multiprocessing
 
 import errno
 from socket import error as socket_error
@@ -46,6 +49,42 @@ from fuzzfmk.global_resources import *
 
 class TargetStuck(Exception): pass
 
+
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+
+def _consume_buffers(buffers, count):
+    '''
+    Drop the first ``count`` bytes from the list of memoryviews
+    ``buffers`` (in place), by advancing the offset of the partially
+    consumed buffer rather than copying it.
+    '''
+    while count > 0 and buffers:
+        length = len(buffers[0])
+        if count >= length:
+            count -= length
+            del buffers[0]
+        else:
+            buffers[0] = buffers[0][count:]
+            count = 0
+
+def _write_buffers(fd, buffers):
+    '''
+    Write a list of memoryviews (refer to :meth:`Data.to_buffers`) to
+    the file descriptor ``fd``, through ``os.writev()`` if available.
+    '''
+    buffers = [b for b in buffers if len(b)]
+    while buffers:
+        if hasattr(os, 'writev'):
+            written = os.writev(fd, buffers[:_IOV_MAX])
+        else:
+            written = os.write(fd, buffers[0])
+        _consume_buffers(buffers, written)
+
 class Target(object):
     '''
     Class abstracting the target we interact with.
@@ -53,6 +92,7 @@ class Target(object):
     _logger=None
     _time_beetwen_data_emission = None
     _probes = None
+    _feedback_max_size = 1024*1024
 
     def __init__(self):
         '''
@@ -158,6 +198,27 @@ class Target(object):
     def get_description(self):
         return None
 
+    def set_feedback_max_size(self, max_size):
+        '''
+        Bound the amount of feedback kept in memory for each feedback
+        source and each data emission. Beyond `max_size` bytes, only the
+        beginning and the end of the feedback are kept (refer to
+        :class:`FeedbackBuffer`). Only taken into account by the targets
+        that collect their feedback by themselves (e.g.,
+        :class:`NetworkTarget`, :class:`LocalTarget`). Default is 1 MiB.
+
+        Note that the feedback is not streamed into the FmkDB: it has to
+        go through the feedback handling of the target as a whole before
+        being logged, thus it is bounded when collected instead.
+
+        Args:
+          max_size (int): maximum size in bytes, or None for no limit.
+        '''
+        self._feedback_max_size = max_size
+
+    def get_feedback_max_size(self):
+        return self._feedback_max_size
+
 
     def add_probe(self, probe):
         if self._probes is None:
@@ -206,6 +267,92 @@ class TargetFeedback(object):
         return self._err_code
 
 
+class FeedbackBuffer(object):
+    '''
+    Accumulate the chunks of feedback received from one source, while
+    bounding the memory used. If `max_size` is provided, the first
+    ``max_size // 2`` bytes are kept as is, then only the last bytes
+    are retained (as within a ring buffer), so that no more than
+    `max_size` bytes of feedback are held. The dropped part is replaced
+    by a truncation marker in :meth:`getvalue`.
+
+    Args:
+      max_size (int): maximum number of bytes kept, None for no limit.
+      separator (bytes): inserted between the chunks.
+    '''
+
+    marker = '\n[... {:d} bytes truncated ...]\n'
+
+    def __init__(self, max_size=None, separator=b''):
+        self.max_size = max_size
+        self.separator = separator
+        self.received = 0
+        self.dropped = 0
+        self._head = []
+        self._head_len = 0
+        self._tail = collections.deque()
+        self._tail_len = 0
+        if max_size is None:
+            self._head_max = None
+            self._tail_max = None
+        else:
+            self._head_max = max_size // 2
+            self._tail_max = max_size - self._head_max
+
+    def __len__(self):
+        return self.received
+
+    @property
+    def truncated(self):
+        return self.dropped > 0
+
+    def append(self, chunk):
+        if not chunk:
+            return
+        if self.received and self.separator:
+            chunk = self.separator + chunk
+        self.received += len(chunk)
+
+        if self._head_max is None:
+            self._head.append(chunk)
+            self._head_len += len(chunk)
+            return
+
+        room = self._head_max - self._head_len
+        if room > 0:
+            self._head.append(chunk[:room])
+            self._head_len += min(room, len(chunk))
+            chunk = chunk[room:]
+            if not chunk:
+                return
+
+        self._tail.append(chunk)
+        self._tail_len += len(chunk)
+        excess = self._tail_len - self._tail_max
+        while excess > 0:
+            first = self._tail[0]
+            if len(first) <= excess:
+                self._tail.popleft()
+                sz = len(first)
+            else:
+                self._tail[0] = first[excess:]
+                sz = excess
+            self._tail_len -= sz
+            self.dropped += sz
+            excess -= sz
+
+    def chunks(self):
+        for c in self._head:
+            yield c
+        if self.dropped:
+            yield self.marker.format(self.dropped).encode('latin_1')
+        for c in self._tail:
+            yield c
+
+    def getvalue(self):
+        return b''.join(self.chunks())
+
+
 class EmptyTarget(Target):
 
     def send_data(self, data):
@@ -215,6 +362,119 @@ class EmptyTarget(Target):
         pass
 
 
+class ConnectionPool(object):
+    '''
+    Client connections to one target interface, that are kept
+    open between emissions in order to avoid a connection setup for
+    each of them.
+    '''
+
+    def __init__(self, max_size=1, max_uses=None, max_idle_time=None):
+        '''
+        Args:
+          max_size (int): maximum number of idle connections kept in the pool.
+          max_uses (int): number of emissions after which a connection is
+            closed. If `None`, there is no limit.
+          max_idle_time (float): delay (in seconds) after which an idle
+            connection is not reused anymore. If `None`, there is no limit.
+        '''
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_idle_time = max_idle_time
+        self.connection_count = 0
+        self.reuse_count = 0
+        self._idle = []  # list of (socket, uses, release date)
+        self._in_use = {}  # socket -> uses
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_alive(s):
+        '''
+        Health check of an idle connection. A readable socket is not
+        reusable: either the peer closed it, or it holds late data related
+        to a previous emission, which would otherwise be reported as the
+        feedback of the next one.
+        '''
+        try:
+            if s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) != 0:
+                return False
+            ready_to_read, ready_to_write, in_error = select.select([s], [], [], 0)
+        except (socket_error, ValueError):
+            return False
+        return not ready_to_read
+
+    @staticmethod
+    def close_connection(s):
+        s.close()
+
+    def acquire(self):
+        '''
+        Returns:
+          socket: a healthy idle connection, or None if there is no one.
+        '''
+        with self._lock:
+            while self._idle:
+                s, uses, release_date = self._idle.pop()
+                if self.max_idle_time is not None and \
+                   time.time() - release_date > self.max_idle_time:
+                    self.close_connection(s)
+                elif not self.is_alive(s):
+                    self.close_connection(s)
+                else:
+                    self._in_use[s] = uses + 1
+                    self.reuse_count += 1
+                    return s
+        return None
+
+    def add(self, s):
+        '''
+        Register a new connection, which is considered in use.
+        '''
+        with self._lock:
+            self._in_use[s] = 1
+            self.connection_count += 1
+
+    def owns(self, s):
+        with self._lock:
+            return s in self._in_use
+
+    def release(self, s):
+        '''
+        Give back a connection after use.
+
+        Returns:
+          bool: True if the connection is kept in the pool, False if the
+          caller has to close it.
+        '''
+        with self._lock:
+            uses = self._in_use.pop(s, None)
+            if uses is None:
+                return False
+            if (self.max_uses is None or uses < self.max_uses) and \
+               len(self._idle) < self.max_size and self.is_alive(s):
+                self._idle.append((s, uses, time.time()))
+                return True
+        return False
+
+    def discard(self, s):
+        '''
+        Forget a connection (that the caller will close).
+
+        Returns:
+          int: the number of emissions performed through the connection,
+          or None if it does not belong to the pool.
+        '''
+        with self._lock:
+            return self._in_use.pop(s, None)
+
+    def close(self):
+        with self._lock:
+            for s, uses, release_date in self._idle:
+                self.close_connection(s)
+            self._idle = []
+            self._in_use = {}
+
+
 class NetworkTarget(Target):
     '''Generic target class for interacting with a network resource. Can
     be used directly, but some methods may require to be overloaded to
@@ -284,6 +544,8 @@ class NetworkTarget(Target):
         self.stop_event = threading.Event()
         self._server_thread_lock = threading.Lock()
 
+        self._conn_pools = {}
+
 
     def register_new_interface(self, host, port, socket_type, data_semantics, server_mode=False,
                                hold_connection=False):
@@ -296,6 +558,32 @@ class NetworkTarget(Target):
         self._default_fbk_id[(host, port)] = self._default_fbk_socket_id + ' - {:s}:{:d}'.format(host, port)
         self.hold_connection[(host, port)] = hold_connection
 
+    def set_connection_pool(self, host=None, port=None, max_size=1, max_uses=None,
+                            max_idle_time=None):
+        '''
+        Reuse the connections to an interface of the target between
+        emissions, instead of connecting to it for each one. Connections are
+        checked before being reused, and if the target closed one in the
+        meantime, a new one is transparently created. Only relevant for
+        interfaces in client mode and without `hold_connection`.
+
+        Args:
+          host (str): interface IP address (default: the main interface).
+          port (int): interface port (default: the main interface).
+          max_size (int): maximum number of idle connections kept open.
+          max_uses (int): number of emissions after which a connection is closed.
+          max_idle_time (float): delay (in seconds) after which an idle
+            connection is not reused anymore.
+
+        Returns:
+          ConnectionPool: the pool of connections of the interface
+        '''
+        host = self.host if host is None else host
+        port = self.port if port is None else port
+        pool = ConnectionPool(max_size=max_size, max_uses=max_uses, max_idle_time=max_idle_time)
+        self._conn_pools[(host, port)] = pool
+        return pool
+
     def set_timeout(self, fbk_timeout, sending_delay):
         self._feedback_timeout = max(fbk_timeout, 0.2)
         self._sending_delay = min(sending_delay, max(self._feedback_timeout-0.2, 0))
@@ -502,11 +790,15 @@ class NetworkTarget(Target):
                                     # could be updated many times if
                                     # self.send_multiple_data() is
                                     # used.
+        self._start_fbk_collector_thread()
         self._connect_to_additional_feedback_sockets()
         return self.initialize()
 
     def stop(self):
         self.stop_event.set()
+        self._stop_fbk_collector_thread()
+        for pool in self._conn_pools.values():
+            pool.close()
         for s in self._server_sock2hp.keys():
             s.close()
         for s in self._last_client_sock2hp.keys():
@@ -626,6 +918,12 @@ class NetworkTarget(Target):
         if self.hold_connection[(host, port)] and (host, port) in self._hclient_hp2sock.keys():
             return self._hclient_hp2sock[(host, port)]
 
+        pool = None if self.hold_connection[(host, port)] else self._conn_pools.get((host, port), None)
+        if pool is not None:
+            s = pool.acquire()
+            if s is not None:
+                return s
+
         family, sock_type = socket_type
         s = socket.socket(family, sock_type)
 
@@ -641,9 +939,34 @@ class NetworkTarget(Target):
         if self.hold_connection[(host, port)]:
             self._hclient_sock2hp[s] = (host, port)
             self._hclient_hp2sock[(host, port)] = s
+        elif pool is not None:
+            pool.add(s)
 
         return s
 
+    def _reconnect_to_target(self, s, host, port, socket_type):
+        # Only connections reused from a pool are reestablished, as the
+        # target may have closed them in the meantime.
+        pool = self._conn_pools.get((host, port), None)
+        if pool is None:
+            return None
+        uses = pool.discard(s)
+        if uses is None or uses < 2:
+            return None
+        s.close()
+        return self._connect_to_target(host, port, socket_type)
+
+    def _release_to_pool(self, s):
+        for pool in self._conn_pools.values():
+            if pool.owns(s):
+                return pool.release(s)
+        return False
+
+    def _discard_from_pool(self, s):
+        for pool in self._conn_pools.values():
+            if pool.discard(s) is not None:
+                break
+
 
     def _listen_to_target(self, host, port, socket_type, func, args=None):
         if (host, port) in self._server_sock2hp.values():
@@ -728,120 +1051,218 @@ class NetworkTarget(Target):
         self._send_data([clientsocket], {clientsocket:(data, host, port)}, self._sending_id)
 
 
-    def _collect_feedback_from(self, fbk_sockets, fbk_ids, fbk_lengths, epobj, fileno2fd,
-                               send_id, fbk_timeout):
-
-        def _check_and_handle_obsolete_socket(socket, error=None, error_list=None):
-            # print('\n*** NOTE: Remove obsolete socket {!r}'.format(socket))
-            epobj.unregister(socket)
-            self._server_thread_lock.acquire()
-            if socket in self._last_client_sock2hp.keys():
-                if error is not None:
-                    error_list.append((fbk_ids[socket], error))
-                host, port = self._last_client_sock2hp[socket]
-                del self._last_client_sock2hp[socket]
-                del self._last_client_hp2sock[(host, port)]
-                self._server_thread_lock.release()
-            else:
-                self._server_thread_lock.release()
-                with self.socket_desc_lock:
-                    if socket in self._hclient_sock2hp.keys():
-                        if error is not None:
-                            error_list.append((fbk_ids[socket], error))
-                        host, port = self._hclient_sock2hp[socket]
-                        del self._hclient_sock2hp[socket]
-                        del self._hclient_hp2sock[(host, port)]
-                    if socket in self._additional_fbk_sockets:
-                        if error is not None:
-                            error_list.append((self._additional_fbk_ids[socket], error))
-                        self._additional_fbk_sockets.remove(socket)
-                        del self._additional_fbk_ids[socket]
-                        del self._additional_fbk_lengths[socket]
-
-
-        chunks = collections.OrderedDict()
-        t0 = datetime.datetime.now()
-        duration = 0
-        first_pass = True
-        ack_date = None
-        dont_stop = True
-
-        bytes_recd = {}
-        for fd in fbk_sockets:
-            bytes_recd[fd] = 0
-            chunks[fd] = []
-
-        socket_errors = []
-
-        while dont_stop:
-            ready_to_read = []
-            for fd, ev in epobj.poll(timeout=0.2):
-                socket = fileno2fd[fd]
-                if ev != select.EPOLLIN:
-                    _check_and_handle_obsolete_socket(socket, error=ev, error_list=socket_errors)
-                    if socket in fbk_sockets:
-                        fbk_sockets.remove(socket)
+    def _fbk_watch(self, socket, eventmask=select.EPOLLIN):
+        # Sockets stay registered within the collector epoll set. When
+        # no emission is waiting for their feedback, their event mask is
+        # simply cleared.
+        fd = socket.fileno()
+        self._fbk_fileno2sock[fd] = socket
+        try:
+            self._fbk_epobj.modify(fd, eventmask)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            self._fbk_epobj.register(fd, eventmask)
+
+    def _fbk_unwatch(self, socket):
+        fd = self._get_fileno(socket)
+        if fd < 0:
+            return
+        if self._fbk_fileno2sock.get(fd) is socket:
+            del self._fbk_fileno2sock[fd]
+        try:
+            self._fbk_epobj.unregister(fd)
+        except (IOError, OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _get_fileno(socket):
+        try:
+            return socket.fileno()
+        except socket_error:
+            # python2 closed socket
+            return -1
+
+    def _handle_obsolete_fbk_socket(self, socket, fbk_ids, error=None, error_list=None):
+        # print('\n*** NOTE: Remove obsolete socket {!r}'.format(socket))
+        self._fbk_unwatch(socket)
+        self._server_thread_lock.acquire()
+        if socket in self._last_client_sock2hp.keys():
+            if error is not None:
+                error_list.append((fbk_ids[socket], error))
+            host, port = self._last_client_sock2hp[socket]
+            del self._last_client_sock2hp[socket]
+            del self._last_client_hp2sock[(host, port)]
+            self._server_thread_lock.release()
+        else:
+            self._server_thread_lock.release()
+            with self.socket_desc_lock:
+                if socket in self._hclient_sock2hp.keys():
+                    if error is not None:
+                        error_list.append((fbk_ids[socket], error))
+                    host, port = self._hclient_sock2hp[socket]
+                    del self._hclient_sock2hp[socket]
+                    del self._hclient_hp2sock[(host, port)]
+                if socket in self._additional_fbk_sockets:
+                    if error is not None:
+                        error_list.append((self._additional_fbk_ids[socket], error))
+                    self._additional_fbk_sockets.remove(socket)
+                    del self._additional_fbk_ids[socket]
+                    del self._additional_fbk_lengths[socket]
+
+    def _start_fbk_collector_thread(self):
+        self._fbk_epobj = select.epoll()
+        self._fbk_fileno2sock = {}
+        self._fbk_sessions = []
+        self._fbk_sock2session = {}
+        self._fbk_sessions_lock = threading.Lock()
+        self._fbk_collector_stop = threading.Event()
+
+        # used to wake up the collector when a new emission is registered
+        self._fbk_wakeup_r, self._fbk_wakeup_w = os.pipe()
+        fcntl.fcntl(self._fbk_wakeup_r, fcntl.F_SETFL, os.O_NONBLOCK)
+        self._fbk_epobj.register(self._fbk_wakeup_r, select.EPOLLIN)
+
+        self._fbk_collector = threading.Thread(None, self._collect_feedback, name='FBK-COLLECTOR')
+        self._fbk_collector.start()
+
+    def _stop_fbk_collector_thread(self):
+        self._fbk_collector_stop.set()
+        os.write(self._fbk_wakeup_w, b'x')
+        self._fbk_collector.join()
+        self._fbk_epobj.close()
+        os.close(self._fbk_wakeup_r)
+        os.close(self._fbk_wakeup_w)
+        self._fbk_fileno2sock = None
+        self._fbk_sock2session = None
+
+    def _collect_feedback(self):
+        # Main loop of the feedback collector. Each call to
+        # _start_fbk_collector() registers a session gathering the
+        # sockets to get feedback from, related to one emission.
+
+        while not self._fbk_collector_stop.is_set():
+            with self._fbk_sessions_lock:
+                deadlines = [session['deadline'] for session in self._fbk_sessions]
+            timeout = max(min(deadlines) - time.time(), 0) if deadlines else -1
+
+            try:
+                events = self._fbk_epobj.poll(timeout)
+            except (IOError, OSError) as e:
+                if e.errno == errno.EINTR:
                     continue
-                ready_to_read.append(socket)
+                raise
 
             now = datetime.datetime.now()
-            duration = (now - t0).total_seconds()
-            if ready_to_read:
-                if first_pass:
-                    first_pass = False
-                    self._register_last_ack_date(now)
-                for s in ready_to_read:
-                    if fbk_lengths[s] is None:
-                        sz = NetworkTarget.CHUNK_SZ
-                    else:
-                        sz = min(fbk_lengths[s] - bytes_recd[s], NetworkTarget.CHUNK_SZ)
-                    chunk = s.recv(sz)
-                    if chunk == b'':
-                        # print('\n*** NOTE: Nothing more to receive from : {!r}'.format(fbk_ids[s]))
-                        fbk_sockets.remove(s)
-                        _check_and_handle_obsolete_socket(s)
-                        s.close()
+            with self._fbk_sessions_lock:
+                for fd, ev in events:
+                    if fd == self._fbk_wakeup_r:
+                        try:
+                            os.read(fd, 512)
+                        except OSError:
+                            pass
                         continue
-                    else:
-                        bytes_recd[s] = bytes_recd[s] + len(chunk)
-                        chunks[s].append(chunk)
-
-            if fbk_sockets:
-                for s in fbk_sockets:
-                    if s in ready_to_read:
-                        s_fbk_len = fbk_lengths[s]
-                        if s_fbk_len is None or bytes_recd[s] < s_fbk_len:
-                            dont_stop = True
-                            break
-                    else:
-                        dont_stop = True
-                        break
-                else:
-                    dont_stop = False
-
-                if duration > fbk_timeout:
-                    dont_stop = False
+                    socket = self._fbk_fileno2sock.get(fd, None)
+                    if socket is None:
+                        continue
+                    session = self._fbk_sock2session.get(socket, None)
+                    if ev != select.EPOLLIN:
+                        if session is None:
+                            self._handle_obsolete_fbk_socket(socket, None)
+                        else:
+                            self._handle_obsolete_fbk_socket(socket, session['ids'], error=ev,
+                                                             error_list=session['errors'])
+                            session['sockets'].remove(socket)
+                            del self._fbk_sock2session[socket]
+                        continue
+                    if session is None:
+                        # nobody is waiting for this feedback for now
+                        self._fbk_watch(socket, 0)
+                        continue
+                    self._read_feedback_chunk(session, socket, now)
+
+                current_time = time.time()
+                completed = []
+                for session in self._fbk_sessions:
+                    if self._is_fbk_session_complete(session, current_time):
+                        completed.append(session)
+                for session in completed:
+                    self._fbk_sessions.remove(session)
+
+            for session in completed:
+                self._complete_fbk_session(session)
+
+        with self._fbk_sessions_lock:
+            completed = self._fbk_sessions
+            self._fbk_sessions = []
+        for session in completed:
+            self._complete_fbk_session(session)
+
+    def _read_feedback_chunk(self, session, s, now):
+        if session['first_pass']:
+            session['first_pass'] = False
+            self._register_last_ack_date(now)
+
+        fbk_length = session['lengths'][s]
+        if fbk_length is None:
+            sz = NetworkTarget.CHUNK_SZ
+        else:
+            sz = min(fbk_length - session['bytes_recd'][s], NetworkTarget.CHUNK_SZ)
+        try:
+            chunk = s.recv(sz)
+        except socket_error as serr:
+            if serr.errno in [errno.EAGAIN, errno.EWOULDBLOCK]:
+                return
+            chunk = b''
+
+        if chunk == b'':
+            # print('\n*** NOTE: Nothing more to receive from : {!r}'.format(session['ids'][s]))
+            session['sockets'].remove(s)
+            del self._fbk_sock2session[s]
+            self._handle_obsolete_fbk_socket(s, session['ids'])
+            self._discard_from_pool(s)
+            s.close()
+        else:
+            session['bytes_recd'][s] += len(chunk)
+            session['chunks'][s].append(chunk)
 
-            else:
-                dont_stop = False
+    def _is_fbk_session_complete(self, session, current_time):
+        if not session['sockets'] or current_time >= session['deadline']:
+            return True
+        for s in session['sockets']:
+            fbk_length = session['lengths'][s]
+            if fbk_length is None or session['bytes_recd'][s] < fbk_length:
+                return False
+        return True
 
-        for s, chks in chunks.items():
-            fbk = b'\n'.join(chks)
+    def _complete_fbk_session(self, session):
+        for s, chks in session['chunks'].items():
+            fbk = chks.getvalue()
             with self._fbk_handling_lock:
-                fbk, fbkid = self._feedback_handling(fbk, fbk_ids[s])
+                fbk, fbkid = self._feedback_handling(fbk, session['ids'][s])
                 self._feedback_collect(fbk, fbkid)
-                if s not in self._additional_fbk_sockets and \
-                   s not in self._hclient_sock2hp.keys() and \
-                   s not in self._last_client_sock2hp.keys():
+            with self._fbk_sessions_lock:
+                if self._fbk_sock2session.get(s, None) is session:
+                    del self._fbk_sock2session[s]
+                elif s in self._fbk_sock2session:
+                    # socket used for a more recent emission
+                    continue
+                if self._get_fileno(s) < 0:
+                    continue
+                if s in self._additional_fbk_sockets or \
+                   s in self._hclient_sock2hp.keys() or \
+                   s in self._last_client_sock2hp.keys() or \
+                   self._release_to_pool(s):
+                    self._fbk_watch(s, 0)
+                else:
+                    self._fbk_unwatch(s)
                     s.close()
 
         with self._fbk_handling_lock:
-            for fbkid, ev in socket_errors:
+            for fbkid, ev in session['errors']:
                 self._feedback_collect(">>> ERROR[{:d}]: unable to interact with '{:s}' "
                                        "<<<".format(ev,fbkid), fbkid, error=-ev)
-            self._feedback_complete(send_id)
-
-        return
+            self._feedback_complete(session['sid'])
 
 
     def _send_data(self, sockets, data_refs, sid):
@@ -852,48 +1273,23 @@ class NetworkTarget(Target):
         ready_to_read, ready_to_write, in_error = select.select([], sockets, [], self._sending_delay)
         if ready_to_write:
 
-            epobj = select.epoll()
-            fileno2fd = {}
-
             if self._first_send_data_call:
                 self._first_send_data_call = False
-
                 fbk_sockets, fbk_ids, fbk_lengths = self._get_additional_feedback_sockets()
-                if fbk_sockets:
-                    for fd in fbk_sockets:
-                        epobj.register(fd, select.EPOLLIN)
-                        fileno2fd[fd.fileno()] = fd
             else:
                 fbk_sockets, fbk_ids, fbk_lengths = None, None, None
 
             for s in ready_to_write:
-                add_main_socket = True
                 data, host, port = data_refs[s]
 
-                epobj.register(s, select.EPOLLIN)
-                fileno2fd[s.fileno()] = s
-
-                raw_data = data.to_bytes()
-                totalsent = 0
-                send_retry = 0
-                while totalsent < len(raw_data) and send_retry < 10:
-                    try:
-                        sent = s.send(raw_data[totalsent:])
-                    except socket.error as serr:
-                        send_retry += 1
-                        print('\n*** ERROR: ' + str(serr))
-                        if serr.errno == socket.errno.EWOULDBLOCK:
-                            time.sleep(0.2)
-                            continue
-                        else:
-                            add_main_socket = False
-                            raise TargetStuck("system not ready for sending data!")
-                            # break
-                    else:
-                        if sent == 0:
-                            s.close()
-                            raise TargetStuck("socket connection broken")
-                        totalsent = totalsent + sent
+                buffers = data.to_buffers()
+                try:
+                    self._send_buffers(s, buffers)
+                except TargetStuck:
+                    s = self._reconnect_to_target(s, host, port, self._get_net_info_from(data)[2])
+                    if s is None:
+                        raise
+                    self._send_buffers(s, buffers)
 
                 if fbk_sockets is None:
                     assert(fbk_ids is None)
@@ -904,25 +1300,76 @@ class NetworkTarget(Target):
                 else:
                     assert(self._default_fbk_id[(host, port)] not in fbk_ids.values())
 
-                if add_main_socket:
-                    fbk_sockets.append(s)
-                    fbk_ids[s] = self._default_fbk_id[(host, port)]
-                    fbk_lengths[s] = self.feedback_length
+                fbk_sockets.append(s)
+                fbk_ids[s] = self._default_fbk_id[(host, port)]
+                fbk_lengths[s] = self.feedback_length
 
-            self._start_fbk_collector(fbk_sockets, fbk_ids, fbk_lengths, epobj, fileno2fd)
+            self._start_fbk_collector(fbk_sockets, fbk_ids, fbk_lengths)
 
         else:
             raise TargetStuck("system not ready for sending data!")
 
 
-    def _start_fbk_collector(self, fbk_sockets, fbk_ids, fbk_lengths, epobj, fileno2fd):
+    def _send_buffers(self, s, buffers):
+        # The buffers (refer to Data.to_buffers()) are sent in one go
+        # through sendmsg() when available. Partial sends only advance
+        # the offset within the memoryviews, so that the data is never
+        # copied.
+        buffers = [b for b in buffers if len(b)]
+        use_sendmsg = hasattr(s, 'sendmsg')
+        if s.type == socket.SOCK_DGRAM and len(buffers) > 1 and \
+           (not use_sendmsg or len(buffers) > _IOV_MAX):
+            # a datagram has to be sent through one call
+            buffers = [memoryview(b''.join(buffers))]
+        send_retry = 0
+        while buffers and send_retry < 10:
+            try:
+                if use_sendmsg:
+                    sent = s.sendmsg(buffers[:_IOV_MAX])
+                else:
+                    sent = s.send(buffers[0])
+            except socket.error as serr:
+                send_retry += 1
+                print('\n*** ERROR: ' + str(serr))
+                if serr.errno == socket.errno.EWOULDBLOCK:
+                    time.sleep(0.2)
+                    continue
+                else:
+                    raise TargetStuck("system not ready for sending data!")
+            else:
+                if sent == 0:
+                    s.close()
+                    raise TargetStuck("socket connection broken")
+                _consume_buffers(buffers, sent)
+
+    def _start_fbk_collector(self, fbk_sockets, fbk_ids, fbk_lengths):
+        # Hand the sockets over to the feedback collector thread (started
+        # by start()), which gathers the feedback related to the current
+        # sending ID until the feedback timeout expires.
         self._thread_cpt += 1
         self.feedback_thread_qty += 1
-        feedback_thread = threading.Thread(None, self._collect_feedback_from,
-                                           name='FBK-' + repr(self._sending_id) + '#' + repr(self._thread_cpt),
-                                           args=(fbk_sockets, fbk_ids, fbk_lengths, epobj, fileno2fd,
-                                                 self._sending_id, self._feedback_timeout))
-        feedback_thread.start()
+        session = {
+            'sid': self._sending_id,
+            'sockets': list(fbk_sockets) if fbk_sockets else [],
+            'ids': fbk_ids if fbk_ids else {},
+            'lengths': fbk_lengths if fbk_lengths else {},
+            'chunks': collections.OrderedDict(),
+            'bytes_recd': {},
+            'errors': [],
+            'first_pass': True,
+            'deadline': time.time() + self._feedback_timeout
+        }
+        with self._fbk_sessions_lock:
+            for s in session['sockets']:
+                session['chunks'][s] = FeedbackBuffer(self._feedback_max_size, separator=b'\n')
+                session['bytes_recd'][s] = 0
+                previous_session = self._fbk_sock2session.get(s, None)
+                if previous_session is not None:
+                    previous_session['sockets'].remove(s)
+                self._fbk_sock2session[s] = session
+                self._fbk_watch(s)
+            self._fbk_sessions.append(session)
+        os.write(self._fbk_wakeup_w, b'x')
 
 
 
@@ -978,6 +1425,520 @@ class NetworkTarget(Target):
 
 
 
+class _AsyncTargetProtocol(object):
+    '''
+    asyncio protocol (for stream and datagram endpoints) forwarding the
+    events of one connection to the AsyncNetworkTarget that owns it.
+    '''
+
+    def __init__(self, target, hp, kind, fbk_id, fbk_length=None):
+        self.target = target
+        self.hp = hp
+        self.kind = kind  # 'client', 'server' or 'fbk'
+        self.fbk_id = fbk_id
+        self.fbk_length = fbk_length
+        self.transport = None
+        self.session = None
+        self.pending_chunks = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.target._connection_made(self)
+
+    def data_received(self, data):
+        self.target._data_received(self, data)
+
+    def datagram_received(self, data, addr):
+        self.target._data_received(self, data)
+
+    def eof_received(self):
+        return False
+
+    def error_received(self, exc):
+        self.transport.close()
+
+    def connection_lost(self, exc):
+        self.target._connection_lost(self, exc)
+
+    def pause_writing(self):
+        pass
+
+    def resume_writing(self):
+        pass
+
+
+class _AsyncConnectionPool(ConnectionPool):
+    '''
+    :class:`ConnectionPool` of the asyncio protocols of an
+    :class:`AsyncNetworkTarget`.
+    '''
+
+    @staticmethod
+    def is_alive(proto):
+        # Data received while idle relates to a previous emission
+        return not proto.transport.is_closing() and not proto.pending_chunks
+
+    @staticmethod
+    def close_connection(proto):
+        proto.transport.close()
+
+
+class AsyncNetworkTarget(NetworkTarget):
+    '''Variant of :class:`NetworkTarget` built on asyncio (python >= 3.5.1).
+
+    All the client, server and feedback sockets are multiplexed within
+    one event loop running in a dedicated thread. Emissions do not block:
+    :meth:`send_data` returns as soon as the data is scheduled, and
+    :meth:`send_data_nowait` enables to have many emissions (and thus many
+    connections to the target) in flight at the same time.
+
+    The configuration interface is the one of :class:`NetworkTarget`,
+    connection pools included.
+    '''
+
+    def start(self):
+        if not asyncio_module:
+            print('/!\\ ERROR /!\\: the AsyncNetworkTarget has been disabled because asyncio is not available')
+            return False
+
+        self._feedback_handled = None
+        self.feedback_thread_qty = 0
+        self.feedback_complete_cpt = 0
+        self._sending_id = 0
+        self._first_send_data_call = True
+        self._thread_cpt = 0
+        self._last_ack_date = None
+
+        # Only accessed from the event loop thread
+        self._protocols = set()
+        self._held_protocols = {}  # (host, port) -> protocol, for hold_connection
+        self._fbk_protocols = []
+        self._servers = {}  # (host, port) -> list of asyncio servers
+        self._server_pending = {}  # (host, port) -> list of emissions waiting for a client
+        self._sessions = []
+        self._tasks = set()
+
+        self._dynamic_interfaces = {}
+        self._resolved_addresses = {}
+
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(None, self._run_loop, name='ASYNC-NET-TG')
+        self._loop_thread.start()
+
+        for host, port, socket_type, fbk_id, fbk_length, server_mode in self._additional_fbk_desc.values():
+            self._open_fbk_interface(host, port, socket_type, fbk_id, fbk_length, server_mode)
+
+        return self.initialize()
+
+    def stop(self):
+        # the event loop does not exist if start() has failed early, or
+        # if the target has already been stopped
+        loop = getattr(self, '_loop', None)
+        if loop is not None:
+            loop.call_soon_threadsafe(self._shutdown)
+            self._loop_thread.join()
+            loop.close()
+            self._loop = None
+
+        return self.terminate()
+
+    def send_data(self, data):
+        self._submit([data], report=True)
+
+    def send_multiple_data(self, data_list):
+        self._submit(data_list, report=True)
+
+    def send_data_nowait(self, data_list):
+        '''
+        Send data to the target without any interaction with the
+        framework: neither :meth:`do_before_sending_data` nor
+        :meth:`is_target_ready_for_new_data` are involved, and the
+        feedback is not reported through :meth:`get_feedback`.
+
+        Args:
+          data_list (list): a Data, or a list of Data to send in one shot
+
+        Returns:
+          concurrent.futures.Future: resolved with a
+          :class:`TargetFeedback` gathering the feedback related to this
+          emission only.
+        '''
+        if not isinstance(data_list, (list, tuple)):
+            data_list = [data_list]
+        return self._submit(data_list, report=False)
+
+    def connect_to(self, host, port, ref_id,
+                   socket_type=(socket.AF_INET, socket.SOCK_STREAM),
+                   chk_size=NetworkTarget.CHUNK_SZ, hold_connection=True):
+        self.hold_connection[(host, port)] = hold_connection
+        self._open_fbk_interface(host, port, socket_type, ref_id, chk_size, server_mode=False)
+        self._dynamic_interfaces[(host, port)] = ref_id
+
+    def listen_to(self, host, port, ref_id,
+                  socket_type=(socket.AF_INET, socket.SOCK_STREAM),
+                  chk_size=NetworkTarget.CHUNK_SZ, wait_time=None, hold_connection=True):
+        self.hold_connection[(host, port)] = hold_connection
+        self._open_fbk_interface(host, port, socket_type, ref_id, chk_size, server_mode=True)
+        self._dynamic_interfaces[(host, port)] = ref_id
+
+    def set_connection_pool(self, host=None, port=None, max_size=1, max_uses=None,
+                            max_idle_time=None):
+        host = self.host if host is None else host
+        port = self.port if port is None else port
+        pool = _AsyncConnectionPool(max_size=max_size, max_uses=max_uses,
+                                    max_idle_time=max_idle_time)
+        self._conn_pools[(host, port)] = pool
+        return pool
+
+    def remove_dynamic_interface(self, host, port):
+        if (host, port) in self._dynamic_interfaces:
+            del self._dynamic_interfaces[(host, port)]
+            self._loop.call_soon_threadsafe(self._close_fbk_interface, (host, port))
+        else:
+            print('\n*** WARNING: Unable to remove inexistent interface ({:s}:{:d})'.format(host,port))
+
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _shutdown(self):
+        for entries in self._server_pending.values():
+            for entry in entries:
+                entry[2].cancel()
+        self._server_pending = {}
+        for task in self._tasks:
+            task.cancel()
+        for session in list(self._sessions):
+            self._complete_session(session)
+        for servers in self._servers.values():
+            for server in servers:
+                server.close()
+        for pool in self._conn_pools.values():
+            pool.close()
+        for proto in list(self._protocols):
+            proto.transport.close()
+        # let the transports be closed before stopping
+        self._loop.call_soon(self._loop.stop)
+
+    def _create_task(self, coro, callback):
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(callback)
+        return task
+
+    def _resolve(self, hp, socket_type):
+        # Addresses are resolved by the calling thread, otherwise the
+        # event loop would resort to its executor, and thus to
+        # additional threads.
+        addr = self._resolved_addresses.get(hp, None)
+        if addr is None:
+            family, sock_type = socket_type
+            try:
+                addr = socket.getaddrinfo(hp[0], hp[1], family, sock_type)[0][4][:2]
+            except socket.error:
+                # not cached, as the resolution may succeed next time
+                return hp
+            self._resolved_addresses[hp] = addr
+        return addr
+
+    def _open_fbk_interface(self, host, port, socket_type, fbk_id, fbk_length, server_mode):
+        family, sock_type = socket_type
+        addr = self._resolve((host, port), socket_type)
+        factory = lambda: _AsyncTargetProtocol(self, (host, port), 'fbk', fbk_id, fbk_length)
+        if sock_type == socket.SOCK_DGRAM:
+            if server_mode:
+                coro = self._loop.create_datagram_endpoint(factory, local_addr=addr, family=family)
+            else:
+                coro = self._loop.create_datagram_endpoint(factory, remote_addr=addr, family=family)
+        elif server_mode:
+            coro = self._loop.create_server(factory, addr[0], addr[1], family=family, reuse_address=True)
+        else:
+            coro = self._loop.create_connection(factory, addr[0], addr[1], family=family)
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            ret = future.result(self._sending_delay)
+        except Exception:
+            future.cancel()
+            self._logger.log_comment('WARNING: Unable to connect to {:s}:{:d}'.format(host, port))
+            return False
+
+        if server_mode and sock_type == socket.SOCK_STREAM:
+            self._loop.call_soon_threadsafe(self._register_server, (host, port), ret)
+
+        return True
+
+    def _register_server(self, hp, server):
+        self._servers.setdefault(hp, []).append(server)
+
+    def _close_fbk_interface(self, hp):
+        for server in self._servers.pop(hp, []):
+            server.close()
+        for proto in list(self._fbk_protocols):
+            if proto.hp == hp:
+                proto.transport.close()
+
+
+    def _submit(self, data_list, report):
+        session = {
+            'sid': self._sending_id,
+            'report': report,
+            'feedback': TargetFeedback(),
+            'future': concurrent.futures.Future(),
+            'chunks': collections.OrderedDict(),
+            'bytes_recd': {},
+            'lengths': {},
+            'open': set(),
+            'errors': [],
+            'waiting': 0,
+            'first_pass': True,
+            'done': False,
+            'timer': None
+        }
+
+        emissions = []
+        for data in data_list:
+            host, port, socket_type, server_mode = self._get_net_info_from(data)
+            emissions.append(((host, port), self._resolve((host, port), socket_type),
+                              socket_type, server_mode, data.to_buffers()))
+
+        attach_fbk_interfaces = False
+        if report:
+            self._thread_cpt += 1
+            self.feedback_thread_qty += 1
+            if self._first_send_data_call:
+                self._first_send_data_call = False
+                attach_fbk_interfaces = True
+
+        self._loop.call_soon_threadsafe(self._emit, session, emissions, attach_fbk_interfaces)
+
+        return session['future']
+
+    def _emit(self, session, emissions, attach_fbk_interfaces):
+        self._sessions.append(session)
+        session['timer'] = self._loop.call_later(self._feedback_timeout, self._complete_session, session)
+
+        if attach_fbk_interfaces:
+            for proto in self._fbk_protocols:
+                self._attach(proto, session)
+
+        for hp, addr, socket_type, server_mode, buffers in emissions:
+            if server_mode:
+                self._emit_through_server(session, hp, addr, socket_type, buffers)
+            else:
+                self._emit_through_client(session, hp, addr, socket_type, buffers)
+
+        self._check_session(session)
+
+    def _emit_through_client(self, session, hp, addr, socket_type, buffers):
+        proto = self._held_protocols.get(hp, None)
+        if proto is None and not self.hold_connection[hp] and hp in self._conn_pools:
+            proto = self._conn_pools[hp].acquire()
+        if proto is not None:
+            self._write(proto, session, buffers)
+            return
+
+        family, sock_type = socket_type
+        factory = lambda: _AsyncTargetProtocol(self, hp, 'client', self._default_fbk_id[hp],
+                                               self.feedback_length)
+        if sock_type == socket.SOCK_DGRAM:
+            coro = self._loop.create_datagram_endpoint(factory, remote_addr=addr, family=family)
+        else:
+            coro = self._loop.create_connection(factory, addr[0], addr[1], family=family)
+
+        session['waiting'] += 1
+        self._create_task(asyncio.wait_for(coro, self._sending_delay),
+                          lambda task: self._client_connected(task, session, hp, buffers))
+
+    def _client_connected(self, task, session, hp, buffers):
+        session['waiting'] -= 1
+        if task.cancelled() or task.exception() is not None:
+            self._session_error(session, -1, hp, '>>> WARNING: unable to send data to {:s}:{:d} <<<'.format(*hp))
+        else:
+            transport, proto = task.result()
+            if self.hold_connection[hp]:
+                self._held_protocols[hp] = proto
+            elif hp in self._conn_pools:
+                self._conn_pools[hp].add(proto)
+            self._write(proto, session, buffers)
+        self._check_session(session)
+
+    def _emit_through_server(self, session, hp, addr, socket_type, buffers):
+        proto = self._held_protocols.get(hp, None)
+        if proto is not None:
+            self._write(proto, session, buffers)
+            return
+
+        if hp in self._servers:
+            self._wait_for_client(session, hp, buffers)
+            return
+
+        family, sock_type = socket_type
+        if sock_type != socket.SOCK_STREAM:
+            self._session_error(session, -1, hp, '>>> ERROR: server mode is only supported '
+                                                 'with stream sockets <<<')
+            return
+
+        factory = lambda: _AsyncTargetProtocol(self, hp, 'server', self._default_fbk_id[hp],
+                                               self.feedback_length)
+        session['waiting'] += 1
+        self._create_task(self._loop.create_server(factory, addr[0], addr[1], family=family,
+                                                   reuse_address=True),
+                          lambda task: self._server_started(task, session, hp, buffers))
+
+    def _server_started(self, task, session, hp, buffers):
+        session['waiting'] -= 1
+        if task.cancelled() or task.exception() is not None:
+            self._session_error(session, -1, hp, '>>> WARNING: unable to listen to {:s}:{:d} <<<'.format(*hp))
+            self._check_session(session)
+        else:
+            self._register_server(hp, task.result())
+            self._wait_for_client(session, hp, buffers)
+
+    def _wait_for_client(self, session, hp, buffers):
+        session['waiting'] += 1
+        entry = [buffers, session, None]
+        entry[2] = self._loop.call_later(self._sending_delay, self._client_not_connected, hp, entry)
+        self._server_pending.setdefault(hp, []).append(entry)
+
+    def _client_not_connected(self, hp, entry):
+        self._server_pending[hp].remove(entry)
+        buffers, session, timer = entry
+        session['waiting'] -= 1
+        self._session_error(session, -2, hp, ">>> WARNING: unable to send data because the "
+                                             "target did not connect to us <<<")
+        self._check_session(session)
+
+    def _write(self, proto, session, buffers):
+        self._attach(proto, session)
+        if isinstance(proto.transport, asyncio.DatagramTransport):
+            proto.transport.sendto(b''.join(buffers))
+        else:
+            proto.transport.writelines(buffers)
+
+    def _attach(self, proto, session):
+        old_session = proto.session
+        if old_session is session:
+            return
+        if old_session is not None:
+            old_session['open'].discard(proto)
+            proto.session = None
+            self._check_session(old_session)
+        if session['done']:
+            return
+
+        proto.session = session
+        session['open'].add(proto)
+        if proto.fbk_id not in session['chunks']:
+            session['chunks'][proto.fbk_id] = FeedbackBuffer(self._feedback_max_size, separator=b'\n')
+            session['bytes_recd'][proto.fbk_id] = 0
+            session['lengths'][proto.fbk_id] = proto.fbk_length
+        for chunk in proto.pending_chunks:
+            self._add_chunk(session, proto.fbk_id, chunk)
+        proto.pending_chunks = []
+
+
+    def _connection_made(self, proto):
+        self._protocols.add(proto)
+        if proto.kind == 'fbk':
+            self._fbk_protocols.append(proto)
+        elif proto.kind == 'server':
+            if self.hold_connection[proto.hp]:
+                self._held_protocols[proto.hp] = proto
+            pending = self._server_pending.get(proto.hp, None)
+            if pending:
+                buffers, session, timer = pending.pop(0)
+                timer.cancel()
+                session['waiting'] -= 1
+                self._write(proto, session, buffers)
+                self._check_session(session)
+
+    def _data_received(self, proto, data):
+        session = proto.session
+        if session is None:
+            # kept for the next emission
+            proto.pending_chunks.append(data)
+        else:
+            self._add_chunk(session, proto.fbk_id, data)
+            self._check_session(session)
+
+    def _connection_lost(self, proto, exc):
+        self._protocols.discard(proto)
+        pool = self._conn_pools.get(proto.hp, None) if proto.kind == 'client' else None
+        if pool is not None:
+            pool.discard(proto)
+        if self._held_protocols.get(proto.hp, None) is proto:
+            del self._held_protocols[proto.hp]
+        if proto in self._fbk_protocols:
+            self._fbk_protocols.remove(proto)
+
+        session = proto.session
+        if session is not None:
+            proto.session = None
+            session['open'].discard(proto)
+            if exc is not None:
+                session['errors'].append((proto.fbk_id, getattr(exc, 'errno', None) or errno.EIO))
+            self._check_session(session)
+
+    def _add_chunk(self, session, fbk_id, chunk):
+        if session['first_pass']:
+            session['first_pass'] = False
+            if session['report']:
+                self._register_last_ack_date(datetime.datetime.now())
+        session['chunks'][fbk_id].append(chunk)
+        session['bytes_recd'][fbk_id] += len(chunk)
+
+    def _session_error(self, session, err_code, hp, err_msg):
+        session['feedback'].set_error_code(err_code)
+        session['feedback'].add_fbk_from(self._default_fbk_id[hp], err_msg)
+
+    def _check_session(self, session):
+        if session['done'] or session['waiting'] > 0:
+            return
+        for proto in session['open']:
+            fbk_length = session['lengths'][proto.fbk_id]
+            if fbk_length is None or session['bytes_recd'][proto.fbk_id] < fbk_length:
+                return
+        self._complete_session(session)
+
+    def _complete_session(self, session):
+        if session['done']:
+            return
+        session['done'] = True
+        session['timer'].cancel()
+        self._sessions.remove(session)
+
+        for proto in session['open']:
+            proto.session = None
+            if proto.kind == 'fbk' or self._held_protocols.get(proto.hp, None) is proto:
+                continue
+            pool = self._conn_pools.get(proto.hp, None) if proto.kind == 'client' else None
+            if pool is None or not pool.release(proto):
+                proto.transport.close()
+        session['open'].clear()
+
+        feedback = session['feedback']
+        with self._fbk_handling_lock:
+            for fbk_id, chunks in session['chunks'].items():
+                fbk, fbk_id = self._feedback_handling(chunks.getvalue(), fbk_id)
+                feedback.add_fbk_from(fbk_id, fbk)
+            for fbk_id, err in session['errors']:
+                feedback.add_fbk_from(fbk_id, ">>> ERROR[{:d}]: unable to interact with '{:s}' "
+                                      "<<<".format(err, fbk_id))
+                feedback.set_error_code(-err)
+
+            if session['report']:
+                for fbk_id, fbk in feedback:
+                    self._feedback.add_fbk_from(fbk_id, fbk)
+                if feedback.get_error_code() < 0:
+                    self._feedback.set_error_code(feedback.get_error_code())
+                self._feedback_complete(session['sid'])
+
+        session['future'].set_result(feedback)
+
+
 class PrinterTarget(Target):
 
     def __init__(self, tmpfile_ext):
@@ -1050,12 +2011,12 @@ class PrinterTarget(Target):
 
     def send_data(self, data):
 
-        data = data.to_bytes()
+        buffers = data.to_buffers()
         wkspace = os.path.join(app_folder, 'workspace')
         file_name = os.path.join(wkspace, 'fuzz_test_' + self.__suffix + self._tmpfile_ext)
 
         with open(file_name, 'wb') as f:
-             f.write(data)
+             _write_buffers(f.fileno(), buffers)
 
         inc = '_{:0>5d}'.format(self.__cpt)
         self.__cpt += 1
@@ -1067,19 +2028,115 @@ class PrinterTarget(Target):
 
 
 class LocalTarget(Target):
+    '''
+    Target for a program running on the same platform as fuddly. By
+    default, the program is launched for each data emitted, with the
+    path of a scratch file containing the data in its arguments.
+
+    If `forkserver` is set to True, the program is launched only once
+    and is expected to implement the AFL fork server protocol (which
+    is the case of the programs compiled with an AFL instrumentation):
+    it reads 4 bytes from the file descriptor ``FORKSRV_FD`` each time a
+    new test case is available, forks a child that processes the
+    scratch file, and writes back the PID of the child, then its exit
+    status (as returned by ``waitpid()``), on ``FORKSRV_FD + 1``. It
+    avoids the creation and the dynamic linking of a process for each
+    test case.
+
+    The way the data is delivered to the program can be changed
+    through :meth:`set_input_delivery`.
+    '''
+
+    FORKSRV_FD = 198
+
+    # Input delivery modes
+    INPUT_FILE = 'file'
+    INPUT_STDIN = 'stdin'
+    INPUT_MEMFD = 'memfd'
 
-    def __init__(self, tmpfile_ext, target_path=None):
+    # Default capacity of a pipe on Linux: writing less than that to
+    # the stdin of a freshly launched program does not block.
+    _pipe_capacity = 65536
+
+    _forkserver_launcher = (
+        "import os, sys\n"
+        "ctl, st = int(sys.argv[1]), int(sys.argv[2])\n"
+        "os.dup2(ctl, {fd:d})\n"
+        "os.dup2(st, {fd:d} + 1)\n"
+        "os.close(ctl)\n"
+        "os.close(st)\n"
+        "os.execv(sys.argv[3], sys.argv[3:])\n"
+    ).format(fd=FORKSRV_FD)
+
+    def __init__(self, tmpfile_ext, target_path=None, forkserver=False, forkserver_timeout=2.0):
         self.__suffix = '{:0>12d}'.format(random.randint(2**16, 2**32))
         self.__app = None
         self.__pre_args = None
         self.__post_args = None
         self.__feedback = TargetFeedback()
+        self.__forkserver = forkserver
+        self.__forkserver_timeout = forkserver_timeout
+        self.__fs_ctl = None
+        self.__fs_status = None
+        self.__child_pid = None
+        self.__child_status = None
+        self.__tmpfile_folder = None
+        self.__input_delivery = LocalTarget.INPUT_FILE
+        self.__memfd = None
+        self.__fbk_pattern = None
+        self.__poller = None
+        self.__output_fds = None
+        self.__pipe_fds = None
+        self.__exit_fd = None
+        self.__pidfd = None
         self.set_target_path(target_path)
         self.set_tmp_file_extension(tmpfile_ext)
 
     def set_tmp_file_extension(self, tmpfile_ext):
         self._tmpfile_ext = tmpfile_ext
 
+    def set_tmp_file_folder(self, folder):
+        '''
+        Set the folder where the scratch file is written (the fuddly
+        workspace by default). A folder on a tmpfs (e.g., ``/dev/shm``)
+        avoids any disk access.
+        '''
+        self.__tmpfile_folder = folder
+
+    def get_tmp_file_folder(self):
+        return self.__tmpfile_folder
+
+    def set_input_delivery(self, mode):
+        '''
+        Select how the data is delivered to the program.
+
+        Args:
+          mode (str): ``LocalTarget.INPUT_FILE`` (default) for a scratch
+            file whose path is provided in the program arguments,
+            ``LocalTarget.INPUT_STDIN`` for feeding the standard input of
+            the program, or ``LocalTarget.INPUT_MEMFD`` for an anonymous
+            memory file (Linux only) whose ``/proc`` path is provided in
+            the program arguments. The last two modes avoid the
+            filesystem entirely.
+        '''
+        assert(mode in (LocalTarget.INPUT_FILE, LocalTarget.INPUT_STDIN, LocalTarget.INPUT_MEMFD))
+        self.__input_delivery = mode
+
+    def get_input_delivery(self):
+        return self.__input_delivery
+
+    def set_feedback_pattern(self, pattern):
+        '''
+        Make :meth:`get_feedback` return as soon as the output of the
+        program matches `pattern`, without waiting for the program
+        termination.
+
+        Args:
+          pattern (bytes): regular expression, or None to only wait for
+            the program termination.
+        '''
+        self.__fbk_pattern = None if pattern is None else re.compile(pattern)
+
     def set_target_path(self, target_path):
         self.__target_path = target_path
 
@@ -1110,69 +2167,354 @@ class LocalTarget(Target):
         '''
         return True
 
+    def is_forkserver_enabled(self):
+        return self.__forkserver
+
     def start(self):
         if not self.__target_path:
             print('/!\\ ERROR /!\\: the LocalTarget path has not been set')
             return False
-        return self.initialize()
+        if not self.initialize():
+            return False
+        if self.__input_delivery == LocalTarget.INPUT_MEMFD or \
+                (self.__input_delivery == LocalTarget.INPUT_STDIN and self.__forkserver):
+            # with a fork server, the standard input is shared by all the
+            # children and has thus to be rewound for each of them
+            if not hasattr(os, 'memfd_create'):
+                print('/!\\ ERROR /!\\: memfd_create() is not supported on this platform')
+                return False
+            self.__memfd = os.memfd_create('fuddly_' + self.__suffix)
+        if self.__forkserver:
+            return self._start_forkserver()
+        return True
 
     def stop(self):
+        if self.__forkserver:
+            self._stop_forkserver()
+        if self.__memfd is not None:
+            os.close(self.__memfd)
+            self.__memfd = None
+        self._close_pidfd()
         return self.terminate()
 
-    def send_data(self, data):
-
-        data = data.to_bytes()
-        wkspace = os.path.join(app_folder, 'workspace')
-
-        name = os.path.join(wkspace, 'fuzz_test_' + self.__suffix + self._tmpfile_ext)
-        with open(name, 'wb') as f:
-             f.write(data)
+    def _get_tmp_file_name(self):
+        if self.__tmpfile_folder is None:
+            folder = os.path.join(app_folder, 'workspace')
+        else:
+            folder = self.__tmpfile_folder
+        return os.path.join(folder, 'fuzz_test_' + self.__suffix + self._tmpfile_ext)
+
+    def _get_input_name(self):
+        if self.__input_delivery == LocalTarget.INPUT_FILE:
+            return self._get_tmp_file_name()
+        elif self.__input_delivery == LocalTarget.INPUT_MEMFD:
+            return '/proc/{:d}/fd/{:d}'.format(os.getpid(), self.__memfd)
+        else:
+            return None
 
+    def _get_cmd(self, name):
+        if name is None:
+            # the data is not provided through the arguments
+            name = []
+        else:
+            name = [name]
         if self.__pre_args is not None and self.__post_args is not None:
-            cmd = [self.__target_path] + self.__pre_args.split() + [name] + self.__post_args.split()
+            cmd = [self.__target_path] + self.__pre_args.split() + name + self.__post_args.split()
         elif self.__pre_args is not None:
-            cmd = [self.__target_path] + self.__pre_args.split() + [name]
+            cmd = [self.__target_path] + self.__pre_args.split() + name
         elif self.__post_args is not None:
-            cmd = [self.__target_path, name] + self.__post_args.split()
+            cmd = [self.__target_path] + name + self.__post_args.split()
         else:
-            cmd = [self.__target_path, name]
+            cmd = [self.__target_path] + name
+        return cmd
 
-        self.__app = subprocess.Popen(args=cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    def _launch(self, cmd, **kwargs):
+        self.__app = subprocess.Popen(args=cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
 
         fl = fcntl.fcntl(self.__app.stderr, fcntl.F_GETFL)
         fcntl.fcntl(self.__app.stderr, fcntl.F_SETFL, fl | os.O_NONBLOCK)
 
         fl = fcntl.fcntl(self.__app.stdout, fcntl.F_GETFL)
         fcntl.fcntl(self.__app.stdout, fcntl.F_SETFL, fl | os.O_NONBLOCK)
-        
+
+        # The outputs of the program are streamed through a poll object,
+        # which also watches for the program termination (through a
+        # pidfd if available).
+        self._close_pidfd()
+        self.__poller = select.poll()
+        self.__output_fds = [self.__app.stdout.fileno(), self.__app.stderr.fileno()]
+        self.__pipe_fds = list(self.__output_fds)
+        for fd in self.__pipe_fds:
+            self.__poller.register(fd, select.POLLIN)
+        self.__exit_fd = None
+        if not self.__forkserver and hasattr(os, 'pidfd_open'):
+            try:
+                self.__pidfd = os.pidfd_open(self.__app.pid)
+            except OSError:
+                pass
+            else:
+                self.__exit_fd = self.__pidfd
+                self.__poller.register(self.__pidfd, select.POLLIN)
+
+    def _close_pidfd(self):
+        if self.__pidfd is not None:
+            os.close(self.__pidfd)
+            self.__pidfd = None
+
+    def send_data(self, data):
+
+        buffers = data.to_buffers()
+        self.__feedback.set_error_code(None)
+        if self.__forkserver:
+            # the status of the previous child has to be consumed
+            # before requesting a new one
+            self._wait_forkserver_child()
+
+        if self.__memfd is not None:
+            os.ftruncate(self.__memfd, 0)
+            os.lseek(self.__memfd, 0, os.SEEK_SET)
+            _write_buffers(self.__memfd, buffers)
+            os.lseek(self.__memfd, 0, os.SEEK_SET)
+        elif self.__input_delivery == LocalTarget.INPUT_FILE:
+            with open(self._get_tmp_file_name(), 'wb') as f:
+                 _write_buffers(f.fileno(), buffers)
+
+        if self.__forkserver:
+            self._run_forkserver_child()
+        elif self.__input_delivery == LocalTarget.INPUT_STDIN:
+            self._launch(self._get_cmd(None), stdin=subprocess.PIPE)
+            self._feed_stdin(buffers)
+        else:
+            self._launch(self._get_cmd(self._get_input_name()))
+
+    def _feed_stdin(self, buffers):
+        stdin = self.__app.stdin
+        def feed():
+            try:
+                _write_buffers(stdin.fileno(), buffers)
+            except OSError as e:
+                # the program may not read all its input
+                if e.errno != errno.EPIPE:
+                    raise
+            finally:
+                stdin.close()
+
+        if sum(len(b) for b in buffers) <= self._pipe_capacity:
+            feed()
+        else:
+            # the program has to consume its input concurrently
+            feeder = threading.Thread(target=feed, name='LOCAL-TG-STDIN')
+            feeder.daemon = True
+            feeder.start()
+
     def cleanup(self):
+        if self.__forkserver:
+            if self.__child_pid is not None and self.__child_status is None:
+                try:
+                    os.kill(self.__child_pid, signal.SIGTERM)
+                except OSError:
+                    pass
+            return
+
         try:
             os.kill(self.__app.pid, signal.SIGTERM)
         except:
             print("\n*** WARNING: cannot kill application with PID {:d}".format(self.__app.pid))
 
+    def _start_forkserver(self):
+        ctl_r, ctl_w = os.pipe()
+        st_r, st_w = os.pipe()
+
+        # A small launcher moves the pipe ends to the file descriptors
+        # expected by the fork server before executing the target.
+        cmd = [sys.executable, '-c', self._forkserver_launcher, str(ctl_r), str(st_w)] + \
+              self._get_cmd(self._get_input_name())
+        if sys.version_info[0] > 2:
+            kwargs = {'pass_fds': (ctl_r, st_w)}
+        else:
+            kwargs = {'close_fds': False}
+        if self.__input_delivery == LocalTarget.INPUT_STDIN:
+            kwargs['stdin'] = self.__memfd
+        try:
+            self._launch(cmd, **kwargs)
+        finally:
+            os.close(ctl_r)
+            os.close(st_w)
+
+        self.__fs_ctl = ctl_w
+        self.__fs_status = st_r
+        self.__child_pid = None
+        self.__child_status = None
+        # the status of a child is reported when it terminates
+        self.__exit_fd = st_r
+        self.__poller.register(st_r, select.POLLIN)
+
+        if self._read_forkserver_int(self.__forkserver_timeout) is None:
+            print('/!\\ ERROR /!\\: the LocalTarget fork server does not respond')
+            self._stop_forkserver()
+            return False
+
+        return True
+
+    def _stop_forkserver(self):
+        self.cleanup()
+        for fd in (self.__fs_ctl, self.__fs_status):
+            if fd is not None:
+                os.close(fd)
+        self.__fs_ctl = None
+        self.__fs_status = None
+        self.__child_pid = None
+        self.__exit_fd = None
+        self.__poller = None
+        if self.__app is not None:
+            # the fork server exits when the control pipe is closed
+            try:
+                self.__app.terminate()
+            except OSError:
+                pass
+            self.__app.wait()
+            self.__app.stdout.close()
+            self.__app.stderr.close()
+            self.__app = None
+
+    def _read_forkserver_int(self, timeout):
+        msg = b''
+        deadline = time.time() + timeout
+        while len(msg) < 4:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([self.__fs_status], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(self.__fs_status, 4 - len(msg))
+            if not chunk:
+                return None
+            msg += chunk
+        return struct.unpack('=i', msg)[0]
+
+    def _run_forkserver_child(self):
+        if self.__fs_ctl is None:
+            raise TargetStuck("the fork server is not running")
+        self.__child_status = None
+        try:
+            os.write(self.__fs_ctl, struct.pack('=I', 0))
+        except OSError:
+            raise TargetStuck("the fork server is not running")
+        self.__child_pid = self._read_forkserver_int(self.__forkserver_timeout)
+        if self.__child_pid is None or self.__child_pid <= 0:
+            self.__child_pid = None
+            raise TargetStuck("the fork server did not fork a new child")
+
+    def _wait_forkserver_child(self, timeout=None):
+        if self.__child_pid is None or self.__child_status is not None:
+            return
+        status = self._read_forkserver_int(self.__forkserver_timeout if timeout is None else timeout)
+        if status is None and timeout is None:
+            try:
+                os.kill(self.__child_pid, signal.SIGKILL)
+            except OSError:
+                pass
+            status = self._read_forkserver_int(self.__forkserver_timeout)
+            if status is None:
+                raise TargetStuck("the fork server does not report the status of its child")
+        if status is not None:
+            if os.WIFSIGNALED(status):
+                self.__child_status = -os.WTERMSIG(status)
+            else:
+                self.__child_status = os.WEXITSTATUS(status)
+
     def get_feedback(self, delay=0.2):
+        '''
+        Gather the outputs of the program until it terminates, or its
+        output matches the pattern provided to
+        :meth:`set_feedback_pattern`, or `delay` expires.
+        '''
         if self.__app is None:
             return
 
-        ret = select.select([self.__app.stdout, self.__app.stderr], [], [], delay)
-        if ret[0]:
-            byte_string = b''
-            for fd in ret[0][:-1]:
-                byte_string += fd.read() + b'\n\n'
-            byte_string += ret[0][-1].read()
-        else:
-            byte_string = b''
+        outputs = {}
+        deadline = time.time() + delay
+        exited = self._has_exited()
+        while not exited:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            if self.__exit_fd is None:
+                # the termination of the program has to be polled
+                timeout = min(timeout, 0.01)
+            for fd, event in self.__poller.poll(timeout * 1000):
+                if fd in self.__pipe_fds:
+                    self._read_output(fd, outputs)
+                elif fd == self.__exit_fd:
+                    exited = self._has_exited()
+            if self.__exit_fd is None and not exited:
+                exited = self._has_exited()
+            if not exited and self.__fbk_pattern is not None and \
+                    self.__fbk_pattern.search(b''.join(o.getvalue() for o in outputs.values())):
+                break
+
+        # what remains in the pipes is retrieved without blocking
+        for fd in list(self.__pipe_fds):
+            while self._read_output(fd, outputs):
+                pass
 
+        byte_string = b'\n\n'.join([outputs[fd].getvalue() for fd in self.__output_fds if fd in outputs])
         self.__feedback.set_bytes(byte_string)
 
         return self.__feedback
 
-    def is_alive(self):
-        if self.__app is None:
+    def _read_output(self, fd, outputs):
+        try:
+            chunk = os.read(fd, 65536)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return False
+            raise
+        if chunk:
+            if fd not in outputs:
+                outputs[fd] = FeedbackBuffer(self._feedback_max_size)
+            outputs[fd].append(chunk)
             return True
+        else:
+            # end of file
+            self.__poller.unregister(fd)
+            self.__pipe_fds.remove(fd)
+            return False
+
+    def _has_exited(self):
+        if self.__forkserver:
+            if self.__child_pid is None:
+                return False
+            self._wait_forkserver_child(timeout=0.001)
+            if self.__child_status is not None:
+                self.__feedback.set_error_code(self.__child_status)
+                return True
+            return False
+        else:
+            exit_status = self.__app.poll()
+            if exit_status is not None:
+                self.__feedback.set_error_code(exit_status)
+                if self.__exit_fd is not None:
+                    self.__poller.unregister(self.__exit_fd)
+                    self.__exit_fd = None
+                    self._close_pidfd()
+                return True
+            return False
 
-        target_exit_status = self.__app.poll()
+    def is_alive(self):
+        if self.__forkserver:
+            if self.__child_pid is None:
+                return True
+            self._wait_forkserver_child(timeout=0.001)
+            target_exit_status = self.__child_status
+            if target_exit_status is None and self.__app.poll() is not None:
+                # the fork server itself is dead
+                target_exit_status = self.__app.returncode
+        elif self.__app is None:
+            return True
+        else:
+            target_exit_status = self.__app.poll()
 
         self.__feedback.set_error_code(target_exit_status)
 
@@ -1190,3 +2532,167 @@ class LocalTarget(Target):
             return True
         else:
             return False
+
+
+class ParallelLocalTarget(LocalTarget):
+    '''
+    Variant of :class:`LocalTarget` that runs several instances of the
+    program concurrently, each one with its own scratch file (written
+    on a tmpfs if available). The data provided to
+    :meth:`send_multiple_data` are dispatched among the instances, and
+    the feedback is reported per data (through
+    :meth:`TargetFeedback.add_fbk_from`, with references containing
+    the data IDs).
+    '''
+
+    def __init__(self, tmpfile_ext, target_path=None, instances=None, forkserver=False,
+                 forkserver_timeout=2.0, run_timeout=5.0):
+        self._workers = []
+        LocalTarget.__init__(self, tmpfile_ext, target_path=target_path)
+        if instances is None:
+            instances = multiprocessing.cpu_count()
+        self._run_timeout = run_timeout
+        self._workers = [LocalTarget(tmpfile_ext, target_path=target_path, forkserver=forkserver,
+                                     forkserver_timeout=forkserver_timeout)
+                         for i in range(instances)]
+        if os.path.isdir('/dev/shm'):
+            self.set_tmp_file_folder('/dev/shm')
+        self._running = collections.OrderedDict()  # worker -> data, in emission order
+        self._results = []
+        self._fbk = TargetFeedback()
+
+    @property
+    def instance_qty(self):
+        return len(self._workers)
+
+    def set_tmp_file_extension(self, tmpfile_ext):
+        LocalTarget.set_tmp_file_extension(self, tmpfile_ext)
+        for w in self._workers:
+            w.set_tmp_file_extension(tmpfile_ext)
+
+    def set_tmp_file_folder(self, folder):
+        LocalTarget.set_tmp_file_folder(self, folder)
+        for w in self._workers:
+            w.set_tmp_file_folder(folder)
+
+    def set_feedback_max_size(self, max_size):
+        LocalTarget.set_feedback_max_size(self, max_size)
+        for w in self._workers:
+            w.set_feedback_max_size(max_size)
+
+    def set_input_delivery(self, mode):
+        LocalTarget.set_input_delivery(self, mode)
+        for w in self._workers:
+            w.set_input_delivery(mode)
+
+    def set_target_path(self, target_path):
+        LocalTarget.set_target_path(self, target_path)
+        for w in self._workers:
+            w.set_target_path(target_path)
+
+    def set_pre_args(self, pre_args):
+        LocalTarget.set_pre_args(self, pre_args)
+        for w in self._workers:
+            w.set_pre_args(pre_args)
+
+    def set_post_args(self, post_args):
+        LocalTarget.set_post_args(self, post_args)
+        for w in self._workers:
+            w.set_post_args(post_args)
+
+    def start(self):
+        if not self.get_target_path():
+            print('/!\\ ERROR /!\\: the LocalTarget path has not been set')
+            return False
+        if not self.initialize():
+            return False
+        for idx, w in enumerate(self._workers):
+            if not w.start():
+                for started in self._workers[:idx]:
+                    started.stop()
+                return False
+        return True
+
+    def stop(self):
+        self.cleanup()
+        for w in self._workers:
+            w.stop()
+        return self.terminate()
+
+    def send_data(self, data):
+        self.send_multiple_data([data])
+
+    def send_multiple_data(self, data_list):
+        idle = [w for w in self._workers if w not in self._running]
+        for data in data_list:
+            if not idle:
+                # all the instances are busy, the oldest one is
+                # waited for
+                w = next(iter(self._running))
+                self._release_worker(w)
+                idle.append(w)
+            w = idle.pop(0)
+            w.send_data(data)
+            self._running[w] = data
+
+    def _release_worker(self, worker, timeout=None):
+        timeout = self._run_timeout if timeout is None else timeout
+        # get_feedback() returns as soon as the program terminates
+        fbk = worker.get_feedback(delay=timeout)
+        bstring = fbk.get_bytes()
+        if worker.is_alive():
+            worker.cleanup()
+            bstring += worker.get_feedback(delay=1).get_bytes()
+            worker.is_alive()
+        self._record_result(worker, self._running.pop(worker), bstring, fbk.get_error_code())
+
+    def _record_result(self, worker, data, bstring, err_code):
+        self._results.append((self._workers.index(worker), data, bstring, err_code))
+
+    def cleanup(self):
+        for w in list(self._running):
+            if w.is_alive():
+                w.cleanup()
+        self._running.clear()
+
+    def get_feedback(self, delay=0.2):
+        # the instances are running concurrently, thus the delay is
+        # shared by all of them
+        deadline = time.time() + delay
+        for w, data in self._running.items():
+            fbk = w.get_feedback(delay=max(0, deadline - time.time()))
+            self._record_result(w, data, fbk.get_bytes(), fbk.get_error_code())
+
+        self._fbk.cleanup()
+        err_codes = []
+        for idx, data, bstring, err_code in self._results:
+            data_id = data.get_data_id()
+            ref = 'Data #{!s} [instance {:d}]'.format('?' if data_id is None else data_id, idx)
+            self._fbk.add_fbk_from(ref, bstring)
+            if err_code is not None:
+                err_codes.append(err_code)
+        self._fbk.set_bytes(b'\n\n'.join([r[2] for r in self._results if r[2]]))
+        if not err_codes:
+            self._fbk.set_error_code(None)
+        elif min(err_codes) < 0:
+            self._fbk.set_error_code(min(err_codes))
+        else:
+            self._fbk.set_error_code(max(err_codes))
+        self._results = []
+
+        return self._fbk
+
+    def is_alive(self):
+        alive = True
+        for w in self._running:
+            if not w.is_alive():
+                alive = False
+        return alive
+
+    def is_damaged(self):
+        bstring = self._fbk.get_bytes().lower()
+
+        if b'error' in bstring or b'invalid' in bstring:
+            return True
+        else:
+            return False
@@ -28,6 +28,13 @@ import copy
 import re
 import functools
 import binascii
+import tempfile
+import mmap
+import shutil
+import itertools
+import socket
+import threading
+import datetime
 import unittest
 import collections
 
@@ -47,6 +54,8 @@ from fuzzfmk.fuzzing_primitives import *
 from fuzzfmk.basic_primitives import *
 from fuzzfmk.plumbing import *
 from fuzzfmk.target import *
+from fuzzfmk.target import _write_buffers
+from fuzzfmk.pacing import Pacer
 from fuzzfmk.logger import *
 from fuzzfmk.operator_helpers import *
 
@@ -1520,6 +1529,616 @@ class TestMisc(unittest.TestCase):
         e.make_determinist(all_conf=True, recursive=True)
         self._loop_nodes(e, loop_count, criteria_func=lambda x: x.name == 'Middle_NT')
 
+    def test_fmkdb_stats_and_iterators(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        fmkdb_path = os.path.join(tmp_dir, 'fmkDB.db')
+
+        for buffered in [False, True]:
+            fmkdb = Database(fmkdb_path=fmkdb_path, buffered_writes=buffered)
+            fmkdb.start()
+            fmkdb.insert_data_model('DM')
+            fmkdb.insert_project('PRJ')
+            fmkdb.insert_dmaker('DM', 'GEN', 'g', True, False)
+            fmkdb.insert_dmaker('DM', 'CLONE', 'g', True, False, clone_type='GEN')
+
+            now = datetime.datetime.now()
+            for dtype, status in [('GEN', 0), ('CLONE', -1), ('GEN', -3)]:
+                data_id = fmkdb.insert_data(dtype, 'DM', b'data', 4, now, now)
+                fmkdb.insert_project_record('PRJ', data_id, 'TG')
+                fmkdb.insert_feedback(data_id, 'SRC', b'fbk', status)
+            fmkdb.stop()
+
+        fmkdb = Database(fmkdb_path=fmkdb_path)
+        fmkdb.start()
+        self.assertEqual(fmkdb.execute_sql_statement("SELECT TYPE, TOTAL FROM STATS;"),
+                         [('GEN', 6)])
+        self.assertEqual(fmkdb.execute_sql_statement("SELECT TARGET, TYPE, TOTAL FROM STATS_BY_TARGET;"),
+                         [('TG', 'GEN', 6)])
+
+        data_ids = [rec[0] for rec in fmkdb.iter_data(start_id=2, end_id=5, chunk_size=2)]
+        self.assertEqual(data_ids, [2, 3, 4, 5])
+        fbk = [(rec[0], rec[3]) for rec in fmkdb.iter_feedback(max_status=0, chunk_size=1)]
+        self.assertEqual(fbk, [(2, -1), (3, -3), (5, -1), (6, -3)])
+        fbk = [rec[3] for rec in fmkdb.iter_feedback(data_id=3)]
+        self.assertEqual(fbk, [-3])
+
+        # the statistics follow the deletions and the updates
+        fmkdb.insert_dmaker('DM', 'OTHER', 'o', True, False)
+        fmkdb.insert_project_record('PRJ2', 1, 'TG2')
+        fmkdb.execute_sql_statement("DELETE FROM DATA WHERE ID = 2;")
+        fmkdb.execute_sql_statement("UPDATE DATA SET TYPE = 'OTHER' WHERE ID IN (1, 3);")
+        fmkdb.execute_sql_statement("DELETE FROM PROJECT_RECORDS WHERE DATA_ID = 4;")
+        fmkdb.execute_sql_statement("UPDATE PROJECT_RECORDS SET TARGET = 'TG2' WHERE DATA_ID = 5;")
+        self.assertEqual(fmkdb.execute_sql_statement("SELECT TYPE, TOTAL FROM STATS ORDER BY TYPE;"),
+                         [('GEN', 3), ('OTHER', 2)])
+        self.assertEqual(fmkdb.execute_sql_statement("SELECT TYPE, TOTAL FROM STATS ORDER BY TYPE;"),
+                         fmkdb.execute_sql_statement("SELECT TYPE, count(*) FROM DATA_STATS_TYPE "
+                                                     "GROUP BY TYPE ORDER BY TYPE;"))
+        self.assertEqual(fmkdb.execute_sql_statement("SELECT TARGET, TYPE, TOTAL FROM STATS_BY_TARGET "
+                                                     "ORDER BY TARGET, TYPE;"),
+                         [('TG', 'GEN', 1), ('TG', 'OTHER', 2), ('TG2', 'GEN', 1), ('TG2', 'OTHER', 1)])
+        self.assertEqual(fmkdb.execute_sql_statement("SELECT TARGET, TYPE, TOTAL FROM STATS_BY_TARGET "
+                                                     "ORDER BY TARGET, TYPE;"),
+                         fmkdb.execute_sql_statement(
+                             "SELECT PROJECT_RECORDS.TARGET, DATA_STATS_TYPE.TYPE, count(*) "
+                             "FROM PROJECT_RECORDS INNER JOIN DATA_STATS_TYPE "
+                             "  ON PROJECT_RECORDS.DATA_ID = DATA_STATS_TYPE.ID "
+                             "GROUP BY PROJECT_RECORDS.TARGET, DATA_STATS_TYPE.TYPE "
+                             "ORDER BY PROJECT_RECORDS.TARGET, DATA_STATS_TYPE.TYPE;"))
+        fmkdb.stop()
+
+    def test_fmkdb_buffered_writes(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        now = datetime.datetime.now()
+
+        def fill(fmkdb):
+            ids = [fmkdb.insert_data_model('DM'),
+                   fmkdb.insert_project('PRJ'),
+                   fmkdb.insert_dmaker('DM', 'GEN', 'g', True, False)]
+            for i in range(3):
+                data_id = fmkdb.insert_data('GEN', 'DM', b'data', 4, now, now)
+                ids += [data_id,
+                        fmkdb.insert_steps(data_id, 1, 'GEN', 'g', None, None, b'info'),
+                        fmkdb.insert_project_record('PRJ', data_id, 'TG'),
+                        fmkdb.insert_feedback(data_id, 'SRC', b'fbk', -i),
+                        fmkdb.insert_comment(data_id, 'comment', now),
+                        fmkdb.insert_fmk_info(data_id, 'info', now)]
+            return ids
+
+        rows = []
+        ids = []
+        for buffered in [False, True]:
+            fmkdb = Database(fmkdb_path=os.path.join(tmp_dir, 'fmkDB_{!s}.db'.format(buffered)),
+                             buffered_writes=buffered)
+            fmkdb.start()
+            ids.append(fill(fmkdb))
+            self.assertEqual(fmkdb.flush(), 0)
+            rows.append([fmkdb.execute_sql_statement("SELECT ROWID, * FROM {:s} ORDER BY ROWID;".format(t))
+                         for t in Database.BUFFERED_TABLES + ['STATS', 'STATS_BY_TARGET']])
+            if buffered:
+                # the writing errors are reported to the caller
+                fmkdb.insert_feedback(ids[1][3], 'SRC', b'fbk', 0)
+                self.assertEqual(fmkdb.flush(), -1)
+                self.assertEqual(fmkdb.flush(), 0)
+            fmkdb.stop()
+
+        self.assertEqual(ids[0], ids[1])
+        self.assertEqual(rows[0], rows[1])
+
+    def test_lazy_data_model_registry(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        mod_path = os.path.join(tmp_dir, 'lazy.py')
+        with open(mod_path, 'w') as f:
+            f.write("raise RuntimeError('shall not be executed')\n"
+                    "class Base(DataModel):\n"
+                    "    name = 'base'\n"
+                    "class Lazy_DataModel(Base):\n"
+                    "    file_extension = 'lz'\n"
+                    "data_model = Lazy_DataModel()\n")
+
+        attrs = get_module_attributes(mod_path, 'data_model', ['name', 'file_extension'],
+                                      default_classes=['DataModel'])
+        self.assertEqual(attrs, {'name': 'base', 'file_extension': 'lz'})
+
+        with open(mod_path, 'a') as f:
+            f.write("data_model.name = compute_name()\n")
+        attrs = get_module_attributes(mod_path, 'data_model', ['name'],
+                                      default_classes=['DataModel'])
+        self.assertIsNone(attrs)
+
+        for dm_name in ['mydf', 'example', 'zip', 'png', 'pdf', 'jpg', 'usb']:
+            self.assertIn(dm_name, fmk._data_model_names())
+        self.assertIs(fmk.get_data_model_by_name('example'), example.data_model)
+        self.assertIsNone(fmk.get_data_model_by_name('unknown'))
+
+    def test_network_target_feedback_collector(self):
+        serversocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        serversocket.bind(('localhost', 0))
+        serversocket.listen(20)
+        port = serversocket.getsockname()[1]
+
+        def echo_server():
+            while True:
+                try:
+                    csocket, addr = serversocket.accept()
+                except socket.error:
+                    return
+                data = csocket.recv(100)
+                while data:
+                    csocket.sendall(b'ECHO:' + data)
+                    data = csocket.recv(100)
+                csocket.close()
+
+        srv_thread = threading.Thread(target=echo_server)
+        srv_thread.daemon = True
+        srv_thread.start()
+
+        target_classes = [NetworkTarget]
+        if asyncio_module:
+            target_classes.append(AsyncNetworkTarget)
+
+        for target_cls, hold_connection in itertools.product(target_classes, [False, True]):
+            tg = target_cls(host='localhost', port=port, hold_connection=hold_connection)
+            tg.set_timeout(fbk_timeout=2, sending_delay=1)
+            tg.feedback_length = 7
+            tg.set_logger(fmk.lg)
+            tg.start()
+            try:
+                thread_qty = threading.active_count()
+                for i in range(5):
+                    data = Data('D{:d}'.format(i))
+                    tg.get_feedback().cleanup()
+                    tg.do_before_sending_data([data])
+                    tg.send_data(data)
+                    while not tg.is_target_ready_for_new_data():
+                        time.sleep(0.01)
+                    fbk = [f for ref, f in tg.get_feedback()]
+                    self.assertEqual(fbk, ['ECHO:D{:d}'.format(i).encode('latin_1')])
+                    self.assertEqual(threading.active_count(), thread_qty)
+                if target_cls is AsyncNetworkTarget and not hold_connection:
+                    futures = [tg.send_data_nowait(Data('N{:d}'.format(i))) for i in range(10)]
+                    for i, future in enumerate(futures):
+                        fbk = [f for ref, f in future.result(5)]
+                        self.assertEqual(fbk, ['ECHO:N{:d}'.format(i).encode('latin_1')])
+            finally:
+                tg.stop()
+
+        serversocket.close()
+
+    def test_network_target_connection_pool(self):
+        serversocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        serversocket.bind(('localhost', 0))
+        serversocket.listen(5)
+        port = serversocket.getsockname()[1]
+        client_sockets = []
+
+        def echo_client(csocket):
+            try:
+                data = csocket.recv(100)
+                while data:
+                    csocket.sendall(b'ECHO:' + data)
+                    data = csocket.recv(100)
+            except socket.error:
+                pass
+
+        def echo_server():
+            while True:
+                try:
+                    csocket, addr = serversocket.accept()
+                except socket.error:
+                    return
+                client_sockets.append(csocket)
+                client_thread = threading.Thread(target=echo_client, args=(csocket,))
+                client_thread.daemon = True
+                client_thread.start()
+
+        srv_thread = threading.Thread(target=echo_server)
+        srv_thread.daemon = True
+        srv_thread.start()
+
+        target_classes = [NetworkTarget]
+        if asyncio_module:
+            target_classes.append(AsyncNetworkTarget)
+
+        for target_cls in target_classes:
+            del client_sockets[:]
+            tg = target_cls(host='localhost', port=port)
+            tg.set_timeout(fbk_timeout=2, sending_delay=1)
+            tg.feedback_length = 7
+            tg.set_logger(fmk.lg)
+            pool = tg.set_connection_pool()
+            tg.start()
+            try:
+                for i in range(7):
+                    if i == 4:
+                        # the target drops the session
+                        client_sockets[0].shutdown(socket.SHUT_RDWR)
+                        client_sockets[0].close()
+                        time.sleep(0.1)
+                    elif i == 6:
+                        # late response to a previous emission
+                        client_sockets[1].sendall(b'LATE')
+                        time.sleep(0.1)
+                    data = Data('D{:d}'.format(i))
+                    tg.get_feedback().cleanup()
+                    tg.do_before_sending_data([data])
+                    tg.send_data(data)
+                    while not tg.is_target_ready_for_new_data():
+                        time.sleep(0.01)
+                    fbk = [f for ref, f in tg.get_feedback()]
+                    self.assertEqual(fbk, ['ECHO:D{:d}'.format(i).encode('latin_1')])
+            finally:
+                tg.stop()
+
+            self.assertEqual(pool.connection_count, 3)
+            self.assertEqual(pool.reuse_count, 4)
+            self.assertEqual(len(client_sockets), 3)
+
+            if target_cls is AsyncNetworkTarget:
+                # stopping twice, or without being started, is harmless
+                tg.stop()
+                tg = target_cls(host='localhost', port=port)
+                tg.set_logger(fmk.lg)
+                tg.stop()
+                # a failed resolution is not kept
+                tg._resolved_addresses = {}
+                hp = ('unresolvable.invalid', port)
+                self.assertEqual(tg._resolve(hp, (socket.AF_INET, socket.SOCK_STREAM)), hp)
+                self.assertNotIn(hp, tg._resolved_addresses)
+
+        serversocket.close()
+
+    def test_scatter_gather_emission(self):
+        leaves = [Node('leaf{:d}'.format(i), value_type=String(val_list=[chr(65+i)*40000]))
+                  for i in range(20)]
+        top = Node('top', subnodes=[Node('middle', subnodes=leaves[:10])] + leaves[10:])
+        top.set_env(Env())
+        data = Data(top)
+        buffers = data.to_buffers()
+        self.assertEqual(len(buffers), 20)
+        self.assertTrue(all(isinstance(b, memoryview) for b in buffers))
+        self.assertEqual(b''.join(buffers), data.to_bytes())
+
+        rsock, wsock = socket.socketpair()
+        received = []
+        def reader():
+            chunk = rsock.recv(65536)
+            while chunk:
+                received.append(chunk)
+                chunk = rsock.recv(65536)
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+        wsock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        NetworkTarget(host='localhost', port=0)._send_buffers(wsock, buffers)
+        wsock.close()
+        reader_thread.join()
+        rsock.close()
+        self.assertEqual(b''.join(received), data.to_bytes())
+        # the buffers of the caller are left untouched
+        self.assertEqual(len(buffers), 20)
+
+        class NoSendmsgSocket(object):
+            def __init__(self, s):
+                self.type = s.type
+                self.send = s.send
+
+        # a datagram is never split, even without sendmsg()
+        rsock, wsock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        for s in [wsock, NoSendmsgSocket(wsock)]:
+            NetworkTarget(host='localhost', port=0)._send_buffers(s, [memoryview(b'abc'),
+                                                                     memoryview(b'de')])
+            self.assertEqual(rsock.recv(100), b'abcde')
+        wsock.close()
+        rsock.close()
+
+        rfd, wfd = os.pipe()
+        fbuffers = [memoryview(b'abc'), memoryview(b''), memoryview(b'de')]
+        _write_buffers(wfd, fbuffers)
+        os.close(wfd)
+        self.assertEqual(os.read(rfd, 10), b'abcde')
+        os.close(rfd)
+
+    def test_local_target_forkserver(self):
+        stub = tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False)
+        stub.write(
+            "import os, sys, struct\n"
+            "os.write(199, struct.pack('=i', 0))\n"
+            "while len(os.read(198, 4)) == 4:\n"
+            "    pid = os.fork()\n"
+            "    if pid == 0:\n"
+            "        with open(sys.argv[1], 'rb') as f:\n"
+            "            data = f.read()\n"
+            "        os.write(1, b'parsed:' + data)\n"
+            "        os._exit(3 if data == b'crash' else 0)\n"
+            "    os.write(199, struct.pack('=i', pid))\n"
+            "    os.write(199, struct.pack('=i', os.waitpid(pid, 0)[1]))\n")
+        stub.close()
+
+        tg = LocalTarget(tmpfile_ext='.txt', target_path=sys.executable, forkserver=True)
+        tg.set_pre_args(stub.name)
+        self.assertTrue(tg.start())
+        try:
+            forkserver = tg._LocalTarget__app
+            child_pids = set()
+            for i, val in enumerate([b'abc', b'crash', b'def']):
+                tg.send_data(Data(val))
+                child_pids.add(tg._LocalTarget__child_pid)
+                while tg.is_alive():
+                    time.sleep(0.01)
+                fbk = tg.get_feedback()
+                self.assertEqual(fbk.get_bytes(), b'parsed:' + val)
+                self.assertEqual(fbk.get_error_code(), 3 if val == b'crash' else 0)
+                tg.cleanup()
+            self.assertTrue(tg._LocalTarget__app is forkserver)
+            self.assertEqual(len(child_pids), 3)
+        finally:
+            tg.stop()
+            os.remove(stub.name)
+        self.assertTrue(forkserver.poll() is not None)
+
+    def test_local_target_input_delivery(self):
+        script = tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False)
+        script.write(
+            "import sys\n"
+            "if len(sys.argv) > 1:\n"
+            "    data = open(sys.argv[1], 'rb').read()\n"
+            "else:\n"
+            "    data = sys.stdin.buffer.read() if hasattr(sys.stdin, 'buffer') else sys.stdin.read()\n"
+            "sys.stdout.write('{:d}:{!r}'.format(len(data), data[:3]))\n")
+        script.close()
+
+        modes = [LocalTarget.INPUT_FILE, LocalTarget.INPUT_STDIN]
+        if hasattr(os, 'memfd_create'):
+            modes.append(LocalTarget.INPUT_MEMFD)
+        big_val = b'X' * 200000
+        try:
+            for mode in modes:
+                tg = LocalTarget(tmpfile_ext='.txt', target_path=sys.executable)
+                tg.set_pre_args(script.name)
+                tg.set_input_delivery(mode)
+                self.assertTrue(tg.start())
+                try:
+                    for val in (b'abc', big_val):
+                        tg.send_data(Data(val))
+                        while tg.is_alive():
+                            time.sleep(0.01)
+                        fbk = tg.get_feedback(delay=0.5).get_bytes()
+                        expected = '{:d}:{!r}'.format(len(val), val[:3]).encode('latin_1')
+                        self.assertTrue(fbk.startswith(expected))
+                        self.assertEqual(tg.get_feedback().get_error_code(), 0)
+                finally:
+                    tg.stop()
+        finally:
+            os.remove(script.name)
+
+    def test_local_target_event_driven_feedback(self):
+        script = tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False)
+        script.write(
+            "import sys, time\n"
+            "data = open(sys.argv[1], 'rb').read()\n"
+            "sys.stdout.write('READY\\n')\n"
+            "sys.stdout.flush()\n"
+            "if data == b'wait':\n"
+            "    time.sleep(5)\n"
+            "sys.exit(2)\n")
+        script.close()
+
+        tg = LocalTarget(tmpfile_ext='.txt', target_path=sys.executable)
+        tg.set_pre_args(script.name)
+        self.assertTrue(tg.start())
+        try:
+            # the feedback is returned as soon as the program terminates
+            tg.send_data(Data(b'exit'))
+            t0 = time.time()
+            fbk = tg.get_feedback(delay=4)
+            self.assertTrue(time.time() - t0 < 2)
+            self.assertEqual(fbk.get_bytes(), b'READY\n')
+            self.assertEqual(fbk.get_error_code(), 2)
+
+            # or as soon as the expected pattern is found
+            tg.set_feedback_pattern(b'READY')
+            tg.send_data(Data(b'wait'))
+            t0 = time.time()
+            fbk = tg.get_feedback(delay=4)
+            self.assertTrue(time.time() - t0 < 2)
+            self.assertEqual(fbk.get_bytes(), b'READY\n')
+            self.assertTrue(tg.is_alive())
+            tg.cleanup()
+        finally:
+            tg.stop()
+            os.remove(script.name)
+
+    def test_corruption_primitives(self):
+        import fuzzfmk.basic_primitives as bp
+
+        buff = bytes(bytearray(range(256))) * 20
+        # the outputs shall not depend on the availability of NumPy
+        self.assertFalse(bp.VECTORIZATION_ENABLED)
+        modes = [False]
+        if numpy_module:
+            modes.append(True)
+
+        try:
+            for bp.VECTORIZATION_ENABLED in modes:
+                random.seed(7)
+                variants = corrupt_bytes_batch(buff, 4, n=50)
+                random.seed(7)
+                self.assertEqual(corrupt_bytes_batch(buff, 4, n=50), variants)
+                for v in variants:
+                    self.assertEqual(len(v), len(buff))
+                    self.assertEqual(sum(1 for a, b in zip(bytearray(v), bytearray(buff)) if a != b), 50)
+
+                v = corrupt_bytes(buff, n=30, ctrl_char=True)
+                for a, b in zip(bytearray(v), bytearray(buff)):
+                    if a != b:
+                        self.assertTrue(a < 32 or a == 0x7f)
+
+                for v in corrupt_bits_batch(buff, 2, p=0.05, ascii=True):
+                    self.assertTrue(all(a < 0x80 for a, b in zip(bytearray(v), bytearray(buff)) if a != b))
+                v = corrupt_bits(b'\x00' * len(buff), n=100)
+                self.assertTrue(sum(bin(a).count('1') for a in bytearray(v) if a) > 0)
+                self.assertTrue(all(a == 0 or a & 0x80 for a in bytearray(v)))
+
+                s = rand_string(size=len(buff), str_set='XYZ')
+                self.assertEqual(len(s), len(buff))
+                self.assertEqual(set(bytearray(s)) - set(bytearray(b'XYZ')), set())
+        finally:
+            bp.VECTORIZATION_ENABLED = False
+
+    def test_data_detach_node(self):
+        nint = Node('int', value_type=UINT8(int_list=[1, 2, 3]))
+        top = Node('top', subnodes=[nint])
+        top.set_env(Env())
+        top.make_determinist(all_conf=True, recursive=True)
+        self.assertEqual(top.to_bytes(), b'\x01')
+
+        data = Data(top)
+        data.detach_node()
+        node = data.node
+        self.assertIsNot(node, top)
+        self.assertIsNot(node.env, top.env)
+        self.assertEqual(node.to_bytes(), b'\x01')
+
+        # the original graph can be modified without affecting the data
+        top.unfreeze()
+        self.assertEqual(top.to_bytes(), b'\x02')
+        self.assertEqual(data.to_bytes(), b'\x01')
+
+        # a detached node is not copied again
+        data.detach_node()
+        self.assertIs(data.node, node)
+
+        # but a new node is
+        data.update_from_node(top)
+        data.detach_node()
+        self.assertIsNot(data.node, top)
+        self.assertEqual(data.to_bytes(), b'\x02')
+
+    def test_pacer(self):
+        now = [0.0]
+        pacer = Pacer(rate=10, bucket_size=2, adaptive=True, max_latency=0.5,
+                      recovery_steps=4, clock=lambda: now[0])
+        self.assertEqual(pacer.reserve(1), 0)
+        self.assertEqual(pacer.reserve(1), 0)
+        self.assertAlmostEqual(pacer.reserve(1), 0.1)
+        now[0] += 1.0
+        # the bucket does not hold more than its capacity
+        self.assertEqual(pacer.reserve(2), 0)
+        self.assertAlmostEqual(pacer.reserve(1), 0.1)
+
+        pacer.report(latency=0.1)
+        self.assertEqual(pacer.current_rate, 10)
+        pacer.report(latency=1.0)
+        self.assertEqual(pacer.current_rate, 5)
+        pacer.report(distress=True)
+        self.assertEqual(pacer.current_rate, 2.5)
+        self.assertAlmostEqual(pacer.reserve(1), 0.4 + 0.4)
+        for i in range(10):
+            pacer.report()
+        self.assertEqual(pacer.current_rate, 10)
+        self.assertEqual(pacer.distress_count, 2)
+
+        pacer = Pacer(rate=100, unit=Pacer.BYTES)
+        self.assertEqual(pacer.amount_of([Data('ABC'), Data('DE')]), 5)
+        self.assertEqual(Pacer().reserve(100), 0)
+
+        fmk.set_fuzz_delay(0)
+        self.assertTrue(fmk.set_pacing(20, bucket_size=1))
+        pacer = fmk._pacer
+        # unchanged settings (e.g., from an operator) keep the bucket state
+        self.assertTrue(fmk.set_pacing(20, bucket_size=1))
+        self.assertIs(fmk._pacer, pacer)
+        try:
+            t0 = time.time()
+            for i in range(30):
+                fmk.send_data_and_log(Data('PACED'))
+            self.assertTrue(time.time() - t0 >= 1.4)
+        finally:
+            fmk.set_pacing(None)
+            fmk.set_fuzz_delay(0.5)
+
+    def test_feedback_buffer(self):
+        fbuf = FeedbackBuffer()
+        for c in (b'abc', b'', b'de'):
+            fbuf.append(c)
+        self.assertEqual(fbuf.getvalue(), b'abcde')
+        self.assertFalse(fbuf.truncated)
+
+        fbuf = FeedbackBuffer(max_size=10, separator=b'|')
+        for i in range(100):
+            fbuf.append('{:02d}'.format(i).encode('latin_1'))
+        self.assertEqual(len(fbuf), 299)
+        self.assertTrue(fbuf.truncated)
+        self.assertEqual(fbuf.dropped, 289)
+        self.assertEqual(fbuf.getvalue(), b'00|01\n[... 289 bytes truncated ...]\n98|99')
+
+        script = tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False)
+        script.write("import sys\nsys.stdout.write('A' * 1000000 + 'END')\n")
+        script.close()
+        tg = LocalTarget(tmpfile_ext='.txt', target_path=sys.executable)
+        tg.set_pre_args(script.name)
+        self.assertEqual(tg.get_feedback_max_size(), 1024*1024)
+        tg.set_feedback_max_size(1000)
+        self.assertTrue(tg.start())
+        try:
+            tg.send_data(Data(b''))
+            fbk = tg.get_feedback(delay=5).get_bytes()
+            self.assertTrue(len(fbk) < 1100)
+            self.assertTrue(fbk.startswith(b'A' * 500))
+            self.assertTrue(fbk.endswith(b'bytes truncated ...]\n' + b'A' * 497 + b'END'))
+        finally:
+            tg.stop()
+            os.remove(script.name)
+
+        max_size = fmk.tg.get_feedback_max_size()
+        try:
+            self.assertTrue(fmk.set_feedback_max_size(2048))
+            self.assertEqual(fmk.tg.get_feedback_max_size(), 2048)
+            self.assertFalse(fmk.set_feedback_max_size(0))
+            self.assertTrue(fmk.set_feedback_max_size(None))
+            self.assertIsNone(fmk.tg.get_feedback_max_size())
+        finally:
+            fmk.tg.set_feedback_max_size(max_size)
+
+    def test_parallel_local_target(self):
+        script = tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False)
+        script.write(
+            "import sys, time\n"
+            "data = open(sys.argv[1], 'rb').read()\n"
+            "time.sleep(0.2)\n"
+            "sys.stdout.write('parsed:' + data.decode())\n"
+            "sys.exit(3 if data == b'crash' else 0)\n")
+        script.close()
+
+        tg = ParallelLocalTarget(tmpfile_ext='.txt', target_path=sys.executable, instances=3)
+        tg.set_pre_args(script.name)
+        scratch_files = set(w._get_tmp_file_name() for w in tg._workers)
+        self.assertEqual(len(scratch_files), 3)
+        self.assertTrue(tg.start())
+        try:
+            data_list = [Data(v) for v in (b'A', b'B', b'crash', b'D')]
+            for i, d in enumerate(data_list):
+                d.set_data_id(i)
+            tg.send_multiple_data(data_list)
+            while any(w.is_alive() for w in tg._running):
+                time.sleep(0.01)
+            self.assertFalse(tg.is_alive())
+            fbk = tg.get_feedback(delay=0)
+            fbk = dict(fbk)
+            self.assertEqual(len(fbk), 4)
+            for i, d in enumerate(data_list):
+                ref = [r for r in fbk if r.startswith('Data #{:d} '.format(i))]
+                self.assertEqual(len(ref), 1)
+                self.assertEqual(fbk[ref[0]].strip(), b'parsed:' + d.to_bytes())
+            self.assertEqual(tg._fbk.get_error_code(), 3)
+            tg.cleanup()
+        finally:
+            tg.stop()
+            os.remove(script.name)
+
 
 
 class TestModelWalker(unittest.TestCase):
@@ -1894,6 +2513,94 @@ class TestNodeFeatures(unittest.TestCase):
         self.assertEqual(size, len(msg))
 
 
+    def test_absorb_nonterm_memoization(self):
+        attempts = []
+
+        class TracedString(String):
+            # overloaded without the 'start' parameter (given the
+            # part of the blob to absorb)
+            def absorb_auto_helper(self, blob, constraints):
+                attempts.append(self.val_list[-1])
+                return String.absorb_auto_helper(self, blob, constraints)
+
+        nstr_a = Node('a', value_type=TracedString(val_list=['AAA']))
+        nstr_b = Node('b', value_type=TracedString(val_list=['BBB']))
+        nstr_c = Node('c', value_type=TracedString(val_list=['CCC']))
+        nstr_z = Node('z', value_type=TracedString(val_list=['ZZZ']))
+
+        top = Node('top')
+        top.set_subnodes_with_csts([
+            2, ['u>', [nstr_a, 1], [nstr_b, 1], [nstr_z, 1]],
+            1, ['u>', [nstr_a, 1], [nstr_b, 1], [nstr_z, 0, 1], [nstr_c, 1]]
+        ])
+        top.set_env(Env())
+
+        msg = b'AAABBBCCC'
+        status, off, size, name = top.absorb(msg)
+
+        self.assertEqual(status, AbsorbStatus.FullyAbsorbed)
+        self.assertEqual(size, len(msg))
+        self.assertEqual(top.to_bytes(), msg)
+        # 'z' has been rejected at offset 6 by the first component,
+        # thus the second component does not try it again
+        self.assertEqual(attempts.count(b'ZZZ'), 1)
+
+        # the memo is shared by the whole absorption and also covers
+        # non-terminal nodes
+        del attempts[:]
+        nstr_y = Node('y', value_type=TracedString(val_list=['YYY']))
+        nstr_c2 = Node('c2', value_type=TracedString(val_list=['CCC']))
+        inner = Node('inner')
+        inner.set_subnodes_with_csts([
+            1, ['u>', [nstr_y, 1], [nstr_c2, 1]]
+        ])
+
+        top = Node('top')
+        top.set_subnodes_with_csts([
+            2, ['u>', [nstr_a, 1], [nstr_b, 1], [inner, 1]],
+            1, ['u>', [nstr_a, 1], [nstr_b, 1], [inner, 0, 1], [nstr_c, 1]]
+        ])
+        top.set_env(Env())
+
+        status, off, size, name = top.absorb(msg)
+
+        self.assertEqual(status, AbsorbStatus.FullyAbsorbed)
+        self.assertEqual(top.to_bytes(), msg)
+        self.assertEqual(attempts.count(b'YYY'), 1)
+        self.assertIsNone(top.env.absorb_memo)
+
+
+    def test_absorb_file(self):
+        nint = Node('int', value_type=UINT16_be(int_list=[0xcafe]))
+        nstr = Node('str', value_type=String(val_list=['ABC', 'DEF'], max_sz=3))
+        sep = Node('sep', value_type=String(val_list=['\n'], absorb_regexp=b'\n+'))
+        sep.enforce_absorb_constraints(AbsNoCsts(regexp=True))
+
+        top = Node('top')
+        top.set_subnodes_with_csts([
+            1, ['u>', [nint, 1], [nstr, 1, -1], [sep, 1], [nint, 1]]
+        ])
+        top.set_env(Env())
+
+        msg = b'\xca\xfeABCDEFABC\n\n\xca\xfe'
+        fd, path = tempfile.mkstemp()
+        os.write(fd, msg)
+        os.close(fd)
+
+        status, off, size, name = top.absorb_file(path)
+        os.remove(path)
+
+        self.assertEqual(status, AbsorbStatus.FullyAbsorbed)
+        self.assertEqual(size, len(msg))
+        self.assertEqual(top.to_bytes(), msg)
+        self.assertTrue(isinstance(top['top/str:3$'].to_bytes(), bytes))
+
+        top2 = Node('top2', base_node=top, ignore_frozen_state=True)
+        status, off, size, name = top2.absorb(b'PADDING' + msg, start=7)
+        self.assertEqual(status, AbsorbStatus.FullyAbsorbed)
+        self.assertEqual(top2.to_bytes(), msg)
+
+
     def test_absorb_nonterm_3(self):
         nint_1 = Node('nint1', value_type=UINT16_le(int_list=[0xcdab, 0xffee]))
         nint_2 = Node('nint2', value_type=UINT8(int_list=[0xaf, 0xbf, 0xcf]))
@@ -2252,6 +2959,222 @@ class TestNodeFeatures(unittest.TestCase):
         # corrupted_data.unfreeze(recursive=True, reevaluate_constraints=True)
         # corrupted_data.show()
 
+    def test_paths_index(self):
+        leaf1 = Node('leaf1', value_type=UINT8(int_list=[1, 2]))
+        leaf2 = Node('leaf2', value_type=UINT8(int_list=[3, 4]))
+        middle = Node('middle', subnodes=[leaf1])
+        top = Node('top', subnodes=[middle, leaf2])
+        top.set_env(Env())
+        top.freeze()
+
+        self.assertEqual(leaf1.get_path_from(top), 'top/middle/leaf1')
+        self.assertEqual(leaf2.get_all_paths_from(top), ['top/leaf2'])
+
+        # value changes does not alter the index
+        leaf1.unfreeze()
+        top.freeze()
+        self.assertEqual(top.get_node_by_path(path='top/middle/leaf1'), leaf1)
+
+        # structure changes shall invalidate the index
+        new_leaf = Node('new_leaf', value_type=UINT8(int_list=[5]))
+        middle.set_subnodes_basic([new_leaf])
+        top.unfreeze()
+        top.freeze()
+
+        self.assertEqual(leaf1.get_path_from(top), None)
+        self.assertEqual(new_leaf.get_path_from(top), 'top/middle/new_leaf')
+        self.assertEqual(top.get_node_by_path(path='top/middle/new_leaf'), new_leaf)
+
+        leaf2.set_subnodes_basic([Node('sub', value_type=UINT8(int_list=[6]))])
+        self.assertTrue('top/leaf2/sub' in top.get_hkeys())
+
+    def test_reachable_nodes_cache(self):
+        leaf1 = Node('leaf1', value_type=UINT8(int_list=[1, 2]))
+        leaf2 = Node('leaf2', value_type=UINT8(int_list=[3, 4]))
+        top = Node('top', subnodes=[leaf1, leaf2])
+        top.set_env(Env())
+        top.freeze()
+
+        ic = NodeInternalsCriteria(mandatory_attrs=[NodeInternals.Mutable],
+                                   node_kinds=[NodeInternals_TypedValue])
+
+        l = top.get_reachable_nodes(internals_criteria=ic)
+        self.assertEqual(l, [leaf1, leaf2])
+
+        # the returned list shall not be the cached one
+        l.pop()
+        self.assertEqual(top.get_reachable_nodes(internals_criteria=ic), [leaf1, leaf2])
+
+        # attribute changes shall invalidate the cache
+        leaf2.clear_attr(NodeInternals.Mutable)
+        self.assertEqual(top.get_reachable_nodes(internals_criteria=ic), [leaf1])
+
+        # structure changes shall invalidate the cache
+        leaf3 = Node('leaf3', value_type=UINT8(int_list=[5]))
+        top.set_subnodes_basic([leaf1, leaf2, leaf3])
+        self.assertEqual(top.get_reachable_nodes(internals_criteria=ic), [leaf1, leaf3])
+        leaf3.clear_attr(NodeInternals.Mutable)
+        self.assertEqual(top.get_reachable_nodes(internals_criteria=ic), [leaf1])
+
+        # the caches are tracked per graph
+        other = Node('other', subnodes=[Node('leaf', value_type=UINT8(int_list=[1]))])
+        other.set_env(Env())
+        gen = other._get_generations()
+        clone = top.get_clone('clone')
+        clone.get_node_by_path('clone/leaf1').set_attr(NodeInternals.Determinist)
+        clone.set_subnodes_basic([Node('leaf4', value_type=UINT8(int_list=[6]))])
+        clone.freeze()
+        self.assertEqual(other._get_generations(), gen)
+        self.assertEqual(top.get_reachable_nodes(internals_criteria=ic), [leaf1])
+
+    def test_clone_cache_isolation(self):
+        def check_env(root):
+            # the node internals report their changes to their own graph
+            nodes = [root] + root.get_reachable_nodes()
+            sep = root.internals[root.current_conf].separator
+            if sep is not None:
+                nodes.append(sep.node)
+            for n in nodes:
+                for i in n.internals.values():
+                    self.assertIs(i._env, root.env)
+
+        sep = Node('sep', values=['-'])
+        top = Node('top', subnodes=[Node('a', values=['A1', 'A2']), Node('b', values=['B'])])
+        top.set_separator_node(sep, prefix=False, suffix=False)
+        top.set_env(Env())
+        self.assertEqual(top.to_bytes(), b'A1-B')
+        clone = top.get_clone('clone')
+        self.assertEqual(clone.to_bytes(), b'A1-B')
+        check_env(top)
+        check_env(clone)
+
+        # mutating the clone leaves the caches of the template valid
+        clone.get_node_by_path('clone/a').unfreeze()
+        clone.get_node_by_path('clone/b').set_values(val_list=['C'])
+        self.assertEqual(clone.to_bytes(), b'A2-C')
+        self.assertEqual(top.to_bytes(), b'A1-B')
+        self.assertEqual(top.get_node_by_path('top/b').to_bytes(), b'B')
+
+        # and the reverse
+        top.get_node_by_path('top/a').set_values(val_list=['T'])
+        top.freeze()
+        self.assertEqual(top.to_bytes(), b'T-B')
+        self.assertEqual(clone.to_bytes(), b'A2-C')
+        self.assertEqual(clone.get_node_by_path('clone/b').to_bytes(), b'C')
+        check_env(top)
+        check_env(clone)
+
+        # the generated node of a GenFunc stays attached to its own graph,
+        # even when the clone does not keep the frozen state
+        gen = Node('gen')
+        gen.set_generator_func(lambda: Node('g', subnodes=[Node('x', values=['X'])]))
+        top = Node('top', subnodes=[Node('a', values=['A']), gen])
+        top.set_env(Env())
+        self.assertEqual(top.to_bytes(), b'AX')
+        clone = top.get_clone('clone', ignore_frozen_state=True)
+        self.assertEqual(clone.to_bytes(), b'AX')
+        check_env(top)
+        check_env(clone)
+
+        g = top.get_node_by_path('top/gen/g')
+        self.assertEqual(len(top.get_reachable_nodes(path_regexp='^top/gen/g/')), 1)
+        g.set_subnodes_basic([g.get_node_by_path('g/x'), Node('y', values=['Y'])])
+        self.assertEqual(len(top.get_reachable_nodes(path_regexp='^top/gen/g/')), 2)
+        self.assertEqual(len(clone.get_reachable_nodes(path_regexp='^clone/gen/g/')), 1)
+
+    def test_clone_copy_on_write(self):
+        leaf = Node('leaf', value_type=UINT8(int_list=[1, 2, 3]))
+        top = Node('top', subnodes=[leaf])
+        top.set_env(Env())
+        top.make_determinist(all_conf=True, recursive=True)
+        top.freeze()
+
+        clone = top.get_clone('clone')
+        cleaf = clone.get_node_by_path('clone/leaf')
+        self.assertEqual(clone.to_bytes(), b'\x01')
+        # the value type of a frozen node is not copied as long as it is not needed
+        self.assertTrue(cleaf.cc._value_type is leaf.cc._value_type)
+
+        cleaf.unfreeze()
+        self.assertEqual(clone.to_bytes(), b'\x02')
+        self.assertFalse(cleaf.cc._value_type is leaf.cc._value_type)
+
+        # the template is not affected by the modification of its clone
+        self.assertEqual(top.to_bytes(), b'\x01')
+        leaf.unfreeze()
+        self.assertEqual(top.to_bytes(), b'\x02')
+
+        leaf.clear_attr(NodeInternals.Mutable)
+        self.assertTrue(cleaf.is_attr_set(NodeInternals.Mutable))
+
+    def test_value_cache(self):
+        leaf1 = Node('leaf1', value_type=String(val_list=['A', 'B']))
+        leaf2 = Node('leaf2', value_type=String(val_list=['C', 'D']))
+        leaf3 = Node('leaf3', value_type=String(val_list=['E']))
+        middle1 = Node('middle1', subnodes=[leaf1])
+        middle2 = Node('middle2', subnodes=[leaf2])
+        top = Node('top', subnodes=[middle1, middle2, leaf3])
+        top.set_env(Env())
+        top.make_determinist(all_conf=True, recursive=True)
+
+        self.assertEqual(top.to_bytes(), b'ACE')
+        self.assertEqual(top.to_bytes(), b'ACE')
+
+        leaf2.unfreeze()
+        self.assertEqual(top.to_bytes(), b'ADE')
+        # the value of the unmodified subgraph has been kept
+        self.assertTrue(middle1._value_cache is not None)
+
+        leaf1.set_frozen_value('X')
+        self.assertEqual(top.to_bytes(), b'XDE')
+
+        leaf3.set_values(val_list=['Y'])
+        self.assertEqual(top.to_bytes(), b'XDY')
+
+        leaf2.set_attr(NodeInternals.DISABLED)
+        self.assertEqual(top.to_bytes(), b'XY')
+        leaf2.clear_attr(NodeInternals.DISABLED)
+        self.assertEqual(top.to_bytes(), b'XDY')
+
+        middle2.set_subnodes_basic([leaf1, leaf3])
+        self.assertEqual(top.to_bytes(), b'XXYY')
+
+    def test_value_cache_delayed_jobs(self):
+        desc = \
+        {'name': 'top',
+         'contents': [
+             {'name': 'opcode',
+              'contents': String(val_list=['A', 'B'])},
+             {'name': 'opt',
+              'contents': String(val_list=['X']),
+              'exists_if': (RawCondition('A'), 'opcode')},
+             {'name': 'len',
+              'type': MH.Generator,
+              'contents': MH.LEN(UINT8),
+              'node_args': 'body',
+              'trigger_last': True},
+             {'name': 'body',
+              'contents': String(val_list=['hello'])},
+         ]}
+
+        mh = ModelHelper(delayed_jobs=True)
+        top = mh.create_graph_from_desc(desc)
+        top.make_determinist(all_conf=True, recursive=True)
+        frozen = []
+        top.register_post_freeze_handler(lambda internals: frozen.append(internals))
+
+        self.assertEqual(top.to_bytes(), b'AX\x05hello')
+        self.assertEqual(top.to_bytes(), b'AX\x05hello')
+        self.assertEqual(len(frozen), 1)
+        # the values relying on existence conditions and delayed jobs are not kept
+        self.assertTrue(top._value_cache is None)
+        self.assertTrue(top.get_node_by_path('top/len')._value_cache is None)
+
+        top.unfreeze()
+        self.assertEqual(top.to_bytes(), b'B\x05hello')
+        self.assertEqual(top.to_bytes(), b'B\x05hello')
+        self.assertEqual(len(frozen), 2)
+
 
 class TestNode_NonTerm(unittest.TestCase):
 
@@ -2612,6 +3535,176 @@ class TestDataModel(unittest.TestCase):
                 print('Success!')
 
 
+    def test_data_model_snapshot(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+
+        class SnapshotDataModel(DataModel):
+            name = 'test_snapshot'
+            snapshot_enabled = True
+            snapshot_folder = os.path.join(tmp_dir, 'snapshots')
+            build_cpt = 0
+
+            def build_data_model(self):
+                SnapshotDataModel.build_cpt += 1
+                node = Node('snap', subnodes=[Node('str', values=['AAA', 'BBB']),
+                                              Node('int', value_type=UINT8(int_list=[1, 2]))])
+                self.register(node)
+
+        import_dir = os.path.join(tmp_dir, 'test_snapshot')
+        SnapshotDataModel.get_import_directory_path = lambda self, subdir=None, create=True: import_dir
+        os.makedirs(import_dir)
+
+        dm = SnapshotDataModel()
+        dm.load_data_model({dm.name: dm})
+        self.assertFalse(dm.is_loaded_from_snapshot())
+
+        dm = SnapshotDataModel()
+        dm.load_data_model({dm.name: dm})
+        self.assertTrue(dm.is_loaded_from_snapshot())
+        self.assertEqual(SnapshotDataModel.build_cpt, 1)
+        self.assertEqual(list(dm.data_identifiers()), ['snap'])
+        self.assertIn(dm.get_data('snap').to_bytes()[:3], [b'AAA', b'BBB'])
+
+        # the snapshot is no more valid when imported data change
+        with open(os.path.join(import_dir, 'sample.bin'), 'wb') as f:
+            f.write(b'\x00')
+        dm = SnapshotDataModel()
+        dm.load_data_model({dm.name: dm})
+        self.assertFalse(dm.is_loaded_from_snapshot())
+        self.assertEqual(SnapshotDataModel.build_cpt, 2)
+
+        class UnpicklableDataModel(SnapshotDataModel):
+            name = 'test_unpicklable_snapshot'
+            dump_cpt = 0
+
+            @staticmethod
+            def _get_pickler(f):
+                UnpicklableDataModel.dump_cpt += 1
+                return DataModel._get_pickler(f)
+
+            def build_data_model(self):
+                SnapshotDataModel.build_data_model(self)
+                self.pending = (x for x in range(2))
+
+        dm = UnpicklableDataModel()
+        dm.load_data_model({dm.name: dm})
+        dump_cpt = UnpicklableDataModel.dump_cpt
+
+        # a data model that cannot be pickled is not tried again
+        dm = UnpicklableDataModel()
+        dm.load_data_model({dm.name: dm})
+        self.assertFalse(dm.is_loaded_from_snapshot())
+        self.assertEqual(SnapshotDataModel.build_cpt, 4)
+        self.assertEqual(UnpicklableDataModel.dump_cpt, dump_cpt)
+
+    def test_data_model_snapshot_dependencies(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        dep_path = os.path.join(tmp_dir, 'snapshot_dep.py')
+        with open(dep_path, 'w') as f:
+            f.write("VALUES = ['AAA']\n")
+        with open(os.path.join(tmp_dir, 'snapshot_dm.py'), 'w') as f:
+            f.write("from fuzzfmk.data_model import *\n"
+                    "from fuzzfmk.data_model_helpers import DataModel\n"
+                    "from snapshot_dep import VALUES\n"
+                    "class DepDataModel(DataModel):\n"
+                    "    name = 'test_snapshot_dep'\n"
+                    "    snapshot_enabled = True\n"
+                    "    snapshot_folder = {!r}\n"
+                    "    def build_data_model(self):\n"
+                    "        self.register(Node('dep', values=VALUES))\n"
+                    .format(os.path.join(tmp_dir, 'snapshots')))
+        sys.path.insert(0, tmp_dir)
+        try:
+            import snapshot_dm
+        finally:
+            sys.path.remove(tmp_dir)
+        self.addCleanup(sys.modules.pop, 'snapshot_dm', None)
+        self.addCleanup(sys.modules.pop, 'snapshot_dep', None)
+        import_dir = os.path.join(tmp_dir, 'imports')
+        os.makedirs(import_dir)
+
+        snapshot_dm.DepDataModel.get_import_directory_path = \
+            lambda self, subdir=None, create=True: import_dir
+
+        def load():
+            dm = snapshot_dm.DepDataModel()
+            dm.load_data_model({dm.name: dm})
+            return dm.is_loaded_from_snapshot()
+
+        self.assertFalse(load())
+        self.assertTrue(load())
+        # the snapshot is no more valid when a module the data model relies on changes
+        st = os.stat(dep_path)
+        os.utime(dep_path, (st.st_atime, st.st_mtime + 10))
+        self.assertFalse(load())
+        self.assertTrue(load())
+
+    def test_data_model_parallel_import(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+
+        class ImportDataModel(DataModel):
+            name = 'test_import'
+            file_extension = 'bin'
+            snapshot_folder = os.path.join(tmp_dir, 'snapshots')
+            import_workers = 2
+            import_cache_enabled = True
+
+            def absorb(self, data, idx):
+                if data == b'BAD':
+                    raise ValueError('unexpected contents')
+                node = Node('imp_{:d}'.format(idx), values=['XXXX'])
+                self.set_new_env(node)
+                node.absorb(data, constraints=AbsNoCsts())
+                return node
+
+        import_dir = os.path.join(tmp_dir, 'imports')
+        os.makedirs(import_dir)
+        for name, contents in [('a.bin', b'AAAA'), ('b.bin', b'BBBB'), ('c.bin', b'BAD')]:
+            with open(os.path.join(import_dir, name), 'wb') as f:
+                f.write(contents)
+
+        dm = ImportDataModel()
+        msgs = dm.import_file_contents(path=import_dir)
+        self.assertEqual(sorted(msgs.keys()), ['a.bin', 'b.bin'])
+        self.assertEqual(msgs['a.bin'].to_bytes(), b'AAAA')
+        self.assertEqual(msgs['b.bin'].name, 'imp_1')
+        self.assertEqual(msgs['b.bin'].env.get_data_model(), dm)
+        self.assertEqual(dm.import_stats['a.bin'][0], 'absorbed')
+        self.assertEqual(dm.import_stats['c.bin'][0], 'failed')
+
+        # unchanged files are retrieved from the cache
+        with open(os.path.join(import_dir, 'b.bin'), 'wb') as f:
+            f.write(b'CCCC')
+        dm = ImportDataModel()
+        msgs = dm.import_file_contents(path=import_dir, workers=1)
+        self.assertEqual(dm.import_stats['a.bin'][0], 'cached')
+        self.assertEqual(dm.import_stats['b.bin'][0], 'absorbed')
+        self.assertEqual(msgs['a.bin'].to_bytes(), b'AAAA')
+        self.assertEqual(msgs['b.bin'].to_bytes(), b'CCCC')
+
+        blob_types = []
+
+        class MappedImportDataModel(DataModel):
+            name = 'test_mapped_import'
+            file_extension = 'bin'
+            import_file_mapping = True
+
+            def absorb(self, data, idx):
+                blob_types.append(type(data))
+                node = Node('imp_{:d}'.format(idx), values=['XXXX', 'BAD'])
+                self.set_new_env(node)
+                status, off, size, name = node.absorb(data, constraints=AbsFullCsts())
+                return node if status == AbsorbStatus.FullyAbsorbed else None
+
+        dm = MappedImportDataModel()
+        msgs = dm.import_file_contents(path=import_dir, workers=1)
+        self.assertEqual(blob_types, [mmap.mmap] * 3)
+        self.assertEqual(sorted(msgs.keys()), ['c.bin'])
+        self.assertEqual(msgs['c.bin'].to_bytes(), b'BAD')
+
     def test_generic_generators(self):
         dm = fmk.get_data_model_by_name('mydf')
         dm.load_data_model(fmk._name2dm)
@@ -2952,6 +4045,112 @@ class TestFMK(unittest.TestCase):
 
         self.assertEqual(idx, expected_idx)
 
+    def test_pipelined_send_loop(self):
+        act = ['OFF_GEN', ('tTYPE', UI(runs_per_node=1, clone_node=False))]
+        fmk.set_fuzz_delay(0)
+
+        outcomes = []
+        for depth in [0, 3]:
+            fmk.cleanup_all_dmakers(reset_existing_seed=True)
+            fmk.set_pipeline_depth(depth)
+            random.seed(4)
+            first_id = fmk.fmkDB.execute_sql_statement("SELECT max(ID) FROM DATA;")[0][0] or 0
+            fmk.send_loop(8, act)
+            outcomes.append([rec[4] for rec in fmk.fmkDB.iter_data(start_id=first_id+1)])
+
+        fmk.cleanup_all_dmakers(reset_existing_seed=True)
+        fmk.set_pipeline_depth(0)
+        fmk.set_fuzz_delay(0.5)
+
+        self.assertEqual(len(outcomes[0]), 8)
+        self.assertEqual(outcomes[0], outcomes[1])
+
+
+    def test_vectorization_setting(self):
+        import fuzzfmk.basic_primitives as bp
+
+        try:
+            self.assertEqual(fmk.enable_vectorization(), bool(numpy_module))
+            self.assertEqual(bp.VECTORIZATION_ENABLED, bool(numpy_module))
+            self.assertTrue(fmk.disable_vectorization())
+            self.assertFalse(bp.VECTORIZATION_ENABLED)
+        finally:
+            bp.VECTORIZATION_ENABLED = False
+
+    def test_send_loop_stop_on_failure(self):
+        act = ['OFF_GEN', ('tTYPE', UI(runs_per_node=1, clone_node=False))]
+        send_data_and_log = fmk.send_data_and_log
+
+        def failing_send_data_and_log(*args, **kwargs):
+            send_data_and_log(*args, **kwargs)
+            return False
+
+        fmk.set_fuzz_delay(0)
+        fmk.send_data_and_log = failing_send_data_and_log
+        try:
+            for depth in [0, 3]:
+                fmk.set_pipeline_depth(depth)
+                for stop_on_failure, nb_sent in [(True, 1), (False, 4)]:
+                    fmk.cleanup_all_dmakers(reset_existing_seed=True)
+                    first_id = fmk.fmkDB.execute_sql_statement("SELECT max(ID) FROM DATA;")[0][0] or 0
+                    ret = fmk.send_loop(4, act, stop_on_failure=stop_on_failure)
+                    self.assertEqual(ret, not stop_on_failure)
+                    self.assertEqual(len(list(fmk.fmkDB.iter_data(start_id=first_id+1))), nb_sent)
+        finally:
+            del fmk.send_data_and_log
+            fmk.cleanup_all_dmakers(reset_existing_seed=True)
+            fmk.set_pipeline_depth(0)
+            fmk.set_fuzz_delay(0.5)
+
+    def test_batched_send_loop(self):
+        act = ['OFF_GEN', ('tTYPE', UI(runs_per_node=1, clone_node=False))]
+        fmk.set_fuzz_delay(0)
+
+        outcomes = []
+        for batch_size in [1, 5]:
+            fmk.cleanup_all_dmakers(reset_existing_seed=True)
+            fmk.set_batch_size(batch_size)
+            random.seed(4)
+            first_id = fmk.fmkDB.execute_sql_statement("SELECT max(ID) FROM DATA;")[0][0] or 0
+            # tTYPE hands over after 13 steps
+            fmk.send_loop(20, act)
+            # the fuzzed values are not compared as they are randomly chosen
+            outcomes.append([rec[6].split(b'\n')[:3] for rec in fmk.fmkDB.iter_steps()
+                             if rec[0] > first_id and rec[2] == 'tTYPE'])
+
+        fmk.cleanup_all_dmakers(reset_existing_seed=True)
+        batch = fmk.get_data_batch(['OFF_GEN', 'C'], 4)
+        fmk.cleanup_all_dmakers(reset_existing_seed=True)
+        fmk.set_batch_size(1)
+        fmk.set_fuzz_delay(0.5)
+
+        self.assertEqual(len(outcomes[0]), 13)
+        self.assertEqual(outcomes[0], outcomes[1])
+
+        self.assertEqual(len(batch), 4)
+        self.assertEqual(len(set(id(d.node) for d in batch)), 4)
+        for d in batch:
+            self.assertEqual([h[0] for h in d.get_history()], ['OFF_GEN', 'C'])
+
+    def test_batched_send_without_multiple_data(self):
+        # the data of a batch are sent one by one to the targets that
+        # do not implement send_multiple_data()
+        class SingleDataTarget(Target):
+            def __init__(self):
+                self.sent = []
+
+            def send_data(self, data):
+                self.sent.append(data.to_bytes())
+
+        tg = fmk.tg
+        fmk.tg = SingleDataTarget()
+        try:
+            batch = fmk.get_data_batch(['OFF_GEN', 'C'], 3)
+            fmk.send_data(batch)
+            self.assertEqual(fmk.tg.sent, [d.to_bytes() for d in batch])
+        finally:
+            fmk.tg = tg
+            fmk.cleanup_all_dmakers(reset_existing_seed=True)
 
 
 if __name__ == "__main__":
@@ -45,6 +45,18 @@ from fuzzfmk.data_model import AbsorbStatus, AbsCsts, convert_to_internal_repr,
 
 DEBUG = False
 
+def _window(blob, start):
+    '''
+    Return a zero-copy view of `blob` (bytes or mmap) from `start`,
+    usable with slicing, struct and re.
+    '''
+    if start == 0:
+        return blob
+    elif sys.version_info[0] > 2:
+        return memoryview(blob)[start:]
+    else:
+        return buffer(blob, start)
+
 class VT(object):
     '''
     Base class for value type classes accepted by value Elts
@@ -305,7 +317,7 @@ class String(VT_Alt):
             self.val_list_copy = copy.copy(self.val_list_copy)
 
 
-    def absorb_auto_helper(self, blob, constraints):
+    def absorb_auto_helper(self, blob, constraints, start=0):
         off = 0
         size = self.max_sz
 
@@ -318,34 +330,34 @@ class String(VT_Alt):
         # for instance).
         if constraints[AbsCsts.Contents] and self.val_list is not None and self.alphabet is None:
             for v in self.val_list:
-                if blob.startswith(v):
+                if blob[start:start+len(v)] == v:
                     break
             else:
                 for v in self.val_list:
-                    off = blob.find(v)
+                    off = blob.find(v, start)
                     if off > -1:
+                        off -= start
                         size = len(v)
                         break
 
         elif constraints[AbsCsts.Contents] and self.alphabet is not None:
             size = None
-            blob = unconvert_from_internal_repr(blob)
-            alp = unconvert_from_internal_repr(self.alphabet)
+            alp = [convert_to_internal_repr(l) for l in unconvert_from_internal_repr(self.alphabet)]
             for l in alp:
-                if blob.startswith(l):
+                if blob[start:start+len(l)] == l:
                     break
             else:
                 sup_sz = len(blob)+1
                 off = sup_sz
                 for l in alp:
-                    new_off = blob.find(l)
-                    if new_off < off and new_off > -1:
-                        off = new_off
+                    new_off = blob.find(l, start, start+off)
+                    if new_off > -1:
+                        off = new_off - start
                 if off == sup_sz:
                     off = -1
 
         elif constraints[AbsCsts.Regexp] and self.regexp is not None:
-            g = re.search(self.regexp, blob, re.S)
+            g = re.search(self.regexp, _window(blob, start), re.S)
             if g is not None:
                 off = g.start()
                 size = g.end() - off
@@ -358,7 +370,7 @@ class String(VT_Alt):
             return AbsorbStatus.Accept, off, size
 
 
-    def do_absorb(self, blob, constraints, off=0, size=None):
+    def do_absorb(self, blob, constraints, off=0, size=None, start=0):
 
         self.orig_max_sz = self.max_sz
         self.orig_min_sz = self.min_sz
@@ -366,6 +378,7 @@ class String(VT_Alt):
         self.orig_val_list_copy = copy.copy(self.val_list_copy)
         self.orig_drawn_val = self.drawn_val
 
+        off += start
         if constraints[AbsCsts.Size]:
             sz = size if size is not None and size < self.max_sz else self.max_sz
             val = self._read_value_from(blob[off:sz+off], constraints)
@@ -373,13 +386,15 @@ class String(VT_Alt):
             if val_sz < self.min_sz:
                 raise ValueError('min_sz constraint not respected!')
         else:
-            blob = blob[off:] #blob[off:size+off] if size is not None else blob[off:]
-            val = self._read_value_from(blob, constraints)
+            # the remaining data is not copied as long as the value
+            # is not known
+            val = self._read_value_from(_window(blob, off), constraints)
             val_sz = len(val)
+        off -= start
 
         if constraints[AbsCsts.Contents] and self.is_val_list_provided:
             for v in self.val_list:
-                if val.startswith(v):
+                if val[:len(v)] == v:
                     val = v
                     val_sz = len(val)
                     break
@@ -390,7 +405,10 @@ class String(VT_Alt):
                     raise ValueError('contents not valid!')
         elif constraints[AbsCsts.Contents] and self.alphabet is not None:
             val, val_sz = self._check_alphabet(val, constraints)
-            
+
+        if not isinstance(val, bytes):
+            val = bytes(val)
+
         # If we reach this point that means that val is accepted. Thus
         # update max and min if necessary.
         if not constraints[AbsCsts.Size]:
@@ -716,7 +734,7 @@ class INT(VT):
             self.int_list_copy = copy.copy(self.int_list_copy)
 
 
-    def absorb_auto_helper(self, blob, constraints):
+    def absorb_auto_helper(self, blob, constraints, start=0):
         off = 0
         # If 'Contents' constraint is set, we seek for int within
         # int_list.
@@ -724,12 +742,14 @@ class INT(VT):
         # and let do_absorb() decide if it's OK.
         if constraints[AbsCsts.Contents] and self.int_list is not None:
             for v in self.int_list:
-                if blob.startswith(self._convert_value(v)):
+                v = self._convert_value(v)
+                if blob[start:start+len(v)] == v:
                     break
             else:
                 for v in self.int_list:
-                    off = blob.find(self._convert_value(v))
+                    off = blob.find(self._convert_value(v), start)
                     if off > -1:
+                        off -= start
                         break
 
         if off < 0:
@@ -738,13 +758,13 @@ class INT(VT):
             return AbsorbStatus.Accept, off, None
 
 
-    def do_absorb(self, blob, constraints, off=0, size=None):
+    def do_absorb(self, blob, constraints, off=0, size=None, start=0):
 
         self.orig_int_list = copy.copy(self.int_list)
         self.orig_int_list_copy = copy.copy(self.int_list_copy)
         self.orig_drawn_val = self.drawn_val
 
-        blob = blob[off:]
+        blob = _window(blob, start+off)
 
         val, sz = self._read_value_from(blob, size)
         orig_val = self._unconvert_value(val)
@@ -1507,13 +1527,13 @@ class BitField(VT_Alt):
         return result
 
 
-    def absorb_auto_helper(self, blob, constraints):
-        if len(blob) < self.nb_bytes:
+    def absorb_auto_helper(self, blob, constraints, start=0):
+        if len(blob) - start < self.nb_bytes:
             return AbsorbStatus.Reject, 0, None
         else:
             return AbsorbStatus.Accept, 0, None
 
-    def do_absorb(self, blob, constraints, off=0, size=None):
+    def do_absorb(self, blob, constraints, off=0, size=None, start=0):
 
         self.orig_idx = copy.deepcopy(self.idx)
         self.orig_subfield_vals = copy.deepcopy(self.subfield_vals)
@@ -1521,7 +1541,7 @@ class BitField(VT_Alt):
 
         self.reset_state()
 
-        blob = blob[off:self.nb_bytes]
+        blob = blob[start+off:start+self.nb_bytes]
 
         orig_val = self._read_value_from(blob, self.nb_bytes, self.endian, constraints)
 
@@ -110,3 +110,26 @@ except ImportError:
     ssh_module = False
     print('WARNING [FMK]: python(3)-paramiko module is not installed! '
           'Should be installed for ssh-based monitoring.')
+
+asyncio_module = True
+try:
+    import asyncio
+    import concurrent.futures
+    # introduced in python 3.5.1
+    asyncio.run_coroutine_threadsafe
+except (ImportError, AttributeError):
+    asyncio_module = False
+    print('WARNING [FMK]: asyncio module is not available (python >= 3.5.1 is required), '
+          'AsyncNetworkTarget will not be available!')
+
+dill_module = True
+try:
+    import dill
+except ImportError:
+    dill_module = False
+
+numpy_module = True
+try:
+    import numpy
+except ImportError:
+    numpy_module = False
@@ -86,7 +86,7 @@ if __name__ == "__main__":
 
     if display_stats:
         records = fmkdb.execute_sql_statement(
-            "SELECT TARGET, TYPE, TOTAL FROM STATS_BY_TARGET;"
+            "SELECT TARGET, TYPE, TOTAL FROM STATS_BY_TARGET ORDER BY TARGET, TYPE;"
         )
 
         if records:
@@ -117,84 +117,79 @@ if __name__ == "__main__":
     elif export_data is not None or export_one_data is not None:
 
         if export_data is not None:
-            records = fmkdb.execute_sql_statement(
-                "SELECT ID, TYPE, DM_NAME, SENT_DATE, CONTENT FROM DATA "
-                "WHERE {start:d} <= ID and ID <= {end:d};".format(start=export_data[0],
-                                                                  end=export_data[1])
-            )
+            records = fmkdb.iter_data(start_id=export_data[0], end_id=export_data[1])
         else:
-            records = fmkdb.execute_sql_statement(
-                "SELECT ID, TYPE, DM_NAME, SENT_DATE, CONTENT FROM DATA "
-                "WHERE ID == {data_id:d};".format(data_id=export_one_data)
-            )
+            records = fmkdb.iter_data(start_id=export_one_data, end_id=export_one_data)
 
-        if records:
-            base_dir = gr.exported_data_folder
-            prev_export_date = None
-            export_cpt = 0
+        base_dir = gr.exported_data_folder
+        prev_export_date = None
+        export_cpt = 0
+        nb_exported = 0
 
-            for rec in records:
-                data_id, data_type, dm_name, sent_date, content = rec
-                # print(data_id, data_type, dm_name, sent_date)
+        for rec in records:
+            data_id, _, data_type, dm_name, content, _, sent_date, _ = rec
+            # print(data_id, data_type, dm_name, sent_date)
 
-                file_extension = dm_name
+            file_extension = dm_name
 
-                current_export_date = sent_date.strftime("%Y-%m-%d-%H%M%S")
+            current_export_date = sent_date.strftime("%Y-%m-%d-%H%M%S")
 
-                if current_export_date != prev_export_date:
-                    prev_export_date = current_export_date
-                    export_cpt = 0
-                else:
-                    export_cpt += 1
+            if current_export_date != prev_export_date:
+                prev_export_date = current_export_date
+                export_cpt = 0
+            else:
+                export_cpt += 1
 
-                export_fname = '{typ:s}_{date:s}_{cpt:0>2d}.{ext:s}'.format(date=current_export_date,
-                                                                            cpt=export_cpt,
-                                                                            ext=file_extension,
-                                                                            typ=data_type)
+            export_fname = '{typ:s}_{date:s}_{cpt:0>2d}.{ext:s}'.format(date=current_export_date,
+                                                                        cpt=export_cpt,
+                                                                        ext=file_extension,
+                                                                        typ=data_type)
 
-                export_full_fn = os.path.join(base_dir, dm_name, export_fname)
-                ensure_dir(export_full_fn)
+            export_full_fn = os.path.join(base_dir, dm_name, export_fname)
+            ensure_dir(export_full_fn)
 
-                with open(export_full_fn, 'wb') as fd:
-                    fd.write(content)
+            with open(export_full_fn, 'wb') as fd:
+                fd.write(content)
 
-                print(colorize("Data ID #{:d} --> {:s}".format(data_id, export_full_fn),
-                               rgb=Color.FMKINFO))
+            nb_exported += 1
+            print(colorize("Data ID #{:d} --> {:s}".format(data_id, export_full_fn),
+                           rgb=Color.FMKINFO))
 
-        else:
+        if nb_exported == 0:
             print(colorize("*** ERROR: provided data IDs are incorrect ***", rgb=Color.ERROR))
 
     elif impact_analysis:
-        fbk_records = fmkdb.execute_sql_statement(
-            "SELECT DATA_ID, STATUS, SOURCE FROM FEEDBACK "
-            "WHERE STATUS < 0;"
-        )
-        prj_records = fmkdb.execute_sql_statement(
-            "SELECT PRJ_NAME, DATA_ID, TARGET FROM PROJECT_RECORDS;"
+        records = fmkdb.iter_records(
+            "SELECT PROJECT_RECORDS.PRJ_NAME, FEEDBACK.DATA_ID, PROJECT_RECORDS.TARGET, "
+            "FEEDBACK.STATUS, FEEDBACK.SOURCE "
+            "FROM FEEDBACK INNER JOIN PROJECT_RECORDS "
+            "  ON FEEDBACK.DATA_ID = PROJECT_RECORDS.DATA_ID "
+            "WHERE FEEDBACK.STATUS < ? "
+            "ORDER BY PROJECT_RECORDS.PRJ_NAME, FEEDBACK.DATA_ID",
+            (0,)
         )
 
-        if fbk_records and prj_records:
-            data_ids = {}
-            for rec in fbk_records:
-                data_ids[rec[0]] = (rec[1], rec[2])
-
-            data_id_pattern = "{:>"+str(int(math.log10(len(prj_records)))+2)+"s}"
-
-            current_prj = None
-            for rec in prj_records:
-                prj, data_id, target = rec
-                if data_id in data_ids.keys():
-                    if prj != current_prj:
-                        current_prj = prj
-                        print(colorize("*** Project '{:s}' ***".format(prj), rgb=Color.FMKINFOGROUP))
-                    format_string = "     [DataID " + data_id_pattern + "] --> {:s}"
-                    print(colorize(format_string.format('#'+str(data_id), target),
-                                   rgb=Color.DATAINFO))
-                    if verbose:
-                        print(colorize("       |_ status={:d} from {:s}".format(data_ids[data_id][0], data_ids[data_id][1]),
-                                       rgb=Color.FMKSUBINFO))
+        last_data_id = fmkdb.execute_sql_statement("SELECT max(ID) FROM DATA;")[0][0]
+        data_id_pattern = "{:>"+str(int(math.log10(max(last_data_id or 1, 1)))+2)+"s}"
+
+        current_prj = None
+        current_data_id = None
+        for rec in records:
+            prj, data_id, target, status, source = rec
+            if prj != current_prj:
+                current_prj = prj
+                current_data_id = None
+                print(colorize("*** Project '{:s}' ***".format(prj), rgb=Color.FMKINFOGROUP))
+            if data_id != current_data_id:
+                current_data_id = data_id
+                format_string = "     [DataID " + data_id_pattern + "] --> {:s}"
+                print(colorize(format_string.format('#'+str(data_id), target),
+                               rgb=Color.DATAINFO))
+            if verbose:
+                print(colorize("       |_ status={:d} from {:s}".format(status, source),
+                               rgb=Color.FMKSUBINFO))
 
-        else:
+        if current_prj is None:
             print(colorize("*** No data has negatively impacted a target ***", rgb=Color.FMKINFO))
 
     fmkdb.stop()